@@ -151,6 +151,30 @@ class PowerGridSettings(BaseSettings):
         "seasonal_patterns": True
     })
     
+    # Network State Persistence (write-behind)
+    persistence_config: Dict[str, Any] = Field(default_factory=lambda: {
+        "state_sample_interval": 60,  # simulated seconds between stored states
+        "queue_size": 256,  # pending snapshots before the oldest is dropped
+        "batch_size": 32,  # snapshots per insert transaction
+        "flush_interval": 1.0  # seconds the writer waits for a batch
+    })
+    
+    # Event-driven power flow triggering
+    power_flow_trigger_config: Dict[str, Any] = Field(default_factory=lambda: {
+        "deadband_mw": 0.05,  # per-bus injection change that forces a solve
+        "bus_deadbands_mw": {},  # bus name -> deadband overriding the default
+        "max_staleness_s": 5.0  # simulated seconds before a solve is forced anyway
+    })
+    
+    # Rolling-horizon economic dispatch
+    dispatch_config: Dict[str, Any] = Field(default_factory=lambda: {
+        "horizon_steps": 8,  # snapshots per solve (2 hours at 15-min resolution)
+        "redispatch_minutes": 5.0,  # simulated minutes between re-dispatches
+        "solver": "highs",  # open-source; highspy if installed, else scipy's HiGHS
+        "load_shed_cost": 10000.0,  # $/MWh of unserved load
+        "overload_penalty": 1000.0  # $/MW of branch overload or ramp violation
+    })
+    
     # Monitoring and Alerting
     monitoring_config: Dict[str, Any] = Field(default_factory=lambda: {
         "prometheus_port": 9090,
@@ -0,0 +1,329 @@
+"""
+Manhattan Power Grid - Warm-Started AC Newton-Raphson
+Keeps the previous voltage solution and the LU factorization of the last
+Jacobian between calls. Iterations reuse the stale factorization (dishonest
+Newton) while the mismatch contracts fast enough and refresh it otherwise.
+A full Newton solve from a flat start is the fallback on divergence.
+"""
+
+import numpy as np
+from typing import Dict, Any
+from dataclasses import dataclass
+from scipy.sparse import csr_matrix, csc_matrix, diags, bmat
+from scipy.sparse.linalg import splu
+
+
+@dataclass
+class ACSolution:
+    """Result of a native AC power flow solve"""
+    v_mag_pu: np.ndarray  # Bus voltage magnitudes, solver bus order
+    v_ang: np.ndarray  # Bus voltage angles (rad)
+    s_bus: np.ndarray  # Calculated complex bus injections (MW + j MVAr)
+    s0: np.ndarray  # Complex branch flow leaving bus0, solver branch order
+    s1: np.ndarray  # Complex branch flow leaving bus1
+    iterations: int
+    jacobian_updates: int
+    mismatch: float  # Infinity norm of the final mismatch (MW / MVAr)
+    converged: bool
+    warm_start: bool
+    fallback: bool
+    topology_version: int
+
+
+class NewtonRaphsonSolver:
+    """
+    AC power flow on the topology of a SparseDCSolver
+    Branch status, islands and slack buses come from the DC kernel, so both
+    solvers always agree on the network they solve. Admittances follow
+    pypsa.pf.calculate_Y (pi model, per unit on a 1 MVA base).
+    """
+
+    def __init__(self, dc_solver, x_tol: float = 1e-6, max_iter: int = 30,
+                 refresh_ratio: float = 0.25):
+        self.dc = dc_solver
+        self.network = dc_solver.network
+        self.x_tol = x_tol
+        self.max_iter = max_iter
+        self.refresh_ratio = refresh_ratio  # Refresh the Jacobian if |F| shrinks less than this
+
+        self._branch_source = None
+        self._y_version = None
+        self._factor = None
+        self._factor_version = None
+        self._V = None
+
+        self.stats = {
+            'solves': 0,
+            'iterations': 0,
+            'jacobian_updates': 0,
+            'warm_starts': 0,
+            'fallbacks': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Admittances
+    # ------------------------------------------------------------------
+
+    def _branch_admittances(self):
+        """Per-unit series/shunt admittances and taps in DC solver branch order"""
+        network = self.network
+        lines = network.lines
+        transformers = network.transformers
+
+        v_nom = lines.bus0.map(network.buses.v_nom).values.astype(float)
+        line_z = (lines.r.values + 1j * lines.x.values) / v_nom ** 2
+        line_y = (lines.g.values + 1j * lines.b.values) * v_nom ** 2
+
+        s_nom = transformers.s_nom.values.astype(float)
+        trafo_z = (transformers.r.values + 1j * transformers.x.values) / s_nom
+        trafo_y = (transformers.g.values + 1j * transformers.b.values) * s_nom
+
+        # T-model transformers: wye-delta conversion as in apply_transformer_t_model
+        t_model = (transformers.model.values == "t") & (trafo_y != 0)
+        if t_model.any():
+            z1 = z2 = trafo_z[t_model] / 2
+            z3 = 1 / trafo_y[t_model]
+            summand = z1 * z2 + z2 * z3 + z3 * z1
+            trafo_z[t_model] = summand / z3
+            trafo_y[t_model] = 2 / (summand / z2)
+
+        tau = transformers.tap_ratio.fillna(1.0).values.astype(float)
+        tau[tau == 0] = 1.0
+        tap_side = transformers.tap_side.values
+
+        n_lines = len(lines)
+        z = np.concatenate([line_z, trafo_z])
+        self._y_series = np.divide(1.0, z, out=np.zeros_like(z), where=z != 0)
+        self._y_shunt = np.concatenate([line_y, trafo_y])
+        self._tau_hv = np.concatenate([np.ones(n_lines), np.where(tap_side == 0, tau, 1.0)])
+        self._tau_lv = np.concatenate([np.ones(n_lines), np.where(tap_side == 1, tau, 1.0)])
+        self._shift = np.exp(1j * np.concatenate([
+            np.zeros(n_lines),
+            transformers.phase_shift.fillna(0.0).values.astype(float) * np.pi / 180.0
+        ]))
+
+        shunts = network.shunt_impedances
+        shunt_v = shunts.bus.map(network.buses.v_nom).values.astype(float)
+        self._bus_shunt = np.zeros(len(self.dc.bus_names), dtype=complex)
+        np.add.at(
+            self._bus_shunt,
+            self.dc.bus_names.get_indexer(shunts.bus.values),
+            (shunts.g.values + 1j * shunts.b.values) * shunt_v ** 2
+        )
+
+        self._branch_source = self.dc.branch_names
+
+    def _build_y(self):
+        """Bus admittance matrix and branch current matrices for the current topology"""
+        dc = self.dc
+        if self._branch_source is not dc.branch_names:
+            self._branch_admittances()
+            self._V = None
+
+        n_bus = len(dc.bus_names)
+        n_branch = len(dc.branch_names)
+        active = dc.in_service & (self._y_series != 0)
+
+        y_se = np.where(active, self._y_series, 0)
+        y_sh = np.where(active, self._y_shunt, 0)
+        tau_hv, tau_lv, shift = self._tau_hv, self._tau_lv, self._shift
+
+        Y11 = (y_se + 0.5 * y_sh) / tau_lv ** 2
+        Y10 = -y_se / tau_lv / tau_hv / shift
+        Y01 = -y_se / tau_lv / tau_hv / np.conj(shift)
+        Y00 = (y_se + 0.5 * y_sh) / tau_hv ** 2
+
+        rows = np.r_[np.arange(n_branch), np.arange(n_branch)]
+        cols = np.r_[dc.bus0, dc.bus1]
+        self.Y0 = csr_matrix((np.r_[Y00, Y01], (rows, cols)), shape=(n_branch, n_bus))
+        self.Y1 = csr_matrix((np.r_[Y10, Y11], (rows, cols)), shape=(n_branch, n_bus))
+
+        C0 = csr_matrix((np.ones(n_branch), (np.arange(n_branch), dc.bus0)), shape=(n_branch, n_bus))
+        C1 = csr_matrix((np.ones(n_branch), (np.arange(n_branch), dc.bus1)), shape=(n_branch, n_bus))
+        self.Y = (C0.T @ self.Y0 + C1.T @ self.Y1 + diags(self._bus_shunt)).tocsr()
+
+        self._y_version = dc.topology_version
+
+    def _bus_types(self):
+        """Slack (per island), PV and PQ bus positions plus voltage set points"""
+        dc = self.dc
+        network = self.network
+        n_bus = len(dc.bus_names)
+
+        if not dc._factorized:
+            dc.factorize()
+
+        slack = np.zeros(n_bus, dtype=bool)
+        slack[dc._slack_buses] = True
+
+        generators = network.generators
+        pv = np.zeros(n_bus, dtype=bool)
+        pv_gens = generators.control.values == "PV"
+        pv[dc.bus_names.get_indexer(generators.bus.values[pv_gens])] = True
+        pv &= ~slack
+
+        self._slack = np.flatnonzero(slack)
+        self._pv = np.flatnonzero(pv)
+        self._pvpq = np.flatnonzero(~slack)
+        self._pq = np.flatnonzero(~slack & ~pv)
+
+        v_set = network.get_switchable_as_dense('Bus', 'v_mag_pu_set').iloc[0]
+        self._v_set = v_set.reindex(dc.bus_names).fillna(1.0).values.astype(float)
+
+    # ------------------------------------------------------------------
+    # Newton-Raphson
+    # ------------------------------------------------------------------
+
+    def _mismatch(self, V: np.ndarray, s: np.ndarray) -> np.ndarray:
+        """Active mismatch at PV/PQ buses and reactive mismatch at PQ buses"""
+        ds = V * np.conj(self.Y @ V) - s
+        return np.r_[ds.real[self._pvpq], ds.imag[self._pq]]
+
+    def _jacobian(self, V: np.ndarray) -> csc_matrix:
+        """Power flow Jacobian in polar coordinates"""
+        Y = self.Y
+        I = Y @ V
+        V_diag = diags(V)
+        V_norm_diag = diags(V / np.abs(V))
+        I_diag = diags(I)
+
+        dS_dVa = 1j * V_diag @ np.conj(I_diag - Y @ V_diag)
+        dS_dVm = V_norm_diag @ np.conj(I_diag) + V_diag @ np.conj(Y @ V_norm_diag)
+
+        dS_dVa = dS_dVa.tocsr()
+        dS_dVm = dS_dVm.tocsr()
+        pvpq, pq = self._pvpq, self._pq
+
+        J = bmat([
+            [dS_dVa[pvpq][:, pvpq].real, dS_dVm[pvpq][:, pq].real],
+            [dS_dVa[pq][:, pvpq].imag, dS_dVm[pq][:, pq].imag]
+        ], format="csc")
+        return J
+
+    def _iterate(self, V: np.ndarray, s: np.ndarray, reuse: bool):
+        """
+        Newton iterations from V
+
+        Returns:
+            (V, iterations, jacobian updates, mismatch norm, converged)
+        """
+        n_pvpq = len(self._pvpq)
+        v_mag = np.abs(V)
+        v_ang = np.angle(V)
+
+        factor = self._factor if reuse and self._factor_version == self._y_version else None
+        F = self._mismatch(V, s)
+        norm = np.abs(F).max() if len(F) else 0.0
+        initial = norm
+        iterations = 0
+        updates = 0
+
+        while norm > self.x_tol and iterations < self.max_iter:
+            if factor is None:
+                factor = splu(self._jacobian(V))
+                updates += 1
+
+            dx = factor.solve(F)
+            v_ang[self._pvpq] -= dx[:n_pvpq]
+            v_mag[self._pq] -= dx[n_pvpq:]
+            V = v_mag * np.exp(1j * v_ang)
+            iterations += 1
+
+            F = self._mismatch(V, s)
+            new_norm = np.abs(F).max()
+            if not np.isfinite(new_norm) or new_norm > 1e3 * max(initial, 1.0):
+                return V, iterations, updates, float(new_norm), False
+
+            # Stale Jacobian no longer contracts fast enough: refresh it
+            if new_norm > self.refresh_ratio * norm:
+                factor = None
+            norm = new_norm
+
+        if factor is not None:
+            self._factor = factor
+            self._factor_version = self._y_version
+
+        return V, iterations, updates, float(norm), bool(norm <= self.x_tol)
+
+    def solve(self, s_mw: np.ndarray) -> ACSolution:
+        """
+        Solve the AC power flow for complex bus injections
+
+        Args:
+            s_mw: Scheduled injections (MW + j MVAr), solver bus order
+
+        Returns:
+            ACSolution with voltages, branch flows and iteration counts
+        """
+        dc = self.dc
+        if self._y_version != dc.topology_version or self._branch_source is not dc.branch_names:
+            self._build_y()
+            self._bus_types()
+
+        s = np.asarray(s_mw, dtype=complex)
+        n_bus = len(dc.bus_names)
+
+        # Warm start from the last solution, keeping set points fixed
+        warm = self._V is not None and len(self._V) == n_bus
+        V = self._V.copy() if warm else np.ones(n_bus, dtype=complex)
+        v_mag, v_ang = np.abs(V), np.angle(V)
+        fixed = np.r_[self._slack, self._pv].astype(int)
+        v_mag[fixed] = self._v_set[fixed]
+        v_ang[self._slack] = 0.0
+        V = v_mag * np.exp(1j * v_ang)
+
+        V, iterations, updates, mismatch, converged = self._iterate(V, s, reuse=warm)
+
+        fallback = False
+        if not converged:
+            # Full Newton from a flat start with a fresh Jacobian every step
+            self._factor = None
+            flat = np.ones(n_bus)
+            flat[fixed] = self._v_set[fixed]
+            extra = self._iterate(flat.astype(complex), s, reuse=False)
+            V, iterations = extra[0], iterations + extra[1]
+            updates, mismatch, converged = updates + extra[2], extra[3], extra[4]
+            fallback = True
+
+        if converged:
+            self._V = V.copy()
+        else:
+            self._V = None
+            self._factor = None
+
+        self.stats['solves'] += 1
+        self.stats['iterations'] += iterations
+        self.stats['jacobian_updates'] += updates
+        self.stats['warm_starts'] += int(warm)
+        self.stats['fallbacks'] += int(fallback)
+
+        return ACSolution(
+            v_mag_pu=np.abs(V),
+            v_ang=np.angle(V),
+            s_bus=V * np.conj(self.Y @ V),
+            s0=V[dc.bus0] * np.conj(self.Y0 @ V),
+            s1=V[dc.bus1] * np.conj(self.Y1 @ V),
+            iterations=iterations,
+            jacobian_updates=updates,
+            mismatch=mismatch,
+            converged=converged,
+            warm_start=warm,
+            fallback=fallback,
+            topology_version=dc.topology_version
+        )
+
+    def reset(self):
+        """Forget the warm start and the cached Jacobian factorization"""
+        self._V = None
+        self._factor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cumulative solve statistics"""
+        stats = dict(self.stats)
+        solves = max(stats['solves'], 1)
+        stats['avg_iterations'] = stats['iterations'] / solves
+        stats['avg_jacobian_updates'] = stats['jacobian_updates'] / solves
+        return stats
+
+
+__all__ = ["NewtonRaphsonSolver", "ACSolution"]
@@ -0,0 +1,367 @@
+"""
+Manhattan Power Grid - Monte Carlo Cascading Failure Engine
+Runs many independent, seeded cascade trials per initiating substation on
+compact DC arrays taken from the sparse DC solver. Trials are spread across
+a process pool and summarized into cascade size / load lost distributions.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Any
+from dataclasses import dataclass
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+@dataclass
+class CascadeModel:
+    """Picklable snapshot of the grid used by cascade trials"""
+    bus_names: List[str]
+    branch_names: List[str]
+    bus0: np.ndarray
+    bus1: np.ndarray
+    susceptance: np.ndarray
+    s_nom: np.ndarray
+    in_service: np.ndarray  # Branch status before the initiating event
+    demand_mw: np.ndarray  # Load per bus (positive MW)
+    fixed_injection_mw: np.ndarray  # Generator/storage set points per bus
+    gen_bus: np.ndarray  # Slack candidate buses, preferred order
+    gen_headroom_mw: np.ndarray  # Capacity above set point per candidate
+    substation_buses: Dict[str, np.ndarray]
+
+
+@dataclass
+class CascadeParameters:
+    """Cascade propagation rules shared by all trials"""
+    trip_probability: float = 0.3  # Chance an overloaded branch trips per stage
+    overload_threshold: float = 1.0  # Loading (flow / s_nom) that counts as overloaded
+    max_iterations: int = 10
+
+
+def _initial_state(model: CascadeModel, substation: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Branch status and live bus mask after the substation is lost"""
+    dead = np.zeros(len(model.bus_names), dtype=bool)
+    dead[model.substation_buses[substation]] = True
+
+    active = model.in_service & (model.susceptance != 0)
+    active &= ~(dead[model.bus0] | dead[model.bus1])
+    return active, ~dead
+
+
+def _solve_state(model: CascadeModel, active: np.ndarray, alive: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    DC flows for one outage state
+
+    Returns:
+        (branch flows in MW, load not served in MW)
+    """
+    n_bus = len(model.bus_names)
+    demand = np.where(alive, model.demand_mw, 0.0)
+    fixed = np.where(alive, model.fixed_injection_mw, 0.0)
+
+    adjacency = csr_matrix(
+        (np.ones(int(active.sum())), (model.bus0[active], model.bus1[active])),
+        shape=(n_bus, n_bus)
+    )
+    n_islands, island_of_bus = connected_components(adjacency, directed=False)
+
+    # Slack bus per island: first live generator in preferred order
+    slack_bus = np.full(n_islands, -1, dtype=int)
+    headroom = np.zeros(n_islands)
+    for bus, room in zip(model.gen_bus, model.gen_headroom_mw):
+        if not alive[bus]:
+            continue
+        island = island_of_bus[bus]
+        if slack_bus[island] < 0:
+            slack_bus[island] = bus
+        headroom[island] += room
+
+    island_demand = np.bincount(island_of_bus, weights=demand, minlength=n_islands)
+    island_fixed = np.bincount(island_of_bus, weights=fixed, minlength=n_islands)
+    mismatch = island_demand - island_fixed
+
+    # Islands that cannot be balanced shed load proportionally
+    supplied = np.where(slack_bus >= 0, np.minimum(mismatch, headroom), -np.inf)
+    shed = np.clip(mismatch - supplied, 0.0, None)
+    shed = np.minimum(shed, island_demand)
+    served_fraction = np.divide(
+        island_demand - shed, island_demand,
+        out=np.ones(n_islands), where=island_demand > 0
+    )
+
+    injections = fixed - demand * served_fraction[island_of_bus]
+    injections[slack_bus[slack_bus >= 0]] -= np.bincount(
+        island_of_bus, weights=injections, minlength=n_islands
+    )[slack_bus >= 0]
+
+    # Dead islands carry nothing; their first bus is grounded
+    for island in np.flatnonzero(slack_bus < 0):
+        members = island_of_bus == island
+        injections[members] = 0.0
+        slack_bus[island] = np.flatnonzero(members)[0]
+
+    b = np.where(active, model.susceptance, 0.0)
+    B = np.zeros((n_bus, n_bus))
+    np.add.at(B, (model.bus0, model.bus0), b)
+    np.add.at(B, (model.bus1, model.bus1), b)
+    np.add.at(B, (model.bus0, model.bus1), -b)
+    np.add.at(B, (model.bus1, model.bus0), -b)
+
+    keep = np.ones(n_bus, dtype=bool)
+    keep[slack_bus] = False
+    theta = np.zeros(n_bus)
+    if keep.any():
+        theta[keep] = np.linalg.solve(B[np.ix_(keep, keep)], injections[keep])
+
+    flows = b * (theta[model.bus0] - theta[model.bus1])
+    return flows, float(shed.sum())
+
+
+def _run_trial_chunk(
+    model: CascadeModel,
+    substation: str,
+    trials: range,
+    seed: int,
+    params: CascadeParameters
+) -> List[Tuple[int, float, Tuple[Tuple[int, ...], ...]]]:
+    """
+    Run a block of cascade trials (process pool entry point)
+
+    Returns:
+        (branches tripped, load lost MW, trip sequence) per trial
+    """
+    start_active, alive = _initial_state(model, substation)
+    initial_lost = float(model.demand_mw[~alive].sum())
+    substation_index = sorted(model.substation_buses).index(substation)
+
+    rating = np.where(model.s_nom > 0, model.s_nom, np.inf)
+    states = {}  # Outage state -> (overloaded branches, shed), shared across trials
+
+    def solve(active):
+        key = active.tobytes()
+        if key not in states:
+            flows, shed = _solve_state(model, active, alive)
+            overloaded = np.flatnonzero(
+                active & (np.abs(flows) / rating > params.overload_threshold)
+            )
+            states[key] = (overloaded, shed)
+        return states[key]
+
+    results = []
+    for trial in trials:
+        rng = np.random.default_rng([seed, substation_index, trial])
+        active = start_active.copy()
+        sequence = []
+
+        for _ in range(params.max_iterations):
+            overloaded, _ = solve(active)
+            if not len(overloaded):
+                break
+
+            tripped = overloaded[rng.random(len(overloaded)) < params.trip_probability]
+            if not len(tripped):
+                break
+
+            active[tripped] = False
+            sequence.append(tuple(int(i) for i in tripped))
+
+        _, shed = solve(active)
+        size = sum(len(stage) for stage in sequence)
+        results.append((size, initial_lost + shed, tuple(sequence)))
+
+    return results
+
+
+def _distribution(values: np.ndarray) -> Dict[str, float]:
+    """Summary statistics of a sample"""
+    return {
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'max': float(values.max())
+    }
+
+
+class MonteCarloCascadeEngine:
+    """
+    Monte Carlo cascade risk per initiating substation
+    Results are cached until topology, generation capacity or loading change
+    by more than the loading tolerance.
+    """
+
+    def __init__(self, power_grid, loading_tolerance_mw: float = 1.0):
+        self.power_grid = power_grid
+        self.loading_tolerance_mw = loading_tolerance_mw
+        self._cache = {}
+
+    def build_model(self) -> CascadeModel:
+        """Extract compact arrays from the grid and its DC solver"""
+        grid = self.power_grid
+        network = grid.network
+        solver = grid.dc_solver
+        solver.sync()
+
+        bus_names = solver.bus_names
+        n_bus = len(bus_names)
+        _, dispatch = grid._nodal_injections()
+
+        loads = network.loads
+        demand = np.bincount(
+            bus_names.get_indexer(loads.bus.values),
+            weights=dispatch['Load'] * -loads.sign.values, minlength=n_bus
+        ) if len(loads) else np.zeros(n_bus)
+
+        fixed = np.zeros(n_bus)
+        for component in ("Generator", "StorageUnit"):
+            df = network.df(component)
+            if len(df):
+                fixed += np.bincount(
+                    bus_names.get_indexer(df.bus.values),
+                    weights=dispatch[component] * df.sign.values, minlength=n_bus
+                )
+
+        # Slack candidates: explicit slack generators first, as PyPSA does
+        generators = network.generators
+        p_max_pu = network.get_switchable_as_dense('Generator', 'p_max_pu').iloc[0]
+        capacity = generators.p_nom.values * p_max_pu.reindex(generators.index).values
+        headroom = np.clip(capacity - dispatch['Generator'], 0.0, None)
+        preferred = generators.control.values == "Slack"
+        order = np.concatenate([np.flatnonzero(preferred), np.flatnonzero(~preferred)])
+        order = order[capacity[order] > 0]
+
+        substation_buses = {
+            name: bus_names.get_indexer(list(sub['buses'].values()))
+            for name, sub in grid.substations.items()
+        }
+
+        return CascadeModel(
+            bus_names=list(bus_names),
+            branch_names=list(solver.branch_names),
+            bus0=solver.bus0.copy(),
+            bus1=solver.bus1.copy(),
+            susceptance=solver.susceptance.copy(),
+            s_nom=solver.s_nom.copy(),
+            in_service=solver.in_service.copy(),
+            demand_mw=demand,
+            fixed_injection_mw=fixed,
+            gen_bus=bus_names.get_indexer(generators.bus.values[order]),
+            gen_headroom_mw=headroom[order],
+            substation_buses=substation_buses
+        )
+
+    def _cache_key(self, model: CascadeModel, substations, n_trials, seed, params) -> tuple:
+        """Cache key that only changes when the grid state changes materially"""
+        tolerance = self.loading_tolerance_mw
+
+        def quantize(values):
+            return np.round(values / tolerance).astype(np.int64).tobytes()
+
+        return (
+            self.power_grid.dc_solver.topology_version,
+            model.in_service.tobytes(),
+            quantize(model.s_nom),
+            quantize(model.demand_mw),
+            quantize(model.fixed_injection_mw),
+            quantize(model.gen_headroom_mw),
+            model.gen_bus.tobytes(),
+            tuple(substations), n_trials, seed,
+            params.trip_probability, params.overload_threshold, params.max_iterations
+        )
+
+    def run(
+        self,
+        substations: Optional[List[str]] = None,
+        n_trials: int = 1000,
+        seed: int = 0,
+        params: Optional[CascadeParameters] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 250,
+        top_k: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Run cascade trials for each initiating substation
+
+        Args:
+            substations: Initiating substations (default: all)
+            n_trials: Trials per substation
+            seed: Base seed; trial t of substation s uses default_rng([seed, s, t])
+            params: Propagation rules
+            workers: Process count (1 runs in-process)
+            chunk_size: Trials per process pool task
+            top_k: Most frequent failure sequences to report
+
+        Returns:
+            Distributions per substation
+        """
+        params = params or CascadeParameters()
+        model = self.build_model()
+        substations = sorted(substations or model.substation_buses)
+
+        key = self._cache_key(model, substations, n_trials, seed, params)
+        if key in self._cache:
+            return self._cache[key]
+
+        tasks = [
+            (substation, range(start, min(start + chunk_size, n_trials)))
+            for substation in substations
+            for start in range(0, n_trials, chunk_size)
+        ]
+
+        outcomes = {substation: [] for substation in substations}
+        if workers == 1 or len(tasks) == 1:
+            for substation, trials in tasks:
+                outcomes[substation].extend(
+                    _run_trial_chunk(model, substation, trials, seed, params)
+                )
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    (substation, executor.submit(
+                        _run_trial_chunk, model, substation, trials, seed, params
+                    ))
+                    for substation, trials in tasks
+                ]
+                for substation, future in futures:
+                    outcomes[substation].extend(future.result())
+
+        result = {
+            'n_trials': n_trials,
+            'seed': seed,
+            'trip_probability': params.trip_probability,
+            'substations': {
+                substation: self._summarize(model, outcomes[substation], top_k)
+                for substation in substations
+            }
+        }
+
+        self._cache = {key: result}
+        return result
+
+    @staticmethod
+    def _summarize(model: CascadeModel, outcomes, top_k: int) -> Dict[str, Any]:
+        """Distributions and most frequent sequences of one substation's trials"""
+        sizes = np.array([size for size, _, _ in outcomes])
+        load_lost = np.array([lost for _, lost, _ in outcomes])
+        sequences = Counter(sequence for _, _, sequence in outcomes if sequence)
+
+        histogram = np.bincount(sizes)
+        return {
+            'cascade_probability': float((sizes > 0).mean()),
+            'cascade_size': {
+                **_distribution(sizes),
+                'histogram': {int(s): int(c) for s, c in enumerate(histogram) if c}
+            },
+            'load_lost_mw': _distribution(load_lost),
+            'top_sequences': [
+                {
+                    'sequence': [[model.branch_names[i] for i in stage] for stage in sequence],
+                    'count': count,
+                    'probability': count / len(outcomes)
+                }
+                for sequence, count in sequences.most_common(top_k)
+            ]
+        }
+
+
+__all__ = ["MonteCarloCascadeEngine", "CascadeModel", "CascadeParameters"]
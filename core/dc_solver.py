@@ -0,0 +1,407 @@
+"""
+Manhattan Power Grid - Native Sparse DC Power Flow Kernel
+Factorizes the reduced susceptance matrix once and keeps the factorization
+across load changes. Only branch status changes trigger a refactorization.
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+from typing import List, Mapping, Optional
+from dataclasses import dataclass
+from scipy.sparse import csc_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+
+
+@dataclass
+class DCSolution:
+    """Result of a native DC power flow solve"""
+    theta: np.ndarray  # Bus voltage angles (rad), solver bus order
+    flows_mw: np.ndarray  # Branch flows bus0 -> bus1 (MW), solver branch order
+    injections_mw: np.ndarray  # Net bus injections after slack balancing (MW)
+    slack_mw: np.ndarray  # Slack pick-up per island (MW)
+    islanded: np.ndarray  # Bus mask: island without any generator
+    topology_version: int
+
+
+class SparseDCSolver:
+    """
+    Sparse DC power flow on a PyPSA network
+    Mirrors PyPSA's linear power flow (lpf) conventions: per-unit reactances
+    on a 1 MVA base, one slack bus per island, flows in MW.
+    """
+
+    def __init__(self, network, outage_ratings: Optional[Mapping[str, float]] = None):
+        self.network = network
+
+        # Ratings of switched-out lines, whose s_nom the network holds at 0
+        self.outage_ratings = outage_ratings if outage_ratings is not None else {}
+
+        # Topology arrays (rebuilt when buses/branches are added)
+        self.bus_names = pd.Index([])
+        self.branch_names = pd.Index([])
+        self.branch_component = np.array([], dtype=object)
+        self.bus0 = np.array([], dtype=int)
+        self.bus1 = np.array([], dtype=int)
+        self.susceptance = np.array([])
+        self.s_nom = np.array([])
+        self.branch_shift = np.array([])
+        self.in_service = np.array([], dtype=bool)
+        self.dirty = np.array([], dtype=bool)  # Buses whose injections changed since the last solve
+        self.generator_names = pd.Index([])
+        self.gen_bus = np.array([], dtype=int)
+        self.gen_is_slack = np.array([], dtype=bool)
+
+        # Factorization state
+        self.topology_version = 0
+        self._factorized = False
+        self._factor = None
+        self._keep = None
+        self._slack_buses = None
+        self._slack_generators = None
+        self._island_of_bus = None
+        self._islanded = None
+        self._ptdf = None
+        self._lodf = None
+        self._source_indexes = None
+
+        self.rebuild()
+
+    # ------------------------------------------------------------------
+    # Topology
+    # ------------------------------------------------------------------
+
+    def _current_source_indexes(self):
+        """Index objects that identify the network topology the arrays were built from"""
+        return (
+            self.network.buses.index,
+            self.network.lines.index,
+            self.network.transformers.index,
+            self.network.generators.index
+        )
+
+    def sync(self):
+        """Rebuild topology arrays if buses, branches or generators were added or removed"""
+        current = self._current_source_indexes()
+        if self._source_indexes is None or any(
+            a is not b for a, b in zip(current, self._source_indexes)
+        ):
+            self.rebuild()
+
+    def rebuild(self):
+        """Read buses and passive branches from the network"""
+        network = self.network
+        previous_status = dict(zip(self.branch_names, self.in_service))
+
+        self.bus_names = network.buses.index
+        bus_v_nom = network.buses.v_nom
+
+        lines = network.lines
+        transformers = network.transformers
+
+        # PyPSA per-unit conventions (see pypsa.pf.calculate_dependent_values)
+        line_v_nom = lines.bus0.map(bus_v_nom).values.astype(float)
+        line_x_pu = lines.x.values.astype(float) / line_v_nom ** 2
+        trafo_x_pu = (
+            transformers.x.values.astype(float) / transformers.s_nom.values.astype(float)
+            * transformers.tap_ratio.values.astype(float)
+        )
+
+        x_pu = np.concatenate([line_x_pu, trafo_x_pu])
+        susceptance = np.divide(1.0, x_pu, out=np.zeros_like(x_pu), where=x_pu != 0)
+
+        phase_shift = np.concatenate([
+            np.zeros(len(lines)),
+            transformers.phase_shift.values.astype(float) * np.pi / 180.0
+        ])
+
+        self.branch_names = lines.index.append(transformers.index)
+        self.branch_component = np.array(
+            ['Line'] * len(lines) + ['Transformer'] * len(transformers), dtype=object
+        )
+        self.bus0 = self.bus_names.get_indexer(
+            np.concatenate([lines.bus0.values, transformers.bus0.values])
+        )
+        self.bus1 = self.bus_names.get_indexer(
+            np.concatenate([lines.bus1.values, transformers.bus1.values])
+        )
+        self.susceptance = susceptance
+        self.branch_shift = -susceptance * phase_shift
+        line_ratings = np.array([
+            self.outage_ratings.get(name, rating)
+            for name, rating in zip(lines.index, lines.s_nom.values.astype(float))
+        ], dtype=float).reshape(-1)
+        self.s_nom = np.concatenate([line_ratings, transformers.s_nom.values.astype(float)])
+
+        # Keep known outages across rebuilds
+        self.in_service = np.array([
+            previous_status.get(name, True) for name in self.branch_names
+        ], dtype=bool)
+
+        self.dirty = np.ones(len(self.bus_names), dtype=bool)
+
+        generators = network.generators
+        self.generator_names = generators.index
+        self.gen_bus = self.bus_names.get_indexer(generators.bus.values)
+        self.gen_is_slack = generators.control.values == "Slack"
+
+        self._source_indexes = self._current_source_indexes()
+        self._invalidate()
+
+    def _invalidate(self):
+        """Drop the factorization and all matrices derived from it"""
+        self._factorized = False
+        self._factor = None
+        self._ptdf = None
+        self._lodf = None
+        self.topology_version += 1
+
+    def set_branch_status(self, branch_name: str, in_service: bool) -> bool:
+        """
+        Switch a branch in or out of service
+
+        Returns:
+            True if the status changed (and the factorization was dropped)
+        """
+        position = self.branch_names.get_loc(branch_name)
+        if self.in_service[position] == in_service:
+            return False
+
+        self.in_service[position] = in_service
+        self._invalidate()
+        return True
+
+    def mark_dirty(self, bus_positions: np.ndarray):
+        """Flag buses whose injections changed (solver bus order)"""
+        bus_positions = np.asarray(bus_positions, dtype=int)
+        self.dirty[bus_positions[bus_positions >= 0]] = True
+
+    def dirty_buses(self) -> List[str]:
+        """Names of buses changed since the last solve"""
+        return list(self.bus_names[self.dirty])
+
+    def out_of_service(self) -> List[str]:
+        """Names of branches currently switched out"""
+        return list(self.branch_names[~self.in_service])
+
+    @property
+    def active(self) -> np.ndarray:
+        """Branches that carry flow in the current topology"""
+        return self.in_service & (self.susceptance != 0)
+
+    def _incidence(self, active: np.ndarray) -> csr_matrix:
+        """Bus x branch incidence matrix (+1 at bus0, -1 at bus1) of active branches"""
+        n_bus = len(self.bus_names)
+        n_branch = len(self.branch_names)
+        branches = np.flatnonzero(active)
+
+        rows = np.concatenate([self.bus0[branches], self.bus1[branches]])
+        cols = np.concatenate([branches, branches])
+        data = np.concatenate([np.ones(len(branches)), -np.ones(len(branches))])
+
+        return csr_matrix((data, (rows, cols)), shape=(n_bus, n_branch))
+
+    def _find_slack_buses(self, island_of_bus: np.ndarray, n_islands: int):
+        """Pick one slack bus per island the way PyPSA does"""
+        gen_bus = self.gen_bus
+
+        # Prefer explicit slack generators, then the first generator on the island
+        preferred = self.gen_is_slack
+        order = np.concatenate([np.flatnonzero(preferred), np.flatnonzero(~preferred)])
+
+        slack_buses = np.full(n_islands, -1, dtype=int)
+        slack_generators = np.full(n_islands, -1, dtype=int)
+        for gen in order:
+            bus = gen_bus[gen]
+            if bus < 0:
+                continue
+            island = island_of_bus[bus]
+            if slack_buses[island] < 0:
+                slack_buses[island] = bus
+                slack_generators[island] = gen
+
+        # Islands without generation: first bus takes the (unservable) slack
+        islanded = np.zeros(len(self.bus_names), dtype=bool)
+        for island in np.flatnonzero(slack_buses < 0):
+            members = np.flatnonzero(island_of_bus == island)
+            slack_buses[island] = members[0]
+            islanded[members] = True
+
+        return slack_buses, slack_generators, islanded
+
+    def factorize(self):
+        """Factorize the reduced susceptance matrix for the current topology"""
+        n_bus = len(self.bus_names)
+        active = self.active
+
+        K = self._incidence(active)
+        b = np.where(active, self.susceptance, 0.0)
+        B = (K.multiply(b) @ K.T).tocsc()
+
+        # Islands from the active branch graph
+        adjacency = csr_matrix(
+            (np.ones(int(active.sum())), (self.bus0[active], self.bus1[active])),
+            shape=(n_bus, n_bus)
+        )
+        n_islands, island_of_bus = connected_components(adjacency, directed=False)
+        slack_buses, slack_generators, islanded = self._find_slack_buses(island_of_bus, n_islands)
+
+        keep = np.ones(n_bus, dtype=bool)
+        keep[slack_buses] = False
+        keep = np.flatnonzero(keep)
+
+        self._keep = keep
+        self._slack_buses = slack_buses
+        self._slack_generators = slack_generators
+        self._island_of_bus = island_of_bus
+        self._islanded = islanded
+        self._K = K
+        self._factor = splu(csc_matrix(B[keep][:, keep])) if len(keep) else None
+        self._factorized = True
+
+    def slack_generators(self) -> List[Optional[str]]:
+        """Slack generator name per island (None for islands without generation)"""
+        if not self._factorized:
+            self.factorize()
+        names = self.generator_names
+        return [names[g] if g >= 0 else None for g in self._slack_generators]
+
+    def fork(self) -> "SparseDCSolver":
+        """
+        Independent solver sharing this one's topology arrays and factorization
+        Branch status and ratings are copied, so switching or re-rating branches
+        on the fork never touches the original. The fork does not follow later
+        changes to the network.
+        """
+        if not self._factorized:
+            self.factorize()
+
+        forked = copy.copy(self)
+        forked.in_service = self.in_service.copy()
+        forked.s_nom = self.s_nom.copy()
+        forked.dirty = self.dirty.copy()
+        forked.network = None
+        return forked
+
+    def __getstate__(self):
+        """Pickle without the network and the (unpicklable) LU factor"""
+        state = self.__dict__.copy()
+        state['network'] = None
+        state['_factor'] = None
+        state['_factorized'] = False
+        return state
+
+    # ------------------------------------------------------------------
+    # Solve
+    # ------------------------------------------------------------------
+
+    def solve(self, injections_mw: np.ndarray) -> DCSolution:
+        """
+        Solve the DC power flow for one or many injection vectors
+
+        Args:
+            injections_mw: Net bus injections (MW), shape (n_bus,) or (n_bus, k)
+
+        Returns:
+            DCSolution with angles and flows in the same shape convention
+        """
+        if not self._factorized:
+            self.factorize()
+
+        p = np.asarray(injections_mw, dtype=float)
+        batched = p.ndim == 2
+        if not batched:
+            p = p[:, None]
+
+        active = self.active
+        p_eff = p - (self._K @ np.where(active, self.branch_shift, 0.0))[:, None]
+
+        theta = np.zeros_like(p)
+        if len(self._keep):
+            theta[self._keep] = self._factor.solve(np.ascontiguousarray(p_eff[self._keep]))
+
+        flows = (
+            self.susceptance[:, None] * (theta[self.bus0] - theta[self.bus1])
+            + self.branch_shift[:, None]
+        )
+        flows[~active] = 0.0
+
+        # Slack buses pick up the island mismatch
+        n_islands = len(self._slack_buses)
+        slack = np.zeros((n_islands, p.shape[1]))
+        for island in range(n_islands):
+            slack[island] = -p[self._island_of_bus == island].sum(axis=0)
+
+        balanced = p.copy()
+        balanced[self._slack_buses] += slack
+
+        if not batched:
+            theta, flows, balanced, slack = theta[:, 0], flows[:, 0], balanced[:, 0], slack[:, 0]
+            self.dirty[:] = False
+
+        return DCSolution(
+            theta=theta,
+            flows_mw=flows,
+            injections_mw=balanced,
+            slack_mw=slack,
+            islanded=self._islanded.copy(),
+            topology_version=self.topology_version
+        )
+
+    # ------------------------------------------------------------------
+    # Sensitivities
+    # ------------------------------------------------------------------
+
+    @property
+    def ptdf(self) -> np.ndarray:
+        """
+        Power transfer distribution factors (branch x bus)
+        Flow change on each branch per MW injected at a bus and withdrawn at its island slack.
+        """
+        if self._ptdf is None:
+            if not self._factorized:
+                self.factorize()
+
+            n_bus = len(self.bus_names)
+            inverse = np.zeros((n_bus, n_bus))
+            if len(self._keep):
+                reduced = self._factor.solve(np.eye(len(self._keep)))
+                inverse[np.ix_(self._keep, self._keep)] = reduced
+
+            ptdf = self.susceptance[:, None] * (inverse[self.bus0] - inverse[self.bus1])
+            ptdf[~self.active] = 0.0
+            self._ptdf = ptdf
+
+        return self._ptdf
+
+    @property
+    def lodf(self) -> np.ndarray:
+        """
+        Line outage distribution factors (branch x outaged branch)
+        Flow change on each branch per MW of pre-outage flow on the outaged branch.
+        Radial (islanding) outages are marked with NaN.
+        """
+        if self._lodf is None:
+            ptdf = self.ptdf
+            n_branch = len(self.branch_names)
+            branches = np.arange(n_branch)
+
+            # PTDF of a transfer from bus0 to bus1 of each branch
+            transfer = ptdf[:, self.bus0] - ptdf[:, self.bus1]
+            own = transfer[branches, branches]
+
+            denominator = 1.0 - own
+            radial = np.abs(denominator) < 1e-9
+            with np.errstate(divide='ignore', invalid='ignore'):
+                lodf = transfer / denominator
+
+            lodf[:, radial] = np.nan
+            lodf[branches, branches] = -1.0
+            lodf[:, ~self.active] = 0.0
+            self._lodf = lodf
+
+        return self._lodf
+
+
+__all__ = ["SparseDCSolver", "DCSolution"]
@@ -0,0 +1,534 @@
+"""
+Manhattan Power Grid - Rolling-Horizon Economic Dispatch
+Builds the multi-period DC dispatch LP once per topology and only rewrites
+its bounds (load forecast, availability, storage state) between solves.
+With highspy the model stays loaded in HiGHS, so every re-solve starts from
+the previous optimal basis; otherwise scipy's bundled HiGHS is used on the
+prebuilt matrices.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from dataclasses import dataclass, field
+from scipy.optimize import linprog
+from typing import Dict, Optional, Any
+
+try:
+    import highspy
+except Exception:
+    highspy = None
+
+
+@dataclass
+class DispatchResult:
+    """Set points over the horizon from one dispatch solve"""
+    success: bool
+    status: str
+    backend: str
+    start: int  # Snapshot position of the first step
+    step_minutes: float
+    generator_mw: pd.DataFrame = field(default_factory=pd.DataFrame)  # step x generator
+    storage_mw: pd.DataFrame = field(default_factory=pd.DataFrame)  # step x unit, >0 discharging
+    soc_mwh: pd.DataFrame = field(default_factory=pd.DataFrame)  # step x unit, end of step
+    load_mw: np.ndarray = field(default_factory=lambda: np.zeros(0))  # Forecast per step
+    shed_mw: np.ndarray = field(default_factory=lambda: np.zeros(0))  # Unserved per step
+    overload_mw: float = 0.0  # Largest branch flow above rating
+    cost: float = 0.0
+    rebuilt: bool = False
+    warm_started: bool = False
+    solve_ms: float = 0.0
+
+    @property
+    def setpoints(self) -> Dict[str, float]:
+        """Generator and storage set points for the current step"""
+        if self.generator_mw.empty:
+            return {}
+        points = self.generator_mw.iloc[0].to_dict()
+        if not self.storage_mw.empty:
+            points.update(self.storage_mw.iloc[0].to_dict())
+        return points
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'success': self.success,
+            'status': self.status,
+            'backend': self.backend,
+            'start': self.start,
+            'step_minutes': self.step_minutes,
+            'setpoints': self.setpoints,
+            'generation_schedule': self.generator_mw.to_dict(orient='list'),
+            'storage_schedule': self.storage_mw.to_dict(orient='list'),
+            'soc_mwh': self.soc_mwh.to_dict(orient='list'),
+            'load_forecast_mw': self.load_mw.tolist(),
+            'load_shed_mw': self.shed_mw.tolist(),
+            'overload_mw': self.overload_mw,
+            'cost': self.cost,
+            'rebuilt': self.rebuilt,
+            'warm_started': self.warm_started,
+            'solve_ms': self.solve_ms
+        }
+
+
+class RollingHorizonDispatch:
+    """
+    Multi-period DC economic dispatch re-solved on a rolling horizon
+    Columns per step: generator output, storage discharge/charge/energy,
+    unserved load per bus, branch overload slack and ramp slack. Branch flows
+    use the PTDF rows of the rated branches, so the structure only changes
+    with the topology. Committable units are relaxed to a zero minimum, the
+    LP relaxation of their commitment.
+    """
+
+    def __init__(
+        self,
+        power_grid,
+        horizon_steps: int = 8,
+        solver: str = "highs",
+        load_shed_cost: float = 10000.0,
+        overload_penalty: float = 1000.0
+    ):
+        self.power_grid = power_grid
+        self.horizon_steps = horizon_steps
+        self.load_shed_cost = load_shed_cost
+        self.overload_penalty = overload_penalty
+        self.backend = "highspy" if solver == "highs" and highspy is not None else "scipy-highs"
+
+        network = power_grid.network
+        freq = pd.tseries.frequencies.to_offset(network.snapshots.freq or "15min")
+        self.step_minutes = pd.Timedelta(freq).total_seconds() / 60.0
+
+        # Daily shapes, captured before the simulation overwrites the operating snapshot
+        self._load_profile = network.loads_t.p_set.copy()
+        self._availability_profile = network.generators_t.p_max_pu.copy()
+
+        # Rolling state: energy in storage and the set points currently in force
+        storage = network.storage_units
+        self.soc_mwh = pd.Series(
+            np.minimum(storage.state_of_charge_initial.values, (storage.max_hours * storage.p_nom).values),
+            index=storage.index, dtype=float
+        )
+        self.previous_mw: Optional[pd.Series] = None
+        self.last_result: Optional[DispatchResult] = None
+
+        self._model = None
+        self._model_key = None
+        self.stats = {'solves': 0, 'rebuilds': 0, 'warm_solves': 0, 'total_solve_ms': 0.0}
+
+    # ------------------------------------------------------------------ #
+    # Model structure (rebuilt only when the topology changes)
+    # ------------------------------------------------------------------ #
+
+    def _structure_key(self):
+        solver = self.power_grid.dc_solver
+        network = self.power_grid.network
+        rated = solver.active & (solver.s_nom > 0)
+        return (
+            solver.topology_version, rated.tobytes(), self.horizon_steps,
+            tuple(network.generators.index), tuple(network.storage_units.index)
+        )
+
+    def _build(self):
+        """Assemble the constraint matrix; bounds are filled in per solve"""
+
+        grid = self.power_grid
+        network = grid.network
+        solver = grid.dc_solver
+        generators = network.generators
+        storage = network.storage_units
+
+        H = self.horizon_steps
+        dt = self.step_minutes / 60.0
+        bus_names = solver.bus_names
+        branches = np.flatnonzero(solver.active & (solver.s_nom > 0))
+        ramp_up = generators.ramp_limit_up.values.astype(float)
+        ramp_down = generators.ramp_limit_down.values.astype(float)
+        ramped = np.flatnonzero(np.isfinite(ramp_up) | np.isfinite(ramp_down))
+
+        G, S, N, L, R = len(generators), len(storage), len(bus_names), len(branches), len(ramped)
+        gen_bus = bus_names.get_indexer(generators.bus.values)
+        sto_bus = bus_names.get_indexer(storage.bus.values)
+
+        # Column offsets within one step
+        offsets = np.cumsum([0, G, S, S, S, N, L, R])
+        p, d, c, e, shed, fs, rs, width = offsets
+        n_col = H * width
+
+        # Row offsets within one step, then the terminal storage rows
+        row_offsets = np.cumsum([0, 1, L, L, S, R, R])
+        bal, f_up, f_lo, soc, r_up, r_lo, height = row_offsets
+        cyclic = np.flatnonzero(storage.cyclic_state_of_charge.values.astype(bool))
+        n_row = H * height + len(cyclic)
+
+        ptdf = solver.ptdf[branches]
+        rows, cols, vals = [], [], []
+
+        def add(r, col, v):
+            r, col, v = np.broadcast_arrays(np.asarray(r), np.asarray(col), np.asarray(v, dtype=float))
+            rows.append(r.ravel())
+            cols.append(col.ravel())
+            vals.append(v.ravel())
+
+        # Branch sensitivity of each injecting column
+        blocks = [
+            (p, ptdf[:, gen_bus], 1.0),
+            (d, ptdf[:, sto_bus], 1.0),
+            (c, ptdf[:, sto_bus], -1.0),
+            (shed, ptdf, 1.0)
+        ]
+
+        for t in range(H):
+            col0, row0 = t * width, t * height
+
+            # Power balance: generation + discharge - charge + unserved = load
+            add(row0 + bal, col0 + p + np.arange(G), 1.0)
+            add(row0 + bal, col0 + d + np.arange(S), 1.0)
+            add(row0 + bal, col0 + c + np.arange(S), -1.0)
+            add(row0 + bal, col0 + shed + np.arange(N), 1.0)
+
+            # Branch limits with overload slack, both directions
+            for start, sensitivity, sign in blocks:
+                k = sensitivity.shape[1]
+                r, col = np.meshgrid(np.arange(L), np.arange(k), indexing='ij')
+                add(row0 + f_up + r, col0 + start + col, sign * sensitivity)
+                add(row0 + f_lo + r, col0 + start + col, sign * sensitivity)
+            add(row0 + f_up + np.arange(L), col0 + fs + np.arange(L), -1.0)
+            add(row0 + f_lo + np.arange(L), col0 + fs + np.arange(L), 1.0)
+
+            # Storage energy: e_t - e_{t-1} - eff_store*dt*c + dt/eff_dispatch*d = 0
+            add(row0 + soc + np.arange(S), col0 + e + np.arange(S), 1.0)
+            add(row0 + soc + np.arange(S), col0 + c + np.arange(S), -storage.efficiency_store.values * dt)
+            add(row0 + soc + np.arange(S), col0 + d + np.arange(S), dt / storage.efficiency_dispatch.values)
+            if t > 0:
+                add(row0 + soc + np.arange(S), col0 - width + e + np.arange(S), -1.0)
+
+            # Ramping between steps (step 0 against the set points in force), soft
+            add(row0 + r_up + np.arange(R), col0 + p + ramped, 1.0)
+            add(row0 + r_lo + np.arange(R), col0 + p + ramped, 1.0)
+            add(row0 + r_up + np.arange(R), col0 + rs + np.arange(R), -1.0)
+            add(row0 + r_lo + np.arange(R), col0 + rs + np.arange(R), 1.0)
+            if t > 0:
+                add(row0 + r_up + np.arange(R), col0 - width + p + ramped, -1.0)
+                add(row0 + r_lo + np.arange(R), col0 - width + p + ramped, -1.0)
+
+        # Cyclic units end the horizon with at least the energy they started with
+        add(H * height + np.arange(len(cyclic)), (H - 1) * width + e + cyclic, 1.0)
+
+        A = sp.csc_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(n_row, n_col)
+        )
+
+        cost = np.zeros(width)
+        cost[p:p + G] = generators.marginal_cost.values * dt
+        cost[d:d + S] = storage.marginal_cost.values * dt
+        cost[shed:shed + N] = self.load_shed_cost * dt
+        cost[fs:fs + L] = self.overload_penalty
+        cost[rs:rs + R] = self.overload_penalty
+
+        self._model = {
+            'A': A, 'cost': np.tile(cost, H), 'H': H, 'width': width, 'height': height,
+            'offsets': dict(p=p, d=d, c=c, e=e, shed=shed, fs=fs, rs=rs),
+            'rows': dict(bal=bal, f_up=f_up, f_lo=f_lo, soc=soc, r_up=r_up, r_lo=r_lo),
+            'sizes': dict(G=G, S=S, N=N, L=L, R=R),
+            'ptdf': ptdf, 'branches': branches, 'ramped': ramped, 'cyclic': cyclic,
+            'ramp_up': ramp_up[ramped], 'ramp_down': ramp_down[ramped],
+            'load_bus': bus_names.get_indexer(network.loads.bus.values),
+            'highs': None, 'solved': False
+        }
+
+        if self.backend == "highspy":
+            self._model['highs'] = self._load_highs(A, self._model['cost'])
+        else:
+            self._model.update(self._split_rows(A, n_row))
+
+        self.stats['rebuilds'] += 1
+
+    def _load_highs(self, A: sp.csc_matrix, cost: np.ndarray):
+        """Pass the model to HiGHS once; later solves only change bounds"""
+
+        n_row, n_col = A.shape
+        lp = highspy.HighsLp()
+        lp.num_col_ = n_col
+        lp.num_row_ = n_row
+        lp.col_cost_ = cost
+        lp.col_lower_ = np.zeros(n_col)
+        lp.col_upper_ = np.full(n_col, highspy.kHighsInf)
+        lp.row_lower_ = np.full(n_row, -highspy.kHighsInf)
+        lp.row_upper_ = np.full(n_row, highspy.kHighsInf)
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = A.indptr
+        lp.a_matrix_.index_ = A.indices
+        lp.a_matrix_.value_ = A.data
+
+        highs = highspy.Highs()
+        highs.setOptionValue("output_flag", False)
+        highs.passModel(lp)
+        return highs
+
+    def _split_rows(self, A: sp.csc_matrix, n_row: int) -> Dict[str, Any]:
+        """Equality / upper / lower row blocks for scipy (fixed per structure)"""
+
+        m = self._model
+        H, height = m['H'], m['height']
+        r, sizes = m['rows'], m['sizes']
+
+        eq, upper, lower = [], [], []
+        for t in range(H):
+            row0 = t * height
+            eq.extend([row0 + r['bal']] + list(row0 + r['soc'] + np.arange(sizes['S'])))
+            upper.extend(row0 + r['f_up'] + np.arange(sizes['L']))
+            upper.extend(row0 + r['r_up'] + np.arange(sizes['R']))
+            lower.extend(row0 + r['f_lo'] + np.arange(sizes['L']))
+            lower.extend(row0 + r['r_lo'] + np.arange(sizes['R']))
+        lower.extend(H * height + np.arange(len(m['cyclic'])))
+
+        eq, upper, lower = (np.asarray(rows, dtype=int) for rows in (eq, upper, lower))
+        A = A.tocsr()
+        return {
+            'eq_rows': eq, 'upper_rows': upper, 'lower_rows': lower,
+            'A_eq': A[eq], 'A_ub': sp.vstack([A[upper], -A[lower]]).tocsr()
+        }
+
+    # ------------------------------------------------------------------ #
+    # Per-solve parameters
+    # ------------------------------------------------------------------ #
+
+    def forecast_loads(self, start: int) -> np.ndarray:
+        """Load forecast (step x load, MW): current values shaped by the daily profile"""
+
+        grid = self.power_grid
+        current = grid.get_loads()
+        forecast = np.tile(current.values, (self.horizon_steps, 1))
+
+        profile = self._load_profile
+        columns = current.index.intersection(profile.columns)
+        if len(columns) and len(profile):
+            positions = (start + np.arange(self.horizon_steps)) % len(profile)
+            shape = profile[columns].values
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = shape[positions] / shape[positions[0]]
+            ratio = np.where(np.isfinite(ratio), ratio, 1.0)
+            forecast[:, current.index.get_indexer(columns)] *= ratio
+
+        return np.clip(forecast, 0.0, None)
+
+    def _availability(self, start: int) -> np.ndarray:
+        """Per-unit availability (step x generator)"""
+
+        generators = self.power_grid.network.generators
+        available = np.tile(generators.p_max_pu.values.astype(float), (self.horizon_steps, 1))
+
+        profile = self._availability_profile
+        columns = generators.index.intersection(profile.columns)
+        if len(columns) and len(profile):
+            positions = (start + np.arange(self.horizon_steps)) % len(profile)
+            available[:, generators.index.get_indexer(columns)] = profile[columns].values[positions]
+
+        return available
+
+    def _bounds(self, start: int):
+        """Column and row bounds for the current state and forecast"""
+
+        grid = self.power_grid
+        network = grid.network
+        generators = network.generators
+        storage = network.storage_units
+        m = self._model
+        o, r, z = m['offsets'], m['rows'], m['sizes']
+        H, width, height = m['H'], m['width'], m['height']
+
+        loads = self.forecast_loads(start)
+        bus_load = np.zeros((H, z['N']))
+        for t in range(H):
+            bus_load[t] = np.bincount(m['load_bus'], weights=loads[t], minlength=z['N'])
+
+        p_nom = generators.p_nom.values.astype(float)
+        p_min = np.where(
+            generators.committable.values.astype(bool), 0.0,
+            np.clip(generators.p_min_pu.values.astype(float), 0.0, None) * p_nom
+        )
+        p_max = self._availability(start) * p_nom
+
+        s_nom = storage.p_nom.values.astype(float)
+        discharge_max = np.clip(storage.p_max_pu.values.astype(float), 0.0, None) * s_nom
+        charge_max = np.clip(-storage.p_min_pu.values.astype(float), 0.0, None) * s_nom
+        energy_max = storage.max_hours.values.astype(float) * s_nom
+        soc0 = np.minimum(self.soc_mwh.reindex(storage.index).fillna(0.0).values, energy_max)
+
+        col_lower = np.zeros(H * width)
+        col_upper = np.full(H * width, np.inf)
+        for t in range(H):
+            col0 = t * width
+            col_lower[col0 + o['p']:col0 + o['p'] + z['G']] = np.minimum(p_min, p_max[t])
+            col_upper[col0 + o['p']:col0 + o['p'] + z['G']] = p_max[t]
+            col_upper[col0 + o['d']:col0 + o['d'] + z['S']] = discharge_max
+            col_upper[col0 + o['c']:col0 + o['c'] + z['S']] = charge_max
+            col_upper[col0 + o['e']:col0 + o['e'] + z['S']] = energy_max
+            col_upper[col0 + o['shed']:col0 + o['shed'] + z['N']] = bus_load[t]
+
+        n_row = m['A'].shape[0]
+        row_lower = np.full(n_row, -np.inf)
+        row_upper = np.full(n_row, np.inf)
+        rating = grid.dc_solver.s_nom[m['branches']]
+        previous = None
+        if self.previous_mw is not None:
+            previous = self.previous_mw.reindex(generators.index).values[m['ramped']]
+
+        for t in range(H):
+            row0 = t * height
+            row_lower[row0 + r['bal']] = row_upper[row0 + r['bal']] = bus_load[t].sum()
+
+            # PTDF rows: sensitivity . x <= rating + PTDF . load (loads withdraw)
+            withdrawn = m['ptdf'] @ bus_load[t]
+            row_upper[row0 + r['f_up']:row0 + r['f_up'] + z['L']] = rating + withdrawn
+            row_lower[row0 + r['f_lo']:row0 + r['f_lo'] + z['L']] = -rating + withdrawn
+
+            soc_rows = slice(row0 + r['soc'], row0 + r['soc'] + z['S'])
+            row_lower[soc_rows] = row_upper[soc_rows] = soc0 if t == 0 else 0.0
+
+            up = m['ramp_up'] * p_nom[m['ramped']]
+            down = m['ramp_down'] * p_nom[m['ramped']]
+            if t == 0:
+                if previous is None:
+                    continue
+                up, down = up + previous, previous - down
+            row_upper[row0 + r['r_up']:row0 + r['r_up'] + z['R']] = np.where(np.isfinite(up), up, np.inf)
+            row_lower[row0 + r['r_lo']:row0 + r['r_lo'] + z['R']] = np.where(np.isfinite(down), -down if t else down, -np.inf)
+
+        row_lower[H * height:] = soc0[m['cyclic']]
+
+        return col_lower, col_upper, row_lower, row_upper, loads
+
+    # ------------------------------------------------------------------ #
+    # Solve
+    # ------------------------------------------------------------------ #
+
+    def advance(self, minutes: float):
+        """
+        Carry the rolling state forward by the time the last set points were in force
+        Storage energy moves along the first step of the last solution.
+        """
+        result = self.last_result
+        if result is None or not result.success or result.soc_mwh.empty:
+            return
+
+        fraction = min(max(minutes / self.step_minutes, 0.0), 1.0)
+        target = result.soc_mwh.iloc[0]
+        current = self.soc_mwh.reindex(target.index).fillna(0.0)
+        self.soc_mwh.loc[target.index] = current + fraction * (target - current)
+
+    def solve(self, start: int = 0) -> DispatchResult:
+        """
+        Dispatch over the horizon starting at a snapshot position
+
+        Args:
+            start: Snapshot position (time of day) of the first step
+
+        Returns:
+            DispatchResult; its first step becomes the set points in force
+        """
+        t0 = time.perf_counter()
+        grid = self.power_grid
+        grid.dc_solver.sync()
+
+        rebuilt = False
+        key = self._structure_key()
+        if self._model is None or key != self._model_key:
+            self._build()
+            self._model_key = key
+            rebuilt = True
+
+        m = self._model
+        col_lower, col_upper, row_lower, row_upper, loads = self._bounds(start)
+        warm = m['solved'] and self.backend == "highspy"
+
+        if self.backend == "highspy":
+            x, success, status = self._solve_highs(col_lower, col_upper, row_lower, row_upper)
+        else:
+            x, success, status = self._solve_scipy(col_lower, col_upper, row_lower, row_upper)
+
+        result = DispatchResult(
+            success=success, status=status, backend=self.backend, start=start,
+            step_minutes=self.step_minutes, load_mw=loads.sum(axis=1),
+            rebuilt=rebuilt, warm_started=warm
+        )
+
+        if success:
+            m['solved'] = True
+            network = grid.network
+            o, z = m['offsets'], m['sizes']
+            steps = x.reshape(m['H'], m['width'])
+
+            def block(name, size):
+                values = steps[:, o[name]:o[name] + size]
+                return np.where(np.abs(values) < 1e-7, 0.0, values)
+
+            result.generator_mw = pd.DataFrame(block('p', z['G']), columns=network.generators.index)
+            result.storage_mw = pd.DataFrame(
+                block('d', z['S']) - block('c', z['S']), columns=network.storage_units.index
+            )
+            result.soc_mwh = pd.DataFrame(block('e', z['S']), columns=network.storage_units.index)
+            result.shed_mw = block('shed', z['N']).sum(axis=1)
+            overload = block('fs', z['L'])
+            result.overload_mw = float(overload.max()) if overload.size else 0.0
+            result.cost = float(m['cost'] @ x)
+
+            self.previous_mw = result.generator_mw.iloc[0]
+
+        result.solve_ms = (time.perf_counter() - t0) * 1000
+        self.last_result = result
+        self.stats['solves'] += 1
+        self.stats['warm_solves'] += int(warm)
+        self.stats['total_solve_ms'] += result.solve_ms
+        return result
+
+    def _solve_highs(self, col_lower, col_upper, row_lower, row_upper):
+        highs = self._model['highs']
+        inf = highspy.kHighsInf
+        n_col, n_row = len(col_lower), len(row_lower)
+
+        # Bound changes keep the loaded model and its basis for the warm start
+        highs.changeColsBounds(
+            n_col, np.arange(n_col, dtype=np.int32),
+            col_lower, np.where(np.isinf(col_upper), inf, col_upper)
+        )
+        highs.changeRowsBounds(
+            n_row, np.arange(n_row, dtype=np.int32),
+            np.where(np.isinf(row_lower), -inf, row_lower),
+            np.where(np.isinf(row_upper), inf, row_upper)
+        )
+        highs.run()
+
+        status = highs.getModelStatus()
+        success = status == highspy.HighsModelStatus.kOptimal
+        x = np.asarray(highs.getSolution().col_value) if success else None
+        return x, success, highs.modelStatusToString(status)
+
+    def _solve_scipy(self, col_lower, col_upper, row_lower, row_upper):
+        m = self._model
+        b_ub = np.concatenate([row_upper[m['upper_rows']], -row_lower[m['lower_rows']]])
+        bounded = np.isfinite(b_ub)  # Unbounded ramp rows (no set points yet) drop out
+
+        result = linprog(
+            m['cost'],
+            A_ub=m['A_ub'][bounded],
+            b_ub=b_ub[bounded],
+            A_eq=m['A_eq'],
+            b_eq=row_lower[m['eq_rows']],
+            bounds=np.column_stack([col_lower, col_upper]),
+            method="highs"
+        )
+        return (result.x if result.success else None), bool(result.success), result.message
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['backend'] = self.backend
+        stats['horizon_steps'] = self.horizon_steps
+        stats['step_minutes'] = self.step_minutes
+        stats['average_solve_ms'] = stats['total_solve_ms'] / stats['solves'] if stats['solves'] else 0.0
+        return stats
+
+
+__all__ = ["RollingHorizonDispatch", "DispatchResult"]
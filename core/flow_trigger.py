@@ -0,0 +1,134 @@
+"""
+Manhattan Power Grid - Event-Driven Power Flow Triggering
+Decides when the operating point has moved enough to need a new power flow.
+Injections are compared bus by bus against the last solved state, so local
+changes are caught even when they cancel out in the system total.
+"""
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Mapping
+
+
+@dataclass
+class TriggerDecision:
+    """Outcome of a trigger check"""
+    solve: bool
+    reason: str  # initial, topology, bus_change, staleness or suppressed
+    changed_buses: List[str] = field(default_factory=list)
+    max_delta_mw: float = 0.0
+    age_s: float = 0.0
+
+
+class PowerFlowTrigger:
+    """
+    Per-bus deadband and maximum staleness policy for power flow solves
+    A solve is requested when any bus injection moved past its deadband since
+    the last solve, when the topology changed, or when the last solve is older
+    than the staleness limit.
+    """
+
+    def __init__(
+        self,
+        deadband_mw: float = 0.05,
+        bus_deadbands_mw: Optional[Mapping[str, float]] = None,
+        max_staleness_s: float = 5.0
+    ):
+        self.deadband_mw = deadband_mw
+        self.bus_deadbands_mw = dict(bus_deadbands_mw or {})
+        self.max_staleness_s = max_staleness_s
+
+        self._bus_names = None
+        self._deadbands = None
+        self._solved_injections = None
+        self._solved_topology = None
+        self._solved_at = None
+
+        self.stats = {
+            'checks': 0,
+            'triggered': 0,
+            'suppressed': 0,
+            'triggered_by': {'initial': 0, 'topology': 0, 'bus_change': 0, 'staleness': 0}
+        }
+
+    def _deadbands_for(self, bus_names: pd.Index) -> np.ndarray:
+        """Deadband per bus in solver order (rebuilt when the bus set changes)"""
+        if self._bus_names is not bus_names:
+            deadbands = np.full(len(bus_names), self.deadband_mw, dtype=float)
+            for bus, deadband in self.bus_deadbands_mw.items():
+                position = bus_names.get_indexer([bus])[0]
+                if position >= 0:
+                    deadbands[position] = deadband
+            self._bus_names = bus_names
+            self._deadbands = deadbands
+        return self._deadbands
+
+    def set_bus_deadband(self, bus: str, deadband_mw: float):
+        """Override the deadband of one bus"""
+        self.bus_deadbands_mw[bus] = deadband_mw
+        self._bus_names = None
+
+    def check(
+        self,
+        injections_mw: np.ndarray,
+        bus_names: pd.Index,
+        topology_version: int,
+        now_s: float
+    ) -> TriggerDecision:
+        """
+        Decide whether the current injections need a new solve
+
+        Args:
+            injections_mw: Net bus injections (MW) in solver bus order
+            bus_names: Solver bus order
+            topology_version: DC kernel topology version
+            now_s: Simulation clock (seconds)
+        """
+        self.stats['checks'] += 1
+        deadbands = self._deadbands_for(bus_names)
+
+        if self._solved_injections is None or len(self._solved_injections) != len(injections_mw):
+            decision = TriggerDecision(True, 'initial')
+        elif topology_version != self._solved_topology:
+            decision = TriggerDecision(True, 'topology', age_s=now_s - self._solved_at)
+        else:
+            delta = np.abs(injections_mw - self._solved_injections)
+            changed = delta > deadbands
+            age = now_s - self._solved_at
+
+            if changed.any():
+                decision = TriggerDecision(
+                    True, 'bus_change', list(bus_names[changed]), float(delta.max()), age
+                )
+            elif age >= self.max_staleness_s or age < 0:
+                # A negative age means the clock was restarted since the solve
+                decision = TriggerDecision(True, 'staleness', max_delta_mw=float(delta.max()), age_s=age)
+            else:
+                decision = TriggerDecision(False, 'suppressed', max_delta_mw=float(delta.max()), age_s=age)
+
+        if decision.solve:
+            self.stats['triggered'] += 1
+            self.stats['triggered_by'][decision.reason] += 1
+        else:
+            self.stats['suppressed'] += 1
+
+        return decision
+
+    def record_solve(self, injections_mw: np.ndarray, topology_version: int, now_s: float):
+        """Remember the state a power flow was solved for"""
+        self._solved_injections = np.array(injections_mw, dtype=float)
+        self._solved_topology = topology_version
+        self._solved_at = now_s
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['triggered_by'] = dict(self.stats['triggered_by'])
+        checks = stats['checks']
+        stats['suppression_rate'] = stats['suppressed'] / checks if checks else 0.0
+        stats['deadband_mw'] = self.deadband_mw
+        stats['max_staleness_s'] = self.max_staleness_s
+        return stats
+
+
+__all__ = ["PowerFlowTrigger", "TriggerDecision"]
@@ -0,0 +1,128 @@
+"""
+Manhattan Power Grid - Polyline Geometry Codec
+Compact encodings for the cable and road polylines sent by the API. Points
+are quantized (1e-6 degrees by default, about 0.1 m) and delta-encoded
+within each polyline, then written either as encoded-polyline strings
+(the Google algorithm at configurable precision, "polyline6") or as one
+binary blob of int32 deltas for typed-array clients. Coordinate pairs are
+encoded in the order given, so [lon, lat] paths decode to [lon, lat].
+"""
+
+import numpy as np
+from typing import List, Sequence, Tuple
+
+DEFAULT_PRECISION = 6
+
+BLOB_MAGIC = b"PLY1"
+_HEADER = np.dtype([('magic', 'S4'), ('precision', '<u4'), ('count', '<u4')])
+
+
+def _coordinates(paths: Sequence[Sequence[Sequence[float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Point offsets of each path (count + 1) and the stacked coordinates"""
+    lengths = np.fromiter((len(path) for path in paths), dtype=np.int64, count=len(paths))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    if offsets[-1] == 0:
+        return offsets, np.zeros((0, 2))
+    return offsets, np.concatenate([np.asarray(path, dtype=float).reshape(-1, 2) for path in paths if len(path)])
+
+
+def _deltas(paths: Sequence[Sequence[Sequence[float]]], precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantized coordinates, delta-encoded per path (first point absolute)"""
+    offsets, coords = _coordinates(paths)
+    quantized = np.round(coords * 10 ** precision).astype(np.int64)
+    deltas = np.diff(quantized, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+
+    starts = offsets[:-1][offsets[:-1] < offsets[1:]]
+    deltas[starts] = quantized[starts]
+    return offsets, deltas
+
+
+def encode_polylines(
+    paths: Sequence[Sequence[Sequence[float]]],
+    precision: int = DEFAULT_PRECISION
+) -> List[str]:
+    """Encode many polylines in one vectorized pass"""
+
+    offsets, deltas = _deltas(paths, precision)
+    if len(deltas) == 0:
+        return [''] * len(paths)
+
+    # Zigzag sign folding, then 5-bit chunks with a continuation flag
+    values = deltas.ravel()
+    folded = ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+    shifts = np.arange(13, dtype=np.uint64) * np.uint64(5)
+    chunks = (folded[:, None] >> shifts) & np.uint64(31)
+    n_chunks = 1 + np.count_nonzero((folded[:, None] >> shifts[1:]) > 0, axis=1)
+
+    positions = np.arange(len(shifts))
+    chars = chunks + np.uint64(63)
+    chars[positions < (n_chunks - 1)[:, None]] += np.uint64(0x20)
+    text = chars[positions < n_chunks[:, None]].astype(np.uint8).tobytes().decode('ascii')
+
+    # Character span of each path: two values per point
+    char_ends = np.concatenate([[0], np.cumsum(n_chunks)])[offsets * 2]
+    return [text[start:end] for start, end in zip(char_ends[:-1].tolist(), char_ends[1:].tolist())]
+
+
+def encode_polyline(path: Sequence[Sequence[float]], precision: int = DEFAULT_PRECISION) -> str:
+    """Encode one polyline"""
+    return encode_polylines([path], precision)[0]
+
+
+def decode_polyline(encoded: str, precision: int = DEFAULT_PRECISION) -> List[List[float]]:
+    """Decode an encoded-polyline string into coordinate pairs"""
+
+    values, value, shift = [], 0, 0
+    for char in encoded:
+        chunk = ord(char) - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+
+    if len(values) % 2:
+        raise ValueError("Encoded polyline has an odd number of values")
+
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0)
+    return (coords / 10 ** precision).tolist()
+
+
+def pack_polylines(
+    paths: Sequence[Sequence[Sequence[float]]],
+    precision: int = DEFAULT_PRECISION
+) -> bytes:
+    """
+    Binary typed-array blob of many polylines
+
+    Layout (little-endian): magic, uint32 precision, uint32 count,
+    uint32 point offsets (count + 1), int32 deltas (2 per point).
+    """
+    offsets, deltas = _deltas(paths, precision)
+    header = np.array([(BLOB_MAGIC, precision, len(paths))], dtype=_HEADER)
+    return header.tobytes() + offsets.astype('<u4').tobytes() + deltas.astype('<i4').tobytes()
+
+
+def unpack_polylines(blob: bytes) -> List[np.ndarray]:
+    """Polylines of a pack_polylines blob as (n, 2) float arrays"""
+
+    header = np.frombuffer(blob, dtype=_HEADER, count=1)[0]
+    if header['magic'] != BLOB_MAGIC:
+        raise ValueError("Not a packed polyline blob")
+
+    count, precision = int(header['count']), int(header['precision'])
+    offsets = np.frombuffer(blob, dtype='<u4', count=count + 1, offset=_HEADER.itemsize).astype(np.int64)
+    deltas = np.frombuffer(blob, dtype='<i4', offset=_HEADER.itemsize + 4 * (count + 1)).reshape(-1, 2)
+
+    scale = 10 ** precision
+    return [
+        np.cumsum(deltas[start:end], axis=0, dtype=np.int64) / scale
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+__all__ = [
+    "encode_polylines", "encode_polyline", "decode_polyline",
+    "pack_polylines", "unpack_polylines", "DEFAULT_PRECISION"
+]
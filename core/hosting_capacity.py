@@ -0,0 +1,166 @@
+"""
+Manhattan Power Grid - EV Hosting Capacity
+Closed-form maximum extra charging load per bus from the DC sensitivity
+matrices: PTDF for the intact network (N-0) and PTDF + LODF for every
+single branch outage (N-1). No trial power flows are needed.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Any
+
+
+def _limits(flows: np.ndarray, sensitivity: np.ndarray, rating: np.ndarray) -> np.ndarray:
+    """
+    Largest x >= 0 with |flows + sensitivity * x| <= rating, per branch and bus
+
+    Args:
+        flows: Base flows (branch,) or (branch, outage)
+        sensitivity: Flow change per MW of extra load, same leading shape plus bus axis
+        rating: Branch ratings broadcastable to flows
+
+    Returns:
+        Headroom in MW with the sensitivity's shape (inf where it does not bind)
+    """
+    flows = flows[..., None]
+    rating = rating[..., None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upward = (rating - flows) / sensitivity
+        downward = (-rating - flows) / sensitivity
+
+    limit = np.where(sensitivity > 1e-9, upward, np.where(sensitivity < -1e-9, downward, np.inf))
+
+    # Branches already over their limit leave no headroom
+    overloaded = np.abs(flows) > rating
+    limit = np.where(overloaded & (np.abs(sensitivity) > 1e-9), 0.0, limit)
+    return np.clip(limit, 0.0, None)
+
+
+class HostingCapacityAnalyzer:
+    """
+    Hosting capacity per bus under N-0 and N-1 branch limits
+    Results are cached per topology version and operating point.
+    """
+
+    def __init__(self, power_grid, injection_tolerance_mw: float = 0.1):
+        self.power_grid = power_grid
+        self.injection_tolerance_mw = injection_tolerance_mw
+        self._cache = {}
+
+    def analyze(
+        self,
+        buses: Optional[List[str]] = None,
+        n_minus_1: bool = False,
+        rating_factor: float = 1.0
+    ) -> Dict[str, Any]:
+        """
+        Maximum extra load each bus can take before a branch limit binds
+
+        Args:
+            buses: Buses to analyze (default: all 13.8kV distribution buses)
+            n_minus_1: Also require every single branch outage to stay within limits
+            rating_factor: Post-contingency rating as a multiple of s_nom
+
+        Returns:
+            Capacity and binding branch (and outage) per bus
+        """
+        grid = self.power_grid
+        solver = grid.dc_solver
+        solver.sync()
+
+        bus_names = solver.bus_names
+        if buses is None:
+            buses = [bus for bus in bus_names if bus.endswith("_13.8kV")]
+        positions = bus_names.get_indexer(buses)
+
+        injections, _ = grid._nodal_injections()
+        key = (
+            solver.topology_version,
+            np.round(injections / self.injection_tolerance_mw).astype(np.int64).tobytes(),
+            tuple(buses), n_minus_1, rating_factor
+        )
+        if key in self._cache:
+            return self._cache[key]
+
+        flows = solver.solve(injections).flows_mw
+        rated = solver.active & (solver.s_nom > 0)
+        rating = np.where(rated, solver.s_nom, np.inf)
+
+        # Extra load at a bus is withdrawn there and supplied by its island slack
+        sensitivity = -solver.ptdf[:, positions]
+        sensitivity[~rated] = 0.0
+
+        n0 = _limits(flows, sensitivity, rating)
+        n0_capacity = n0.min(axis=0)
+        n0_binding = n0.argmin(axis=0)
+
+        result_buses = {}
+        for column, bus in enumerate(buses):
+            binding = n0_binding[column] if np.isfinite(n0_capacity[column]) else None
+            result_buses[bus] = {
+                'n0_capacity_mw': float(n0_capacity[column]),
+                'n0_binding_branch': solver.branch_names[binding] if binding is not None else None
+            }
+
+        skipped = []
+        if n_minus_1:
+            lodf = solver.lodf
+            outages = np.flatnonzero(solver.active)
+            radial = np.isnan(lodf[:, outages]).any(axis=0)
+            skipped = list(solver.branch_names[outages[radial]])
+            outages = outages[~radial]
+
+            # Post-outage flows and sensitivities: f + LODF[:, m] f_m, S + LODF[:, m] S_m
+            post_flows = flows[:, None] + lodf[:, outages] * flows[outages][None, :]
+            post_sensitivity = (
+                sensitivity[:, None, :]
+                + lodf[:, outages][:, :, None] * sensitivity[outages][None, :, :]
+            )
+            post_rating = np.repeat((rating * rating_factor)[:, None], len(outages), axis=1)
+            post_rating[outages, np.arange(len(outages))] = np.inf  # Outaged branch carries nothing
+            post_sensitivity[outages, np.arange(len(outages))] = 0.0
+
+            n1 = _limits(post_flows, post_sensitivity, post_rating)  # branch x outage x bus
+            flat = n1.reshape(-1, len(buses))
+            n1_capacity = np.minimum(flat.min(axis=0), n0_capacity)
+            binding = flat.argmin(axis=0)
+
+            for column, bus in enumerate(buses):
+                entry = result_buses[bus]
+                branch, outage = np.unravel_index(binding[column], n1.shape[:2])
+                if flat[binding[column], column] > n0_capacity[column]:
+                    # The intact network binds first
+                    branch_name, outage_name = entry['n0_binding_branch'], None
+                elif np.isfinite(n1_capacity[column]):
+                    branch_name = solver.branch_names[branch]
+                    outage_name = solver.branch_names[outages[outage]]
+                else:
+                    branch_name, outage_name = None, None
+
+                entry.update({
+                    'n1_capacity_mw': float(n1_capacity[column]),
+                    'n1_binding_branch': branch_name,
+                    'n1_binding_outage': outage_name
+                })
+
+        result = {
+            'topology_version': solver.topology_version,
+            'n_minus_1': n_minus_1,
+            'skipped_radial_outages': skipped,
+            'buses': result_buses
+        }
+
+        self._cache = {key: result}
+        return result
+
+    def report(self, n_minus_1: bool = True) -> pd.DataFrame:
+        """Hosting capacity table, one row per bus, smallest capacity first"""
+        result = self.analyze(n_minus_1=n_minus_1)
+        table = pd.DataFrame.from_dict(result['buses'], orient='index')
+        table.index.name = 'bus'
+        sort_column = 'n1_capacity_mw' if n_minus_1 else 'n0_capacity_mw'
+        return table.sort_values(sort_column)
+
+
+__all__ = ["HostingCapacityAnalyzer"]
@@ -0,0 +1,144 @@
+"""
+Manhattan Power Grid - Compiled Network Cache
+Stores the deterministic result of a topology build as one binary artifact:
+a JSON header followed by 64-byte aligned arrays. The artifact is keyed by
+the hashes of its input files, and loading memory-maps the arrays instead of
+parsing or rebuilding anything.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+MAGIC = b"MHGRIDC1"
+ALIGNMENT = 64
+
+
+def write_arrays(path: Union[str, Path], arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """
+    Write arrays and JSON metadata to one file (atomically replaced)
+
+    Layout: MAGIC, uint64 header length, JSON header, aligned array payloads.
+    """
+    path = Path(path)
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Offsets are relative to the payload start, so the header can be sized afterwards
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        if array.dtype.hasobject:
+            raise TypeError(f"Array {name} has object dtype and cannot be memory-mapped")
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = json.dumps({'arrays': entries, 'meta': meta}).encode()
+    payload_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(payload_start + entries[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(payload_start + offset)
+    os.replace(tmp, path)
+
+
+def read_arrays(path: Union[str, Path]) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Memory-map the arrays of a file written by write_arrays (read-only views)"""
+
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compiled network artifact")
+        header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_length))
+
+    payload_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        count = int(np.prod(entry['shape'])) if entry['shape'] else 1
+        start = payload_start + entry['offset']
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry['shape'])
+
+    return arrays, header['meta']
+
+
+class CompiledNetworkCache:
+    """
+    Content-addressed cache of one compiled artifact
+    The key covers the input files' bytes and a format/version string, so
+    editing the signal dataset or the builder invalidates it automatically.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        name: str,
+        inputs: Iterable[Union[str, Path]],
+        version: str = ""
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.name = name
+        self.inputs = [Path(p) for p in inputs]
+        self.version = version
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0}
+
+    def key(self) -> Optional[str]:
+        """Hash of the inputs (None if an input is missing)"""
+
+        digest = hashlib.sha256(MAGIC + self.version.encode())
+        for path in self.inputs:
+            if not path.exists():
+                return None
+            digest.update(path.name.encode())
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+        return digest.hexdigest()[:24]
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{self.name}_{key}.bin"
+
+    def load(self) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        """Memory-mapped arrays and metadata, or None on a miss"""
+
+        key = self.key()
+        if key is None or not self.path(key).exists():
+            self.stats['misses'] += 1
+            return None
+
+        try:
+            compiled = read_arrays(self.path(key))
+        except (OSError, ValueError, KeyError):
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        return compiled
+
+    def save(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> Optional[Path]:
+        """Write the artifact for the current inputs, dropping stale ones"""
+
+        key = self.key()
+        if key is None:
+            return None
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        write_arrays(path, arrays, meta)
+
+        for stale in self.cache_dir.glob(f"{self.name}_*.bin"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+
+        self.stats['writes'] += 1
+        return path
+
+
+__all__ = ["CompiledNetworkCache", "write_arrays", "read_arrays"]
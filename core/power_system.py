@@ -10,8 +10,9 @@ import pandapower.networks as pn
 import pandas as pd
 import numpy as np
 import geopandas as gpd
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Mapping, Sequence, Union
 from dataclasses import dataclass, field
+from functools import cached_property
 from datetime import datetime, timedelta
 import asyncio
 from enum import Enum
@@ -23,6 +24,18 @@ warnings.filterwarnings('ignore')
 # Import our modules
 from config.settings import settings
 from config.database import db_manager, Substation, Transformer, PowerLine, NetworkState
+from core.dc_solver import SparseDCSolver, DCSolution
+from core.ac_solver import NewtonRaphsonSolver, ACSolution
+from core.state_writer import NetworkStateWriter
+from core.cascade_monte_carlo import MonteCarloCascadeEngine, CascadeParameters
+from core.hosting_capacity import HostingCapacityAnalyzer
+from core.what_if import GridBase, NetworkView, evaluate_views
+from core.state_journal import StateJournal
+from core.flow_trigger import PowerFlowTrigger, TriggerDecision
+from core.load_shedding import LoadSheddingOptimizer, SheddingPlan
+from core.restoration import RestorationPlanner
+from core.dispatch import RollingHorizonDispatch
+from core.profile_service import ProfileService, LOAD_FACTORS, load_factor
 class Logger:
     def info(self, msg): print(f"[INFO] {msg}")
     def error(self, msg): print(f"[ERROR] {msg}")
@@ -47,6 +60,149 @@ class ContingencyType(Enum):
     N_2 = "n-2"  # Double contingency
     N_1_1 = "n-1-1"  # Single contingency followed by another
 
+@dataclass
+class PowerFlowAnalysis:
+    """
+    Vectorized power flow analysis
+    One pass produces the voltage/loading arrays and violation masks; the
+    human-readable lists are only formatted when something renders them.
+    """
+    bus_names: pd.Index
+    v_pu: np.ndarray
+    line_names: pd.Index
+    line_flow_mw: np.ndarray
+    line_loading: np.ndarray  # |p0| / s_nom (inf/nan for zero-rated lines)
+    voltage_violation: np.ndarray  # Bus mask, outside 0.95-1.05 pu
+    overloaded: np.ndarray  # Line mask, loading > 100%
+    critical: np.ndarray  # Line mask, 90% < loading <= 100%
+    total_loss_mw: float
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        bus_names: pd.Index,
+        v_pu: np.ndarray,
+        line_names: pd.Index,
+        p0: np.ndarray,
+        p1: np.ndarray,
+        s_nom: np.ndarray
+    ) -> "PowerFlowAnalysis":
+        """Build the analysis from raw result arrays"""
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            loading = np.abs(p0) / s_nom
+        
+        overloaded = loading > 1.0
+        
+        return cls(
+            bus_names=bus_names,
+            v_pu=v_pu,
+            line_names=line_names,
+            line_flow_mw=p0,
+            line_loading=loading,
+            voltage_violation=(v_pu < 0.95) | (v_pu > 1.05),
+            overloaded=overloaded,
+            critical=(loading > 0.9) & ~overloaded,
+            total_loss_mw=float(np.abs(np.sum(p0 + p1)))
+        )
+    
+    @property
+    def max_voltage_pu(self) -> float:
+        return float(self.v_pu.max()) if len(self.v_pu) else 0.0
+    
+    @property
+    def min_voltage_pu(self) -> float:
+        return float(self.v_pu.min()) if len(self.v_pu) else 0.0
+    
+    @property
+    def max_line_loading(self) -> float:
+        finite = self.line_loading[~np.isnan(self.line_loading)]
+        return float(finite.max()) if len(finite) else 0.0
+    
+    @property
+    def overload_count(self) -> int:
+        return int(self.overloaded.sum())
+    
+    @property
+    def critical_count(self) -> int:
+        """Lines above 90% loading, overloads included"""
+        return int((self.line_loading > 0.9).sum())
+    
+    @property
+    def violation_count(self) -> int:
+        return int(self.voltage_violation.sum())
+    
+    def overloaded_lines(self) -> List[str]:
+        """Names of overloaded lines"""
+        return list(self.line_names[self.overloaded])
+    
+    def lines_above(self, threshold: float) -> List[Tuple[str, float]]:
+        """(line, loading) pairs above a loading threshold, most loaded first"""
+        
+        mask = self.line_loading > threshold
+        order = np.argsort(-self.line_loading[mask])
+        names = self.line_names[mask][order]
+        loadings = self.line_loading[mask][order]
+        
+        return [(name, float(loading)) for name, loading in zip(names, loadings)]
+    
+    def voltage_violation_items(self) -> List[Tuple[str, float]]:
+        """(bus, voltage) pairs outside limits"""
+        return [
+            (bus, float(v))
+            for bus, v in zip(self.bus_names[self.voltage_violation], self.v_pu[self.voltage_violation])
+        ]
+    
+    def cascading_risk(self) -> float:
+        """Probability of cascading failure from heavily loaded lines"""
+        return min(1.0, self.critical_count * 0.1 + self.overload_count * 0.3)
+    
+    def health_score(self, failed_substations: int = 0) -> float:
+        """Overall system health score (0-100)"""
+        
+        score = 100.0
+        score -= failed_substations * 20
+        score -= self.violation_count * 5
+        score -= self.overload_count * 10
+        
+        return max(0, min(100, score))
+    
+    @cached_property
+    def voltage_violations(self) -> List[str]:
+        return [f"{bus}: {v:.3f} pu" for bus, v in self.voltage_violation_items()]
+    
+    @cached_property
+    def overloads(self) -> List[str]:
+        return [
+            f"{line}: {loading:.1%}"
+            for line, loading in zip(self.line_names[self.overloaded], self.line_loading[self.overloaded])
+        ]
+    
+    @cached_property
+    def critical_lines(self) -> List[str]:
+        return [
+            f"{line}: {loading:.1%}"
+            for line, loading in zip(self.line_names[self.critical], self.line_loading[self.critical])
+        ]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready summary for the API"""
+        
+        return {
+            'max_voltage_pu': self.max_voltage_pu,
+            'min_voltage_pu': self.min_voltage_pu,
+            'max_line_loading': self.max_line_loading,
+            'total_loss_mw': self.total_loss_mw,
+            'cascading_risk': self.cascading_risk(),
+            'line_loading': {
+                line: (float(loading) if np.isfinite(loading) else None)
+                for line, loading in zip(self.line_names, self.line_loading)
+            },
+            'overloads': self.overloads,
+            'critical_lines': self.critical_lines,
+            'voltage_violations': self.voltage_violations
+        }
+
 @dataclass
 class PowerFlowResult:
     """Professional power flow results"""
@@ -56,11 +212,34 @@ class PowerFlowResult:
     min_voltage_pu: float
     total_loss_mw: float
     max_line_loading: float
-    critical_lines: List[str]
-    voltage_violations: List[str]
-    overloads: List[str]
     system_lambda: float  # Marginal cost $/MWh
+    analysis: Optional[PowerFlowAnalysis] = None
     timestamp: datetime = field(default_factory=datetime.now)
+    
+    @property
+    def critical_lines(self) -> List[str]:
+        return self.analysis.critical_lines if self.analysis else []
+    
+    @property
+    def voltage_violations(self) -> List[str]:
+        return self.analysis.voltage_violations if self.analysis else []
+    
+    @property
+    def overloads(self) -> List[str]:
+        return self.analysis.overloads if self.analysis else []
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready result with its analysis for the API"""
+        
+        if self.analysis is None:
+            return {'converged': False, 'message': 'No power flow result yet'}
+        
+        return {
+            'converged': self.converged,
+            'iterations': self.iterations,
+            'timestamp': self.timestamp.isoformat(),
+            **self.analysis.to_dict()
+        }
 
 @dataclass
 class ContingencyResult:
@@ -79,6 +258,12 @@ class ManhattanPowerGrid:
     Implements actual Con Edison operational practices
     """
     
+    # Substations without their own buses, served from a neighbour
+    SUBSTATION_ALIASES = {"Columbus Circle": "Chelsea"}
+    
+    # Loads added for EV charging at each substation's 13.8kV bus
+    EV_LOAD_PREFIX = "EV_"
+    
     def __init__(self):
         """Initialize the Manhattan power grid"""
         self.network = None
@@ -105,9 +290,71 @@ class ManhattanPowerGrid:
             'reactive_reserve_mvar': 0
         }
         
+        # Native DC / AC power flow kernels (built once the topology exists)
+        self.dc_solver = None
+        self.ac_solver = None
+        self.last_dc_solution = None
+        self.last_ac_solution = None
+        self.last_power_flow = None
+        
+        # Status aggregate, recomputed once per power flow / component status change
+        self.power_flow_version = 0
+        self.component_status_version = 0
+        self.status_revision = 0
+        self._status_cache = None
+        self._status_key = None
+        self._outage_ratings = {}
+        self._batch_cascades = {}  # Cascade journal event -> batch substations still failed
+        self.cascade_engine = None
+        self.hosting_capacity_analyzer = None
+        self.load_shedding_optimizer = None
+        self.restoration_planner = None
+        self._what_if_base = None
+        self._what_if_key = None
+        
+        # Load name resolution (rebuilt when loads are added)
+        self._load_index = {}
+        self._load_index_source = None
+        self._substation_index = {}
+        
+        # Exact prior values overwritten by failures, replayed on restore
+        self.journal = StateJournal()
+        
+        # Write-behind persistence of network states (sampled by simulation time)
+        persistence = settings.persistence_config
+        self.simulation_time_s = 0.0
+        self._clock_started = False
+        self.state_writer = NetworkStateWriter(
+            session_factory=db_manager.get_session,
+            record_factory=self._network_state_record,
+            sample_interval_s=persistence['state_sample_interval'],
+            max_queue=persistence['queue_size'],
+            batch_size=persistence['batch_size'],
+            flush_interval_s=persistence['flush_interval']
+        )
+        
+        # Event-driven power flow triggering (per-bus deadbands, max staleness)
+        trigger = settings.power_flow_trigger_config
+        self.flow_trigger = PowerFlowTrigger(
+            deadband_mw=trigger['deadband_mw'],
+            bus_deadbands_mw=trigger['bus_deadbands_mw'],
+            max_staleness_s=trigger['max_staleness_s']
+        )
+        
         # Initialize network
         self._initialize_network()
         
+        # Rolling-horizon dispatch (LP built on first solve, then only re-bounded)
+        dispatch = settings.dispatch_config
+        self.dispatch_service = RollingHorizonDispatch(
+            self,
+            horizon_steps=dispatch['horizon_steps'],
+            solver=dispatch['solver'],
+            load_shed_cost=dispatch['load_shed_cost'],
+            overload_penalty=dispatch['overload_penalty']
+        )
+        self._last_dispatch_s = None
+        
     def _initialize_network(self):
         """Initialize PyPSA network with Con Edison parameters"""
         
@@ -123,6 +370,7 @@ class ManhattanPowerGrid:
                 freq='15min'
             )
         )
+        self.profiles = ProfileService(self.network.snapshots)
         
         # Also create PandaPower network for detailed studies
         self.pandapower_net = pp.create_empty_network(
@@ -134,6 +382,10 @@ class ManhattanPowerGrid:
         # Build network from configuration
         self._build_network_topology()
         
+        # Factorization happens lazily on the first DC solve
+        self.dc_solver = SparseDCSolver(self.network, outage_ratings=self._outage_ratings)
+        self.ac_solver = NewtonRaphsonSolver(self.dc_solver)
+        
         logger.info("Power network initialized")
     
     def _build_network_topology(self):
@@ -351,18 +603,16 @@ class ManhattanPowerGrid:
             ("Midtown East", 6)
         ]
         
-        for location, capacity_mw in solar_sites:
-            solar_profile = self._generate_solar_profile()
-            
-            self.network.add(
-                "Generator",
-                f"Solar_{location}",
-                bus=f"{location}_13.8kV",
-                p_nom=capacity_mw,
-                p_max_pu=solar_profile,
-                marginal_cost=0,
-                carrier="solar"
-            )
+        names = [f"Solar_{location}" for location, _ in solar_sites]
+        self.network.madd(
+            "Generator",
+            names,
+            bus=[f"{location}_13.8kV" for location, _ in solar_sites],
+            p_nom=[capacity_mw for _, capacity_mw in solar_sites],
+            p_max_pu=self.profiles.frame(self.profiles.solar(len(solar_sites)), names),
+            marginal_cost=0,
+            carrier="solar"
+        )
         
         # Battery energy storage systems (BESS)
         self._add_storage_systems()
@@ -404,85 +654,67 @@ class ManhattanPowerGrid:
             "Midtown East": 0.11
         }
         
-        # Generate load profile
         base_load_mw = 2500  # Manhattan base load
-        load_profile = self._generate_load_profile(base_load_mw)
         
+        # Each location splits into large industrial at 27kV and commercial at 13.8kV
+        names, buses, shares = [], [], []
         for location, fraction in load_distribution.items():
-            # Add at different voltage levels
-            # Large industrial at 27kV
-            self.network.add(
-                "Load",
-                f"Industrial_{location}",
-                bus=f"{location}_27kV",
-                p_set=load_profile * fraction * 0.3
-            )
-            
-            # Commercial at 13.8kV
-            self.network.add(
-                "Load",
-                f"Commercial_{location}",
-                bus=f"{location}_13.8kV",
-                p_set=load_profile * fraction * 0.7
-            )
+            names += [f"Industrial_{location}", f"Commercial_{location}"]
+            buses += [f"{location}_27kV", f"{location}_13.8kV"]
+            shares += [fraction * 0.3, fraction * 0.7]
+        
+        # One system profile split by share, attached in one call
+        load_profile = self.profiles.load([base_load_mw])
+        self.network.madd(
+            "Load",
+            names,
+            bus=buses,
+            p_set=self.profiles.frame(load_profile * np.array(shares)[None, :], names)
+        )
     
-    def _generate_load_profile(self, base_load_mw: float) -> pd.Series:
-        """Generate realistic 24-hour load profile"""
-        
-        hours = self.network.snapshots.hour
-        load_factors = np.array([
-            0.65, 0.60, 0.58, 0.56, 0.58, 0.65,  # 00:00 - 05:00
-            0.72, 0.85, 0.92, 0.95, 0.98, 0.99,  # 06:00 - 11:00
-            1.00, 0.99, 0.98, 0.97, 0.96, 0.94,  # 12:00 - 17:00
-            0.92, 0.88, 0.82, 0.75, 0.70, 0.67   # 18:00 - 23:00
-        ])
-        
-        # Interpolate to 15-minute intervals
-        hourly_indices = np.arange(24)
-        snapshot_hours = self.network.snapshots.hour + self.network.snapshots.minute / 60
-        
-        interpolated = np.interp(snapshot_hours, hourly_indices, load_factors)
-        
-        # Add some random variation
-        noise = np.random.normal(0, 0.02, len(interpolated))
-        profile = interpolated + noise
-        profile = np.clip(profile, 0.5, 1.1)
-        
-        return pd.Series(base_load_mw * profile, index=self.network.snapshots)
+    # Hourly Manhattan load shape (fraction of peak)
+    LOAD_FACTORS = LOAD_FACTORS
     
-    def _generate_solar_profile(self) -> pd.Series:
-        """Generate realistic solar generation profile"""
-        
-        hours = self.network.snapshots.hour + self.network.snapshots.minute / 60
-        solar_output = np.zeros(len(hours))
-        
-        for i, h in enumerate(hours):
-            if 6 <= h <= 18:
-                # Solar generation with cloud effects
-                base = np.sin((h - 6) * np.pi / 12)
-                cloud_factor = np.random.uniform(0.7, 1.0)
-                solar_output[i] = base * cloud_factor
-        
-        return pd.Series(solar_output, index=self.network.snapshots)
+    @staticmethod
+    def _load_factor(hours: np.ndarray) -> np.ndarray:
+        """Load shape interpolated at fractional hours of day"""
+        return load_factor(hours)
     
     def run_power_flow(self, method: str = "newton_raphson") -> PowerFlowResult:
         """
         Run professional power flow analysis
         
         Args:
-            method: Solution method (newton_raphson, dc, linear)
+            method: Solution method (newton_raphson, newton_raphson_pypsa,
+                dc, dc_pypsa, linear). newton_raphson and dc use the native
+                warm-started kernels at the operating snapshot; the *_pypsa
+                methods run PyPSA as a cross-check path
         
         Returns:
             PowerFlowResult with detailed analysis
         """
         
         try:
+            solution = None
+            iterations = 1  # Linear methods solve in a single step
+            converged = True
+            
             # Select appropriate solver
             if method == "newton_raphson":
-                # Full AC power flow
-                self.network.pf(use_seed=True)
+                # Full AC power flow, warm-started from the previous solution
+                solution = self._run_native_ac()
+                iterations = solution.iterations
+                converged = solution.converged
+            elif method == "newton_raphson_pypsa":
+                # PyPSA Newton-Raphson (full network preparation)
+                pf_result = self.network.pf(snapshots=self.network.snapshots[0], use_seed=True)
+                iterations = int(pf_result['n_iter'].values.max())
+                converged = bool(pf_result['converged'].values.all())
             elif method == "dc":
-                # DC approximation (faster)
+                # DC approximation on the cached sparse factorization
+                solution = self._run_native_dc()
+            elif method == "dc_pypsa":
+                # PyPSA linear power flow (full network preparation)
                 self.network.lpf()
             else:
                 # Linear optimal power flow
@@ -492,12 +724,23 @@ class ManhattanPowerGrid:
                 )
             
             # Analyze results
-            result = self._analyze_power_flow_results()
+            result = self._analyze_power_flow_results(solution, iterations, converged)
+            self.last_power_flow = result
+            self.power_flow_version += 1
+            
+            # Every solve resets the trigger's reference state
+            injections, _ = self._nodal_injections()
+            self.flow_trigger.record_solve(
+                injections, self.dc_solver.topology_version, self._simulation_clock()
+            )
             
             # Store in database
             self._store_network_state()
             
-            logger.info(f"Power flow converged in {result.iterations} iterations")
+            if converged:
+                logger.info(f"Power flow converged in {result.iterations} iterations")
+            else:
+                logger.warning(f"Power flow did not converge after {result.iterations} iterations")
             
             return result
             
@@ -510,58 +753,510 @@ class ManhattanPowerGrid:
                 min_voltage_pu=0,
                 total_loss_mw=0,
                 max_line_loading=0,
-                critical_lines=[],
-                voltage_violations=[],
-                overloads=[],
                 system_lambda=0
             )
     
-    def _analyze_power_flow_results(self) -> PowerFlowResult:
-        """Analyze power flow results for violations and issues"""
+    def run_power_flow_if_needed(
+        self,
+        method: str = "dc"
+    ) -> Tuple[TriggerDecision, Optional[PowerFlowResult]]:
+        """
+        Run a power flow only if a bus injection left its deadband, the topology
+        changed or the last solve is too old
+        
+        Returns:
+            The trigger decision and the power flow result (None if suppressed)
+        """
+        
+        self.dc_solver.sync()
+        injections, _ = self._nodal_injections()
+        decision = self.flow_trigger.check(
+            injections,
+            self.dc_solver.bus_names,
+            self.dc_solver.topology_version,
+            self._simulation_clock()
+        )
+        
+        if not decision.solve:
+            return decision, None
         
-        # Get bus voltages
-        v_pu = self.network.buses_t.v_mag_pu.iloc[0]
-        
-        # Get line flows
-        line_flows = self.network.lines_t.p0.iloc[0]
-        line_limits = self.network.lines.s_nom
-        line_loading = abs(line_flows) / line_limits
-        
-        # Find violations
-        voltage_violations = []
-        for bus in self.network.buses.index:
-            v = v_pu.get(bus, 1.0)
-            if v < 0.95 or v > 1.05:
-                voltage_violations.append(f"{bus}: {v:.3f} pu")
-        
-        overloads = []
-        critical_lines = []
-        for line in self.network.lines.index:
-            loading = line_loading.get(line, 0)
-            if loading > 1.0:
-                overloads.append(f"{line}: {loading:.1%}")
-            elif loading > 0.9:
-                critical_lines.append(f"{line}: {loading:.1%}")
-        
-        # Calculate losses
-        total_loss_mw = (
-            self.network.lines_t.p0.iloc[0].sum() - 
-            self.network.lines_t.p1.iloc[0].sum()
+        return decision, self.run_power_flow(method)
+    
+    def get_trigger_stats(self) -> Dict[str, Any]:
+        """Triggered and suppressed power flow counts"""
+        return self.flow_trigger.get_stats()
+    
+    def _run_native_dc(self) -> DCSolution:
+        """Solve the DC power flow at the operating snapshot with the native kernel"""
+        
+        self.dc_solver.sync()
+        injections, dispatch = self._nodal_injections()
+        solution = self.dc_solver.solve(injections)
+        
+        self._write_dc_results(solution, dispatch)
+        self.last_dc_solution = solution
+        
+        return solution
+    
+    def _run_native_ac(self) -> ACSolution:
+        """Solve the AC power flow at the operating snapshot with the native kernel"""
+        
+        self.dc_solver.sync()
+        p, p_dispatch = self._nodal_injections()
+        q, q_dispatch = self._nodal_injections('q_set')
+        solution = self.ac_solver.solve(p + 1j * q)
+        
+        self._write_ac_results(solution, p_dispatch, q_dispatch)
+        self.last_ac_solution = solution
+        
+        return solution
+    
+    def _snapshot_p_set(self, component: str, attr: str = 'p_set') -> np.ndarray:
+        """Power set points at the operating snapshot (time series override static values)"""
+        
+        df = self.network.df(component)
+        values = df[attr].values.astype(float)
+        
+        series = self.network.pnl(component)[attr]
+        if len(series.columns):
+            positions = df.index.get_indexer(series.columns)
+            valid = positions >= 0
+            values[positions[valid]] = series.iloc[0].values[valid]
+        
+        return values
+    
+    def _nodal_injections(self, attr: str = 'p_set') -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Net injection per bus (solver order) and the set point of every one-port"""
+        
+        bus_names = self.dc_solver.bus_names
+        injections = np.zeros(len(bus_names))
+        dispatch = {}
+        
+        for component in ("Generator", "StorageUnit", "Load"):
+            df = self.network.df(component)
+            p = self._snapshot_p_set(component, attr)
+            dispatch[component] = p
+            
+            if len(df):
+                buses = bus_names.get_indexer(df.bus.values)
+                injections += np.bincount(
+                    buses, weights=p * df.sign.values, minlength=len(bus_names)
+                )
+        
+        return injections, dispatch
+    
+    def _set_snapshot_row(self, pnl, attr: str, names: pd.Index, values: np.ndarray):
+        """Write one snapshot row of a result time series, adding missing columns"""
+        
+        frame = pnl[attr]
+        missing = names.difference(frame.columns)
+        if len(missing):
+            frame = frame.reindex(columns=frame.columns.append(missing), fill_value=0.0)
+            pnl[attr] = frame
+        
+        frame.loc[self.network.snapshots[0], names] = values
+    
+    def _write_dc_results(self, solution: DCSolution, dispatch: Dict[str, np.ndarray]):
+        """Store native DC results where the PyPSA lpf would have put them"""
+        
+        solver = self.dc_solver
+        network = self.network
+        is_line = solver.branch_component == 'Line'
+        
+        for pnl, mask in ((network.lines_t, is_line), (network.transformers_t, ~is_line)):
+            names = solver.branch_names[mask]
+            self._set_snapshot_row(pnl, 'p0', names, solution.flows_mw[mask])
+            self._set_snapshot_row(pnl, 'p1', names, -solution.flows_mw[mask])
+        
+        self._set_snapshot_row(network.buses_t, 'p', solver.bus_names, solution.injections_mw)
+        self._set_snapshot_row(network.buses_t, 'v_ang', solver.bus_names, solution.theta)
+        self._set_snapshot_row(
+            network.buses_t, 'v_mag_pu', solver.bus_names, np.ones(len(solver.bus_names))
+        )
+        
+        # Slack generators pick up the island mismatch
+        generation = pd.Series(dispatch["Generator"], index=network.generators.index)
+        for island, generator in enumerate(solver.slack_generators()):
+            if generator is not None:
+                generation[generator] += solution.slack_mw[island]
+        
+        self._set_snapshot_row(network.generators_t, 'p', network.generators.index, generation.values)
+        self._set_snapshot_row(network.loads_t, 'p', network.loads.index, dispatch["Load"])
+        self._set_snapshot_row(
+            network.storage_units_t, 'p', network.storage_units.index, dispatch["StorageUnit"]
         )
+    
+    def _write_ac_results(
+        self,
+        solution: ACSolution,
+        p_dispatch: Dict[str, np.ndarray],
+        q_dispatch: Dict[str, np.ndarray]
+    ):
+        """Store native AC results where PyPSA's pf would have put them"""
+        
+        solver = self.dc_solver
+        network = self.network
+        is_line = solver.branch_component == 'Line'
+        
+        for pnl, mask in ((network.lines_t, is_line), (network.transformers_t, ~is_line)):
+            names = solver.branch_names[mask]
+            self._set_snapshot_row(pnl, 'p0', names, solution.s0.real[mask])
+            self._set_snapshot_row(pnl, 'q0', names, solution.s0.imag[mask])
+            self._set_snapshot_row(pnl, 'p1', names, solution.s1.real[mask])
+            self._set_snapshot_row(pnl, 'q1', names, solution.s1.imag[mask])
+        
+        self._set_snapshot_row(network.buses_t, 'p', solver.bus_names, solution.s_bus.real)
+        self._set_snapshot_row(network.buses_t, 'q', solver.bus_names, solution.s_bus.imag)
+        self._set_snapshot_row(network.buses_t, 'v_ang', solver.bus_names, solution.v_ang)
+        self._set_snapshot_row(network.buses_t, 'v_mag_pu', solver.bus_names, solution.v_mag_pu)
+        
+        # Slack and PV generators pick up the difference to their set points
+        generators = network.generators
+        gen_bus = solver.bus_names.get_indexer(generators.bus.values)
+        p_scheduled, _ = self._nodal_injections()
+        q_scheduled, _ = self._nodal_injections('q_set')
+        p_gen = p_dispatch["Generator"].copy()
+        q_gen = q_dispatch["Generator"].copy()
+        
+        for island, generator in enumerate(solver.slack_generators()):
+            if generator is not None:
+                position = generators.index.get_loc(generator)
+                bus = gen_bus[position]
+                p_gen[position] += solution.s_bus.real[bus] - p_scheduled[bus]
+                q_gen[position] += solution.s_bus.imag[bus] - q_scheduled[bus]
+        
+        pv_buses = self.ac_solver._pv
+        if len(pv_buses):
+            pv_positions = np.flatnonzero(generators.control.values == "PV")
+            first_pv = pd.Series(pv_positions, index=gen_bus[pv_positions]).groupby(level=0).first()
+            positions = first_pv.reindex(pv_buses).values.astype(int)
+            q_gen[positions] += solution.s_bus.imag[pv_buses] - q_scheduled[pv_buses]
+        
+        self._set_snapshot_row(network.generators_t, 'p', generators.index, p_gen)
+        self._set_snapshot_row(network.generators_t, 'q', generators.index, q_gen)
+        for component, pnl in (("Load", network.loads_t), ("StorageUnit", network.storage_units_t)):
+            names = network.df(component).index
+            self._set_snapshot_row(pnl, 'p', names, p_dispatch[component])
+            self._set_snapshot_row(pnl, 'q', names, q_dispatch[component])
+    
+    def cross_check_ac(self, tolerance: float = 1e-4) -> Dict[str, Any]:
+        """
+        Compare the native AC kernel with PyPSA's Newton-Raphson
+        Out-of-service branches are removed from a copy of the network first.
+        """
+        
+        self.dc_solver.sync()
+        p, _ = self._nodal_injections()
+        q, _ = self._nodal_injections('q_set')
+        native = self.ac_solver.solve(p + 1j * q)
+        
+        reference = self._reference_copy()
+        reference.pf(snapshots=reference.snapshots[0])
+        
+        reference_flows = pd.concat([
+            reference.lines_t.p0.iloc[0],
+            reference.transformers_t.p0.iloc[0]
+        ]).reindex(self.dc_solver.branch_names).fillna(0.0).values
+        reference_v = reference.buses_t.v_mag_pu.iloc[0].reindex(self.dc_solver.bus_names).values
+        
+        flow_diff = np.abs(reference_flows - native.s0.real)
+        v_diff = np.abs(reference_v - native.v_mag_pu)
+        
+        return {
+            'max_abs_diff_mw': float(flow_diff.max()) if len(flow_diff) else 0.0,
+            'max_abs_diff_v_pu': float(v_diff.max()) if len(v_diff) else 0.0,
+            'iterations': native.iterations,
+            'within_tolerance': bool(
+                (len(flow_diff) == 0 or flow_diff.max() <= tolerance * 1e3)
+                and (len(v_diff) == 0 or v_diff.max() <= tolerance)
+            ),
+            'out_of_service': self.dc_solver.out_of_service()
+        }
+    
+    def _reference_copy(self):
+        """Network copy with out-of-service branches removed, for PyPSA cross-checks"""
+        
+        reference = self.network.copy()
+        outages = self.dc_solver.out_of_service()
+        lines_out = [name for name in outages if name in reference.lines.index]
+        transformers_out = [name for name in outages if name in reference.transformers.index]
+        if lines_out:
+            reference.mremove("Line", lines_out)
+        if transformers_out:
+            reference.mremove("Transformer", transformers_out)
+        
+        return reference
+    
+    def cross_check_dc(self, tolerance_mw: float = 1e-3) -> Dict[str, Any]:
+        """
+        Compare the native DC kernel with PyPSA's linear power flow
+        Out-of-service lines are removed from a copy of the network first,
+        so the live network is left untouched.
+        """
+        
+        self.dc_solver.sync()
+        injections, _ = self._nodal_injections()
+        native = self.dc_solver.solve(injections)
+        
+        reference = self._reference_copy()
+        reference.lpf(snapshots=reference.snapshots[0])
+        
+        reference_flows = pd.concat([
+            reference.lines_t.p0.iloc[0],
+            reference.transformers_t.p0.iloc[0]
+        ]).reindex(self.dc_solver.branch_names).fillna(0.0).values
+        
+        diff = np.abs(reference_flows - native.flows_mw)
+        worst = int(np.argmax(diff)) if len(diff) else None
+        
+        return {
+            'max_abs_diff_mw': float(diff.max()) if len(diff) else 0.0,
+            'worst_branch': self.dc_solver.branch_names[worst] if worst is not None else None,
+            'within_tolerance': bool(len(diff) == 0 or diff.max() <= tolerance_mw),
+            'out_of_service': self.dc_solver.out_of_service()
+        }
+    
+    def set_line_status(self, line_name: str, in_service: bool) -> bool:
+        """
+        Switch a line in or out of service
+        Keeps the s_nom=0 outage marker used by the PyPSA paths and lets the
+        native DC kernel refactorize on its next solve.
+        """
+        
+        changed = self.dc_solver.set_branch_status(line_name, in_service)
+        
+        if not in_service:
+            if changed:
+                self._outage_ratings[line_name] = self.network.lines.at[line_name, 's_nom']
+            self.network.lines.at[line_name, 's_nom'] = 0
+        elif changed:
+            default_rating = self.lines.get(line_name, {}).get('capacity_mva', 0)
+            self.network.lines.at[line_name, 's_nom'] = self._outage_ratings.pop(
+                line_name, default_rating
+            )
+        
+        return changed
+    
+    @staticmethod
+    def _name_aliases(name: str) -> List[str]:
+        """Spellings callers use for a component name (apostrophes, spaces vs underscores)"""
+        aliases = []
+        for variant in (name, name.replace("'", "")):
+            aliases.extend([variant, variant.replace(" ", "_"), variant.replace("_", " ")])
+        return aliases
+    
+    def _load_name_index(self) -> Dict[str, int]:
+        """Alias -> position in network.loads, rebuilt when the load index changes"""
+        
+        loads_index = self.network.loads.index
+        if self._load_index_source is not loads_index:
+            index = {}
+            for position, name in enumerate(loads_index):
+                for alias in self._name_aliases(name):
+                    index.setdefault(alias, position)
+                for alias, target in self.SUBSTATION_ALIASES.items():
+                    if target in name:
+                        for alias_name in self._name_aliases(name.replace(target, alias)):
+                            index.setdefault(alias_name, position)
+            
+            # Exact names always win over aliases
+            index.update({name: position for position, name in enumerate(loads_index)})
+            
+            self._load_index = index
+            self._load_index_source = loads_index
+        
+        return self._load_index
+    
+    def resolve_loads(self, names: Sequence[str]) -> np.ndarray:
+        """Positions in network.loads for load names or aliases (-1 if unknown)"""
+        index = self._load_name_index()
+        return np.array([index.get(name, -1) for name in names], dtype=int)
+    
+    def resolve_substation(self, name: str) -> Optional[str]:
+        """Registry name of a substation, following aliases and spelling variants"""
+        
+        if not self._substation_index:
+            for registry_name in self.substations:
+                for alias in self._name_aliases(registry_name):
+                    self._substation_index.setdefault(alias, registry_name)
+            for alias, target in self.SUBSTATION_ALIASES.items():
+                for alias_name in self._name_aliases(alias):
+                    self._substation_index.setdefault(alias_name, target)
+        
+        return self._substation_index.get(name)
+    
+    def bus_for_substation(self, name: str, voltage_kv: float = 13.8) -> Optional[str]:
+        """Bus of a substation at a voltage level"""
+        substation = self.resolve_substation(name)
+        if substation is None:
+            return None
+        return self.substations[substation]['buses'].get(voltage_kv)
+    
+    def loads_at_substation(self, name: str) -> pd.Index:
+        """Loads connected to any bus of a substation"""
+        substation = self.resolve_substation(name)
+        if substation is None:
+            return pd.Index([])
+        buses = list(self.substations[substation]['buses'].values())
+        loads = self.network.loads
+        return loads.index[loads.bus.isin(buses).values]
+    
+    def get_loads(self, names: Optional[Sequence[str]] = None) -> pd.Series:
+        """Load set points at the operating snapshot (MW)"""
+        
+        values = pd.Series(self._snapshot_p_set("Load"), index=self.network.loads.index)
+        if names is None:
+            return values
+        
+        positions = self.resolve_loads(names)
+        if (positions < 0).any():
+            missing = [n for n, p in zip(names, positions) if p < 0]
+            raise KeyError(f"Unknown loads: {missing}")
+        return values.iloc[positions]
+    
+    def set_loads(
+        self,
+        loads: Union[Mapping[str, float], pd.Series, np.ndarray, float],
+        names: Optional[Sequence[str]] = None,
+        strict: bool = True
+    ) -> pd.Index:
+        """
+        Set load active power at the operating snapshot in one assignment
+        Writes the static p_set and, for loads with a time series, the first
+        snapshot (PyPSA lets the time series override the static value).
+        
+        Args:
+            loads: Mapping/Series of name -> MW, or values aligned with names
+            names: Load names or aliases when loads is an array or scalar
+            strict: Raise KeyError for unknown names (otherwise skip them)
+        
+        Returns:
+            Resolved load names that were written
+        """
+        
+        if names is None:
+            if not isinstance(loads, pd.Series):
+                loads = pd.Series(loads, dtype=float)
+            names, values = list(loads.index), loads.values.astype(float)
+        else:
+            names = list(names)
+            values = np.broadcast_to(np.asarray(loads, dtype=float), (len(names),))
+        
+        positions = self.resolve_loads(names)
+        unknown = positions < 0
+        if unknown.any():
+            missing = [n for n, u in zip(names, unknown) if u]
+            if strict:
+                raise KeyError(f"Unknown loads: {missing}")
+            logger.warning(f"Skipping unknown loads: {missing}")
+            positions, values = positions[~unknown], values[~unknown]
+        
+        network = self.network
+        resolved = network.loads.index[positions]
+        
+        p_set = network.loads.columns.get_loc('p_set')
+        network.loads.iloc[positions, p_set] = values
+        
+        series = network.loads_t.p_set
+        has_series = resolved.isin(series.columns)
+        if has_series.any():
+            series.loc[network.snapshots[0], resolved[has_series]] = values[has_series]
+        
+        solver = self.dc_solver
+        solver.sync()
+        solver.mark_dirty(solver.bus_names.get_indexer(network.loads.bus.values[positions]))
+        
+        return resolved
+    
+    def scale_loads(
+        self,
+        factors: Union[Mapping[str, float], pd.Series, np.ndarray, float],
+        names: Optional[Sequence[str]] = None
+    ) -> pd.Index:
+        """
+        Multiply load set points at the operating snapshot
+        
+        Args:
+            factors: Mapping/Series of name -> factor, or factors aligned with names
+            names: Load names or aliases (default: all loads)
+        """
+        
+        if names is None and isinstance(factors, (Mapping, pd.Series)):
+            factors = pd.Series(factors, dtype=float)
+            names, factors = list(factors.index), factors.values
+        elif names is None:
+            names = list(self.network.loads.index)
+        
+        current = self.get_loads(names).values
+        return self.set_loads(current * np.asarray(factors, dtype=float), names=names)
+    
+    def _analyze_power_flow_results(
+        self,
+        solution=None,
+        iterations: int = 1,
+        converged: bool = True
+    ) -> PowerFlowResult:
+        """Analyze power flow results for violations and issues"""
+        
+        analysis = self._build_analysis(solution)
         
         return PowerFlowResult(
-            converged=True,
-            iterations=3,  # Typical for Newton-Raphson
-            max_voltage_pu=v_pu.max(),
-            min_voltage_pu=v_pu.min(),
-            total_loss_mw=abs(total_loss_mw),
-            max_line_loading=line_loading.max(),
-            critical_lines=critical_lines,
-            voltage_violations=voltage_violations,
-            overloads=overloads,
-            system_lambda=45.0  # $/MWh typical
+            converged=converged,
+            iterations=iterations,
+            max_voltage_pu=analysis.max_voltage_pu,
+            min_voltage_pu=analysis.min_voltage_pu,
+            total_loss_mw=analysis.total_loss_mw,
+            max_line_loading=analysis.max_line_loading,
+            system_lambda=45.0,  # $/MWh typical
+            analysis=analysis
         )
     
+    def _build_analysis(self, solution=None) -> PowerFlowAnalysis:
+        """Single vectorized pass over bus voltages and line flows"""
+        
+        lines = self.network.lines
+        s_nom = lines.s_nom.values.astype(float)
+        
+        current = (
+            solution is not None
+            and solution.topology_version == self.dc_solver.topology_version
+        )
+        is_line = self.dc_solver.branch_component == 'Line'
+        positions = self.dc_solver.branch_names[is_line].get_indexer(lines.index)
+        
+        if current and isinstance(solution, DCSolution):
+            # Native DC results are already arrays in solver order
+            p0 = solution.flows_mw[is_line][positions]
+            p1 = -p0
+            bus_names = self.dc_solver.bus_names
+            v_pu = np.ones(len(bus_names))
+        elif current and isinstance(solution, ACSolution):
+            p0 = solution.s0.real[is_line][positions]
+            p1 = solution.s1.real[is_line][positions]
+            bus_names = self.dc_solver.bus_names
+            v_pu = solution.v_mag_pu
+        else:
+            p0 = self.network.lines_t.p0.iloc[0].reindex(lines.index).fillna(0.0).values
+            p1 = self.network.lines_t.p1.iloc[0].reindex(lines.index).fillna(0.0).values
+            bus_names = self.network.buses.index
+            v_pu = self.network.buses_t.v_mag_pu.iloc[0].reindex(bus_names).fillna(1.0).values
+        
+        return PowerFlowAnalysis.from_arrays(
+            bus_names=bus_names,
+            v_pu=v_pu,
+            line_names=lines.index,
+            p0=p0,
+            p1=p1,
+            s_nom=s_nom
+        )
+    
+    def _current_analysis(self) -> PowerFlowAnalysis:
+        """Analysis of the latest power flow, built from the network if none is cached"""
+        
+        if self.last_power_flow is not None and self.last_power_flow.analysis is not None:
+            return self.last_power_flow.analysis
+        return self._build_analysis()
+    
     def run_contingency_analysis(
         self, 
         contingency_type: ContingencyType = ContingencyType.N_1
@@ -574,49 +1269,83 @@ class ManhattanPowerGrid:
         results = []
         
         if contingency_type == ContingencyType.N_1:
-            # Test failure of each major component
+            # Test failure of each major component on what-if views
+            base = self.what_if()
             for line_name in self.network.lines.index[:10]:  # Top 10 critical lines
-                # Temporarily remove line
-                original_status = self.network.lines.at[line_name, 's_nom']
-                self.network.lines.at[line_name, 's_nom'] = 0
+                view = base.derive()
+                if not view.set_branch_status(line_name, False):
+                    continue  # Already out of service
                 
-                # Run power flow
-                pf_result = self.run_power_flow("dc")
+                analysis = view.analysis()
                 
                 # Assess impact
                 result = ContingencyResult(
                     contingency_type=contingency_type,
                     failed_components=[line_name],
-                    cascading_risk=self._calculate_cascading_risk(),
-                    load_shed_mw=0,  # Calculate if needed
-                    affected_buses=pf_result.voltage_violations,
+                    cascading_risk=analysis.cascading_risk(),
+                    load_shed_mw=view.load_shed_mw(),
+                    affected_buses=analysis.voltage_violations,
                     recovery_time_min=30,
-                    criticality_score=len(pf_result.overloads) * 10
+                    criticality_score=len(analysis.overloads) * 10
                 )
                 
                 results.append(result)
-                
-                # Restore line
-                self.network.lines.at[line_name, 's_nom'] = original_status
         
         return results
     
-    def _calculate_cascading_risk(self) -> float:
-        """Calculate probability of cascading failure"""
+    def screen_line_outages(
+        self,
+        lines: Optional[List[str]] = None,
+        workers: int = 1
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        N-1 screen of line outages on what-if views, the live network is untouched
+        
+        Args:
+            lines: Lines to take out one at a time (default: all in-service lines)
+            workers: Threads evaluating the views
         
-        # Get current line loadings
-        line_flows = abs(self.network.lines_t.p0.iloc[0])
-        line_limits = self.network.lines.s_nom
-        line_loading = line_flows / line_limits
+        Returns:
+            Outage summary per line
+        """
         
-        # Count heavily loaded lines
-        critical_count = (line_loading > 0.9).sum()
-        overload_count = (line_loading > 1.0).sum()
+        base = self.what_if()
+        names, views = [], []
+        for line_name in (self.network.lines.index if lines is None else lines):
+            view = base.derive()
+            if view.set_branch_status(line_name, False):
+                names.append(line_name)
+                views.append(view)
         
-        # Simple risk formula
-        risk = min(1.0, (critical_count * 0.1 + overload_count * 0.3))
+        return dict(zip(names, evaluate_views(views, workers=workers)))
+    
+    def what_if(self) -> NetworkView:
+        """
+        Copy-on-write view of the current operating point
+        Changes made on the view never touch the live network. The immutable
+        base is shared by all views until topology, loads or generation change.
+        """
         
-        return risk
+        self.dc_solver.sync()
+        key = (
+            self.dc_solver.topology_version,
+            self.network.loads.index,
+            self._snapshot_p_set("Load").tobytes(),
+            self._snapshot_p_set("Generator").tobytes(),
+            self.network.generators.p_nom.values.tobytes()
+        )
+        
+        if (self._what_if_key is None or key[0] != self._what_if_key[0]
+                or key[1] is not self._what_if_key[1] or key[2:] != self._what_if_key[2:]):
+            self._what_if_base = GridBase.capture(self)
+            self._what_if_key = key
+        
+        return NetworkView(self._what_if_base)
+    
+    def _calculate_cascading_risk(self) -> float:
+        """Calculate probability of cascading failure"""
+        
+        return self._current_analysis().cascading_risk()
     
     def trigger_failure(
         self, 
@@ -636,6 +1365,64 @@ class ManhattanPowerGrid:
             Impact assessment
         """
         
+        impact = self._fail_component(component_type, component_id)
+        
+        if cascading and component_type == "substation" and component_id in self.substations:
+            # Check for cascading failures
+            cascade_result = self._simulate_cascading_failure(component_id, (component_type, component_id))
+            impact['cascaded_failures'] = cascade_result['failed_components']
+        
+        self._assess_failure(impact)
+        return impact
+    
+    def trigger_failures(
+        self,
+        components: List[Tuple[str, str]],
+        cascading: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Fail several components as one event
+        The state changes are applied together, then the network gets one
+        cascade check, one power flow and one incident record. Each component
+        keeps its own journal transaction, so it can still be restored alone;
+        lines tripped by the cascade are journaled under a batch event that is
+        replayed when the last substation of the batch is restored.
+        
+        Args:
+            components: (component_type, component_id) pairs
+            cascading: Whether to simulate cascading failures
+        
+        Returns:
+            Combined impact with the per-component impacts under 'components'
+        """
+        
+        impacts = [self._fail_component(component_type, component_id)
+                   for component_type, component_id in components]
+        impact = {
+            'component': ', '.join(str(i['component']) for i in impacts),
+            'type': 'batch',
+            'timestamp': datetime.now(),
+            'components': impacts,
+            'cascaded_failures': [],
+            'load_lost_mw': sum(i['load_lost_mw'] for i in impacts),
+            'customers_affected': sum(i['customers_affected'] for i in impacts)
+        }
+        
+        substations = [i['component'] for i in impacts
+                       if i['type'] == "substation" and i['component'] in self.substations]
+        if cascading and substations:
+            event = ("cascade", tuple(substations))
+            if self.journal.begin(event):
+                self._batch_cascades[event] = set(substations)
+            cascade_result = self._simulate_cascading_failure(substations[0], event)
+            impact['cascaded_failures'] = cascade_result['failed_components']
+        
+        self._assess_failure(impact)
+        return impact
+    
+    def _fail_component(self, component_type: str, component_id: str) -> Dict[str, Any]:
+        """Apply one component's failure (journaled) without cascade or power flow"""
+        
         impact = {
             'component': component_id,
             'type': component_type,
@@ -645,121 +1432,436 @@ class ManhattanPowerGrid:
             'customers_affected': 0
         }
         
+        event = (component_type, component_id)
+        
         if component_type == "substation":
             # Fail all equipment at substation
             if component_id in self.substations:
+                generators = self.network.generators
+                gens = generators.index[[component_id in gen for gen in generators.index]]
+                lost_loads = self.get_loads(self.loads_at_substation(component_id))
+                
+                # Journal the exact values this failure overwrites (first failure only)
+                if self.journal.begin(event):
+                    self.journal.record(
+                        event, 'substation_status', [component_id],
+                        [self.substations[component_id]['status']]
+                    )
+                    self.journal.record(event, 'generator_p_nom', gens, generators.loc[gens, 'p_nom'].values)
+                    self.journal.record(event, 'loads', lost_loads.index, lost_loads.values)
+                
                 self.substations[component_id]['status'] = ComponentStatus.FAILED
+                self.component_status_version += 1
                 
                 # Remove all generation and load at this substation
-                for gen in self.network.generators.index:
-                    if component_id in gen:
-                        self.network.generators.at[gen, 'p_nom'] = 0
+                generators.loc[gens, 'p_nom'] = 0
                 
-                for load in self.network.loads.index:
-                    if component_id in load:
-                        impact['load_lost_mw'] += self.network.loads.at[load, 'p_set'].mean()
-                        self.network.loads.at[load, 'p_set'] = 0
+                impact['load_lost_mw'] = float(lost_loads.sum())
+                self.set_loads(0.0, names=lost_loads.index)
                 
                 # Estimate customers affected (1MW ≈ 1000 customers in Manhattan)
                 impact['customers_affected'] = int(impact['load_lost_mw'] * 1000)
-                
-                if cascading:
-                    # Check for cascading failures
-                    cascade_result = self._simulate_cascading_failure(component_id)
-                    impact['cascaded_failures'] = cascade_result['failed_components']
         
         elif component_type == "line":
             if component_id in self.lines:
+                if self.journal.begin(event):
+                    self.journal.record(
+                        event, 'line_status', [component_id],
+                        [self.dc_solver.in_service[self.dc_solver.branch_names.get_loc(component_id)]]
+                    )
                 self.lines[component_id]['status'] = ComponentStatus.FAILED
-                self.network.lines.at[component_id, 's_nom'] = 0
+                self.component_status_version += 1
+                self.set_line_status(component_id, False)
+        
+        return impact
+    
+    def _assess_failure(self, impact: Dict[str, Any]):
+        """Run power flow to assess a failure's impact and log the incident"""
         
-        # Run power flow to assess impact
         pf_result = self.run_power_flow("dc")
         
         if not pf_result.converged:
             impact['blackout'] = True
-            logger.critical(f"System blackout after {component_id} failure!")
+            logger.critical(f"System blackout after {impact['component']} failure!")
         
         # Log incident
         self._log_incident(impact)
-        
-        return impact
     
-    def _simulate_cascading_failure(self, initial_failure: str) -> Dict[str, Any]:
-        """Simulate realistic cascading failure propagation"""
+    def _simulate_cascading_failure(
+        self,
+        initial_failure: str,
+        event: Optional[Tuple[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Simulate realistic cascading failure propagation
+        Lines tripped by the cascade are journaled under the initiating event,
+        so restoring that event recloses them.
+        """
         
         failed_components = [initial_failure]
         iteration = 0
         max_iterations = 10
         
+        # Propagate on a what-if view; only the final outages reach the live network
+        view = self.what_if()
+        
         while iteration < max_iterations:
             iteration += 1
             
-            # Run power flow
-            pf_result = self.run_power_flow("dc")
-            
-            if not pf_result.converged:
-                break
-            
             # Check for overloaded lines
             new_failures = []
-            for line in pf_result.overloads:
-                line_name = line.split(":")[0]
+            for line_name in view.analysis().overloaded_lines():
                 if line_name not in failed_components:
                     # Probability of failure increases with overload
                     if np.random.random() < 0.3:  # 30% chance
                         new_failures.append(line_name)
-                        self.network.lines.at[line_name, 's_nom'] = 0
+                        view.set_branch_status(line_name, False)
             
             if not new_failures:
                 break
             
             failed_components.extend(new_failures)
         
+        tripped = failed_components[1:]
+        if event is not None and self.journal.is_open(event) and tripped:
+            self.journal.record(event, 'line_status', tripped, [True] * len(tripped))
+        for line_name in tripped:
+            self.set_line_status(line_name, False)
+        
         return {
             'failed_components': failed_components,
             'iterations': iteration,
-            'final_converged': pf_result.converged
+            'final_converged': True  # The DC kernel always solves
         }
     
-    def optimize_dispatch(self) -> Dict[str, Any]:
-        """
-        Run optimal power flow for economic dispatch
-        Minimizes cost while respecting all constraints
+    def probabilistic_power_flow(
+        self,
+        station_distributions: List[Dict[str, Any]],
+        n_samples: int = 5000,
+        horizon_hours: float = 1.0,
+        seed: Optional[int] = None,
+        overload_threshold: float = 1.0,
+        quantiles: Tuple[float, ...] = (0.5, 0.9, 0.95, 0.99)
+    ) -> Dict[str, Any]:
         """
+        Overload probabilities under EV charging and base load uncertainty
+        Samples EV station occupancy and base loads over the horizon and
+        solves all samples in one batched DC solve on the cached factorization.
         
-        # Run linear optimal power flow
-        self.network.lopf(
-            snapshots=self.network.snapshots,
-            solver_name=settings.pypsa_config['solver'],
-            solver_options=settings.pypsa_config['solver_options'],
-            keep_shadowprices=True
-        )
+        Args:
+            station_distributions: From EVStationManager.get_charging_distributions()
+            n_samples: Number of load scenarios
+            horizon_hours: Look-ahead window for the base load profile
+            seed: Random seed
+            overload_threshold: Loading (flow / s_nom) counted as overloaded
+            quantiles: Loading quantiles to report per branch
+        
+        Returns:
+            Per-branch overload probability and loading quantiles
+        """
         
-        # Extract results
-        total_cost = self.network.objective
-        generation_schedule = self.network.generators_t.p
-        storage_schedule = self.network.storage_units_t.p
-        
-        # Calculate metrics
-        renewable_fraction = (
-            self.network.generators_t.p[
-                self.network.generators.carrier == "solar"
-            ].sum().sum() / 
-            self.network.loads_t.p.sum().sum()
+        rng = np.random.default_rng(seed)
+        solver = self.dc_solver
+        solver.sync()
+        
+        injections, dispatch = self._nodal_injections()
+        loads = self.network.loads
+        load_bus = solver.bus_names.get_indexer(loads.bus.values)
+        
+        # Base loads follow the daily shape over the horizon with 2% noise
+        # (as in the load profiles); live EV loads are replaced by samples
+        is_ev = loads.index.str.startswith(self.EV_LOAD_PREFIX)
+        base = np.where(is_ev, 0.0, dispatch["Load"])
+        now = self.network.snapshots[0]
+        hour_now = now.hour + now.minute / 60
+        hours = hour_now + rng.uniform(0, horizon_hours, n_samples)
+        shape = self._load_factor(hours) / self._load_factor(hour_now)
+        noise = np.clip(1 + rng.normal(0, 0.02, (len(loads), n_samples)), 0.5, 1.1)
+        load_samples = base[:, None] * shape[None, :] * noise
+        
+        # Generation and storage stay at their set points
+        fixed = injections - np.bincount(
+            load_bus, weights=dispatch["Load"] * loads.sign.values, minlength=len(solver.bus_names)
         )
+        P = np.repeat(fixed[:, None], n_samples, axis=1)
+        np.add.at(P, load_bus, load_samples * loads.sign.values[:, None])
+        
+        # EV stations: occupied ports ~ BetaBinomial, filled in port order
+        ev_total = np.zeros(n_samples)
+        for station in station_distributions:
+            bus = self.bus_for_substation(station['substation'])
+            if not station['operational'] or bus is None:
+                continue
+            ports = len(station['port_power_kw'])
+            occupancy = rng.beta(station['alpha'], station['beta'], n_samples)
+            occupied = rng.binomial(ports, occupancy)
+            station_mw = np.r_[0.0, np.cumsum(station['port_power_kw'])][occupied] / 1000
+            P[solver.bus_names.get_loc(bus)] -= station_mw
+            ev_total += station_mw
+        
+        solution = solver.solve(P)
+        
+        rating = np.where(solver.s_nom > 0, solver.s_nom, np.nan)
+        loading = np.abs(solution.flows_mw) / rating[:, None]
+        rated = solver.active & (solver.s_nom > 0)
+        overloaded = (loading > overload_threshold) & rated[:, None]
+        levels = np.nanquantile(np.where(rated[:, None], loading, np.nan), quantiles, axis=1)
+        probability = overloaded.mean(axis=1)
+        
+        branches = {}
+        for position in np.flatnonzero(rated):
+            branches[solver.branch_names[position]] = {
+                'component': solver.branch_component[position],
+                'overload_probability': float(probability[position]),
+                'mean_loading': float(loading[position].mean()),
+                **{f"p{int(round(q * 100))}": float(levels[i, position])
+                   for i, q in enumerate(quantiles)}
+            }
         
+        total_load = load_samples.sum(axis=0) + ev_total
         return {
-            'total_cost': total_cost,
-            'average_price': total_cost / self.network.loads_t.p.sum().sum(),
-            'renewable_fraction': renewable_fraction,
-            'generation_schedule': generation_schedule.to_dict(),
-            'storage_schedule': storage_schedule.to_dict(),
-            'co2_emissions_tons': self._calculate_emissions()
+            'n_samples': n_samples,
+            'horizon_hours': horizon_hours,
+            'probability_any_overload': float(overloaded.any(axis=0).mean()),
+            'expected_overloaded_branches': float(overloaded.sum(axis=0).mean()),
+            'ev_load_mw': {
+                'mean': float(ev_total.mean()),
+                'p95': float(np.quantile(ev_total, 0.95))
+            },
+            'total_load_mw': {
+                'mean': float(total_load.mean()),
+                'p95': float(np.quantile(total_load, 0.95))
+            },
+            'branches': branches
         }
     
-    def _calculate_emissions(self) -> float:
-        """Calculate CO2 emissions from generation"""
+    def hosting_capacity(
+        self,
+        buses: Optional[List[str]] = None,
+        n_minus_1: bool = False,
+        rating_factor: float = 1.0
+    ) -> Dict[str, Any]:
+        """Extra charging load each bus can host before a branch limit binds"""
+        
+        if self.hosting_capacity_analyzer is None:
+            self.hosting_capacity_analyzer = HostingCapacityAnalyzer(self)
+        
+        return self.hosting_capacity_analyzer.analyze(
+            buses=buses, n_minus_1=n_minus_1, rating_factor=rating_factor
+        )
+    
+    def assess_cascade_risk(
+        self,
+        substations: Optional[List[str]] = None,
+        n_trials: int = 1000,
+        seed: int = 0,
+        trip_probability: float = 0.3
+    ) -> Dict[str, Any]:
+        """
+        Monte Carlo cascade risk per initiating substation
+        Unlike _simulate_cascading_failure this does not touch the live network.
+        """
+        
+        if self.cascade_engine is None:
+            self.cascade_engine = MonteCarloCascadeEngine(self)
+        
+        performance = settings.performance_config
+        workers = performance['num_workers'] if performance['use_multiprocessing'] else 1
+        
+        return self.cascade_engine.run(
+            substations=substations,
+            n_trials=n_trials,
+            seed=seed,
+            params=CascadeParameters(trip_probability=trip_probability),
+            workers=workers
+        )
+    
+    def relieve_overloads(
+        self,
+        ev_stations: Optional[Mapping[str, Tuple[str, float]]] = None,
+        line_limit: float = 1.0,
+        substation_limit: float = 1.0,
+        apply: bool = True
+    ) -> SheddingPlan:
+        """
+        Curtail EV charging, then shed commercial load, until no branch or
+        substation is overloaded
+        
+        Args:
+            ev_stations: Station id -> (bus, requested MW). EV loads are reset to
+                the requested demand first, so earlier curtailment is released
+                when it is no longer needed. Default: curtail the EV_ loads
+            line_limit: Allowed branch loading (fraction of s_nom)
+            substation_limit: Allowed substation loading (fraction of capacity)
+            apply: Write the curtailed and shed loads to the network
+        
+        Returns:
+            SheddingPlan with per-station charging rate factors
+        """
+        
+        if self.load_shedding_optimizer is None:
+            self.load_shedding_optimizer = LoadSheddingOptimizer(self)
+        
+        if ev_stations is not None:
+            self._set_ev_bus_loads(self._station_mw_by_bus(ev_stations, {}))
+        
+        plan = self.load_shedding_optimizer.optimize(
+            ev_stations=ev_stations, line_limit=line_limit, substation_limit=substation_limit
+        )
+        
+        if apply and plan.success:
+            self._apply_shedding_plan(plan, ev_stations)
+        
+        return plan
+    
+    @staticmethod
+    def _station_mw_by_bus(
+        ev_stations: Mapping[str, Tuple[str, float]],
+        shed_mw: Mapping[str, float]
+    ) -> Dict[str, float]:
+        """Station demand minus shedding, summed per bus"""
+        by_bus = {}
+        for station, (bus, mw) in ev_stations.items():
+            by_bus[bus] = by_bus.get(bus, 0.0) + mw - shed_mw.get(station, 0.0)
+        return by_bus
+    
+    def _set_ev_bus_loads(self, mw_by_bus: Mapping[str, float]):
+        """Write the EV load of each bus (first EV load on the bus carries it)"""
+        loads = self.network.loads
+        ev_loads = loads.index[loads.index.str.startswith(self.EV_LOAD_PREFIX)]
+        names, values = [], []
+        for bus, mw in mw_by_bus.items():
+            at_bus = ev_loads[loads.loc[ev_loads, 'bus'].values == bus]
+            if len(at_bus):
+                names.append(at_bus[0])
+                values.append(max(mw, 0.0))
+        if names:
+            self.set_loads(values, names=names)
+    
+    SHEDDING_EVENT = ('load_shedding', 'commercial')
+    
+    def release_load_shedding(self, line_limit: float = 1.0, force: bool = False) -> bool:
+        """
+        Reconnect shed commercial load once the network can carry it again
+        The release is tried on a what-if view first; it is skipped while any
+        branch would load beyond line_limit. Load at a substation that failed
+        after the shedding stays off until that substation is restored.
+        
+        Args:
+            line_limit: Allowed branch loading (fraction of s_nom) after the release
+            force: Release without the loading check
+        
+        Returns:
+            True if the shed load was released
+        """
+        
+        if not self.journal.is_open(self.SHEDDING_EVENT):
+            return False
+        
+        if not force:
+            view = self.what_if()
+            names, values = self.journal.pending_writes(self.SHEDDING_EVENT, 'loads')
+            if len(names):
+                view.set_loads(values.astype(float), names=list(names))
+            if np.nanmax(view.branch_loading(), initial=0.0) > line_limit:
+                return False
+        
+        self.restore_component(*self.SHEDDING_EVENT)
+        self.run_power_flow("dc")
+        logger.info("Released shed commercial load")
+        return True
+    
+    def _apply_shedding_plan(
+        self,
+        plan: SheddingPlan,
+        ev_stations: Optional[Mapping[str, Tuple[str, float]]] = None
+    ):
+        """Write a shedding plan's set points to the network"""
+        
+        if plan.commercial_shed_mw:
+            # Shed commercial load stays journaled until release_load_shedding()
+            event = self.SHEDDING_EVENT
+            if self.journal.begin(event):
+                loads = self.network.loads
+                commercial = self.get_loads(
+                    loads.index[loads.index.str.startswith(LoadSheddingOptimizer.COMMERCIAL_PREFIX)]
+                )
+                self.journal.record(event, 'loads', commercial.index, commercial.values)
+            
+            names = list(plan.commercial_shed_mw)
+            current = self.get_loads(names).values
+            self.set_loads(current - np.array(list(plan.commercial_shed_mw.values())), names=names)
+            logger.warning(f"Shed {plan.commercial_total_mw:.2f} MW of commercial load")
+        
+        if plan.ev_shed_mw:
+            if ev_stations is None:
+                names = list(plan.ev_shed_mw)
+                current = self.get_loads(names).values
+                self.set_loads(current - np.array(list(plan.ev_shed_mw.values())), names=names)
+            else:
+                self._set_ev_bus_loads(self._station_mw_by_bus(ev_stations, plan.ev_shed_mw))
+    
+    def optimize_dispatch(self, start: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Economic dispatch over the rolling horizon
+        Minimizes cost while respecting branch, ramp and storage constraints
+        
+        Args:
+            start: Snapshot position of the first step (default: simulation time of day)
+        """
+        
+        service = self.dispatch_service
+        if start is None:
+            elapsed_s = self.simulation_time_s
+            start = int(elapsed_s // (service.step_minutes * 60)) % len(self.network.snapshots)
+        
+        result = service.solve(start)
+        if not result.success:
+            logger.warning(f"Dispatch failed: {result.status}")
+            return result.to_dict()
+        
+        dt = service.step_minutes / 60.0
+        generation_mwh = result.generator_mw.sum() * dt
+        served_mwh = float((result.load_mw - result.shed_mw).sum() * dt)
+        solar = self.network.generators.carrier == "solar"
+        
+        report = result.to_dict()
+        report.update({
+            'total_cost': result.cost,
+            'average_price': result.cost / served_mwh if served_mwh > 0 else 0.0,
+            'renewable_fraction': float(generation_mwh[solar.values].sum() / served_mwh) if served_mwh > 0 else 0.0,
+            'co2_emissions_tons': self._calculate_emissions(generation_mwh)
+        })
+        return report
+    
+    def redispatch_if_due(self) -> Optional[Dict[str, Any]]:
+        """Re-dispatch once the configured simulated interval has elapsed"""
+        
+        now = self._simulation_clock()
+        interval_s = settings.dispatch_config['redispatch_minutes'] * 60
+        if self._last_dispatch_s is not None and now - self._last_dispatch_s < interval_s:
+            return None
+        
+        if self._last_dispatch_s is not None:
+            self.dispatch_service.advance((now - self._last_dispatch_s) / 60.0)
+        self._last_dispatch_s = now
+        return self.optimize_dispatch()
+    
+    def plan_restoration(
+        self,
+        substations: Optional[List[str]] = None,
+        beam_width: int = 16
+    ) -> Dict[str, Any]:
+        """Restoration order of failed substations that keeps every branch within limits"""
+        
+        if self.restoration_planner is None:
+            self.restoration_planner = RestorationPlanner(self)
+        self.restoration_planner.beam_width = beam_width
+        
+        return self.restoration_planner.plan(substations)
+    
+    def _calculate_emissions(self, generation_mwh: Optional[pd.Series] = None) -> float:
+        """Calculate CO2 emissions from generation (default: the stored schedule)"""
         
         # Emission factors (tons CO2/MWh)
         emission_factors = {
@@ -772,12 +1874,14 @@ class ManhattanPowerGrid:
             'hydro': 0
         }
         
+        if generation_mwh is None:
+            generation_mwh = self.network.generators_t.p.sum()
+        
         total_emissions = 0
         for gen in self.network.generators.index:
             carrier = self.network.generators.at[gen, 'carrier']
             if carrier in emission_factors:
-                generation_mwh = self.network.generators_t.p[gen].sum()
-                total_emissions += generation_mwh * emission_factors.get(carrier, 0.4)
+                total_emissions += generation_mwh.get(gen, 0.0) * emission_factors.get(carrier, 0.4)
         
         return total_emissions
     
@@ -785,28 +1889,21 @@ class ManhattanPowerGrid:
         """Restore failed component to service"""
         
         try:
+            # Replay the exact values the failure overwrote
+            replayed = self.journal.replay((component_type, component_id), self._journal_appliers)
+            self.component_status_version += 1
+            
             if component_type == "substation":
+                self._release_batch_cascades(component_id)
+            
+            if not replayed and component_type == "substation":
                 if component_id in self.substations:
                     self.substations[component_id]['status'] = ComponentStatus.NORMAL
-                    
-                    # Restore generation
-                    for gen in self.network.generators.index:
-                        if component_id in gen:
-                            # Restore to original capacity
-                            original_capacity = self._get_original_capacity(gen)
-                            self.network.generators.at[gen, 'p_nom'] = original_capacity
-                    
-                    # Restore loads
-                    for load in self.network.loads.index:
-                        if component_id in load:
-                            # Restore load profile
-                            self.network.loads.at[load, 'p_set'] = self._get_original_load(load)
             
-            elif component_type == "line":
+            elif not replayed and component_type == "line":
                 if component_id in self.lines:
                     self.lines[component_id]['status'] = ComponentStatus.NORMAL
-                    original_capacity = self.lines[component_id]['capacity_mva']
-                    self.network.lines.at[component_id, 's_nom'] = original_capacity
+                    self.set_line_status(component_id, True)
             
             logger.info(f"Restored {component_type} {component_id}")
             return True
@@ -815,75 +1912,130 @@ class ManhattanPowerGrid:
             logger.error(f"Failed to restore {component_id}: {e}")
             return False
     
-    def _get_original_capacity(self, generator_id: str) -> float:
-        """Get original generator capacity"""
-        # This would be stored in database or configuration
-        capacities = {
-            "Indian_Point_Connection": 2000,
-            "Ravenswood_Connection": 2400,
-            "East_River_Station": 650
+    def _release_batch_cascades(self, substation: str):
+        """Reclose a batch's cascade trips once its last substation is restored"""
+        
+        for event, pending in list(self._batch_cascades.items()):
+            pending.discard(substation)
+            if not pending:
+                del self._batch_cascades[event]
+                self.journal.replay(event, self._journal_appliers)
+    
+    def restore_components(self, components: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """Restore several components, then solve the power flow once"""
+        
+        restored = {
+            component_id: self.restore_component(component_type, component_id)
+            for component_type, component_id in components
         }
-        return capacities.get(generator_id, 100)
+        self.run_power_flow("dc")
+        return restored
     
-    def _get_original_load(self, load_id: str) -> pd.Series:
-        """Get original load profile"""
-        # Regenerate based on load type
-        base_load = 100  # MW
-        return self._generate_load_profile(base_load)
+    @cached_property
+    def _journal_appliers(self) -> Dict[str, Any]:
+        """Journal target -> function writing recorded values back"""
+        
+        def substation_status(names, values):
+            for name, status in zip(names, values):
+                self.substations[name]['status'] = status
+        
+        def generator_p_nom(names, values):
+            self.network.generators.loc[list(names), 'p_nom'] = values.astype(float)
+        
+        def loads(names, values):
+            self.set_loads(values.astype(float), names=list(names))
+        
+        def line_status(names, values):
+            for name, in_service in zip(names, values):
+                in_service = bool(in_service)
+                if name in self.lines:
+                    self.lines[name]['status'] = (
+                        ComponentStatus.NORMAL if in_service else ComponentStatus.FAILED
+                    )
+                self.set_line_status(name, in_service)
+        
+        return {
+            'substation_status': substation_status,
+            'generator_p_nom': generator_p_nom,
+            'loads': loads,
+            'line_status': line_status
+        }
+    
+    def set_simulation_time(self, seconds: float):
+        """Advance the simulation clock used to sample stored network states"""
+        
+        seconds = float(seconds)
+        
+        # The simulation taking over the clock, or rewinding it, restarts sampling
+        if not self._clock_started or seconds < self.simulation_time_s:
+            self._restart_clock()
+        self._clock_started = True
+        self.simulation_time_s = seconds
+    
+    def _restart_clock(self):
+        """Drop time stamps taken against the previous clock"""
+        self.state_writer.reset_sampling()
+        self._last_dispatch_s = None
+    
+    def _simulation_clock(self) -> float:
+        """Simulation time in seconds (starts at 0 until the simulation sets it)"""
+        return self.simulation_time_s
     
     def _store_network_state(self):
-        """Store current network state to database"""
+        """Queue the current network state for write-behind storage"""
+        self.state_writer.offer(self._simulation_clock(), self._capture_network_state)
+    
+    def _capture_network_state(self) -> Dict[str, Any]:
+        """Copy the state needed for a NetworkState row (serialized by the writer)"""
+        return {
+            'simulation_time': int(self.network.snapshots[0].timestamp()),
+            'buses': self.network.buses.copy(),
+            'generators': self.network.generators.copy(),
+            'loads': self.network.loads.copy(),
+            'lines': self.network.lines.copy(),
+            'total_load_mw': float(self.network.loads_t.p.sum().sum()),
+            'total_generation_mw': float(self.network.generators_t.p.sum().sum()),
+            'system_frequency': self.current_state['frequency'],
+            'health_score': self._calculate_health_score()
+        }
+    
+    @staticmethod
+    def _network_state_record(snapshot: Dict[str, Any]) -> NetworkState:
+        """Build a NetworkState row from a captured snapshot (writer thread)"""
         import json
         
-        try:
-            with db_manager.get_session() as session:
-                state = NetworkState(
-                    simulation_time=int(self.network.snapshots[0].timestamp()),
-                    power_data=json.dumps({  # Convert dict to JSON string
-                        'buses': self.network.buses.to_dict(),
-                        'generators': self.network.generators.to_dict(),
-                        'loads': self.network.loads.to_dict(),
-                        'lines': self.network.lines.to_dict()
-                    }),
-                    total_load_mw=float(self.network.loads_t.p.sum().sum()),
-                    total_generation_mw=float(self.network.generators_t.p.sum().sum()),
-                    system_frequency=self.current_state['frequency'],
-                    traffic_data=json.dumps({}),  # Empty dict as JSON
-                    active_vehicles=0,
-                    health_score=self._calculate_health_score(),
-                    active_failures=json.dumps([]),  # Empty list as JSON
-                    warnings=json.dumps([])  # Empty list as JSON
-                )
-                
-                session.add(state)
-                session.commit()
-                
-        except Exception as e:
-            logger.error(f"Failed to store network state: {e}")
+        return NetworkState(
+            simulation_time=snapshot['simulation_time'],
+            power_data=json.dumps({  # Convert dict to JSON string
+                'buses': snapshot['buses'].to_dict(),
+                'generators': snapshot['generators'].to_dict(),
+                'loads': snapshot['loads'].to_dict(),
+                'lines': snapshot['lines'].to_dict()
+            }),
+            total_load_mw=snapshot['total_load_mw'],
+            total_generation_mw=snapshot['total_generation_mw'],
+            system_frequency=snapshot['system_frequency'],
+            traffic_data=json.dumps({}),  # Empty dict as JSON
+            active_vehicles=0,
+            health_score=snapshot['health_score'],
+            active_failures=json.dumps([]),  # Empty list as JSON
+            warnings=json.dumps([])  # Empty list as JSON
+        )
+    
+    def get_persistence_metrics(self) -> Dict[str, Any]:
+        """Write-behind queue metrics"""
+        return self.state_writer.get_metrics()
+    
     def _calculate_health_score(self) -> float:
         """Calculate overall system health score (0-100)"""
         
-        score = 100.0
-        
         # Deduct for failed components
         failed_count = sum(
             1 for s in self.substations.values() 
             if s['status'] == ComponentStatus.FAILED
         )
-        score -= failed_count * 20
-        
-        # Deduct for voltage violations
-        v_pu = self.network.buses_t.v_mag_pu.iloc[0]
-        violations = ((v_pu < 0.95) | (v_pu > 1.05)).sum()
-        score -= violations * 5
-        
-        # Deduct for overloaded lines
-        line_flows = abs(self.network.lines_t.p0.iloc[0])
-        line_limits = self.network.lines.s_nom
-        overloads = (line_flows > line_limits).sum()
-        score -= overloads * 10
         
-        return max(0, min(100, score))
+        return self._current_analysis().health_score(failed_count)
     
     def _log_incident(self, impact: Dict[str, Any]):
         """Log incident to database"""
@@ -907,7 +2059,29 @@ class ManhattanPowerGrid:
             logger.error(f"Failed to log incident: {e}")
     
     def get_system_status(self) -> Dict[str, Any]:
-        """Get comprehensive system status"""
+        """
+        Get comprehensive system status
+        The aggregate is computed once per power flow result and component
+        status change; repeated calls return a shallow copy of the cached value.
+        """
+        
+        return dict(self._cached_status())
+    
+    def get_status_etag(self) -> str:
+        """Entity tag of the cached status aggregate"""
+        return f"grid-{self._cached_status()['status_revision']}"
+    
+    def _cached_status(self) -> Dict[str, Any]:
+        key = (self.power_flow_version, self.component_status_version, self.current_state['frequency'])
+        if self._status_cache is None or key != self._status_key:
+            self.status_revision += 1
+            self._status_cache = self._compute_system_status()
+            self._status_cache['status_revision'] = self.status_revision
+            self._status_key = key
+        return self._status_cache
+    
+    def _compute_system_status(self) -> Dict[str, Any]:
+        """Status aggregate from the latest power flow and component states"""
         
         return {
             'timestamp': datetime.now().isoformat(),
@@ -0,0 +1,198 @@
+"""
+Manhattan Power Grid - Restoration Sequencing
+Orders the restoration of failed substations to minimize unserved MW-minutes
+without overloading the network. Flows are linear in the restored set, so
+each candidate step is one vector addition of precomputed PTDF flow deltas,
+and a beam search over restored sets evaluates hundreds of sequences in
+milliseconds.
+"""
+
+import time
+import numpy as np
+from typing import Dict, List, Optional, Any
+
+
+class RestorationPlanner:
+    """
+    Beam search over substation restoration orders
+    Lines tripped by a failure's cascade are reclosed first (no load pickup),
+    then substations are restored one per step. A step is allowed if no
+    branch ends above its limit, or above its pre-step flow where it was
+    already overloaded.
+    """
+
+    def __init__(
+        self,
+        power_grid,
+        beam_width: int = 16,
+        step_minutes: float = 10.0,
+        loading_limit: float = 1.0,
+        tolerance_mw: float = 1e-6
+    ):
+        self.power_grid = power_grid
+        self.beam_width = beam_width
+        self.step_minutes = step_minutes
+        self.loading_limit = loading_limit
+        self.tolerance_mw = tolerance_mw
+
+    def failed_substations(self) -> List[str]:
+        """Substations with an open failure in the grid's state journal"""
+        return [
+            name for component_type, name in self.power_grid.journal.open_events()
+            if component_type == "substation"
+        ]
+
+    def _restoration_deltas(self, substations: List[str]):
+        """Reclosed-topology view, restored MW and flow delta per substation"""
+
+        grid = self.power_grid
+        view = grid.what_if()
+        entries = {name: grid.journal.entries(("substation", name)) for name in substations}
+
+        reclosed = []
+        for name in substations:
+            for entry in entries[name]:
+                if entry.target == 'line_status':
+                    for line, in_service in zip(entry.keys, entry.values):
+                        if in_service and view.set_branch_status(line, True):
+                            reclosed.append(line)
+
+        solver = view.solver
+        bus_of_load = dict(zip(grid.network.loads.index, grid.network.loads.bus))
+        n_bus = len(solver.bus_names)
+
+        restored_mw = np.zeros(len(substations))
+        injection_delta = np.zeros((n_bus, len(substations)))
+        for column, name in enumerate(substations):
+            for entry in entries[name]:
+                if entry.target != 'loads':
+                    continue
+                names = list(entry.keys)
+                delta = entry.values.astype(float) - view.get_loads(names).values
+                buses = solver.bus_names.get_indexer([bus_of_load[load] for load in names])
+                injection_delta[:, column] -= np.bincount(buses, weights=delta, minlength=n_bus)
+                restored_mw[column] += delta.sum()
+
+        flow_delta = solver.ptdf @ injection_delta  # branch x substation
+        return view, reclosed, restored_mw, flow_delta
+
+    def plan(self, substations: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Restoration order minimizing unserved MW-minutes within branch limits
+
+        Args:
+            substations: Failed substations to sequence (default: all failed ones)
+
+        Returns:
+            Sequence of steps, substations that cannot be restored within limits,
+            and the unserved MW-minutes of the plan
+        """
+        start = time.perf_counter()
+        failed = self.failed_substations()
+        if substations is not None:
+            wanted = set(substations)
+            failed = [name for name in failed if name in wanted]
+
+        n = len(failed)
+        view, reclosed, restored_mw, flow_delta = self._restoration_deltas(failed)
+
+        solver = view.solver
+        ratings = view.ratings
+        rated = solver.active & (ratings > 0)
+        limit = np.where(rated, ratings * self.loading_limit, np.inf)
+        base_flows = view.solve().flows_mw
+
+        step = self.step_minutes
+        horizon = (n + 1) * step  # Substations left out stay dark until the horizon
+
+        # Beam entries: (cost so far, order, mask, flows)
+        beam = [(0.0, (), np.zeros(n, dtype=bool), base_flows)]
+        best = None
+        evaluated = 0
+
+        for depth in range(1, n + 1):
+            candidates = {}
+
+            for cost, order, mask, flows in beam:
+                remaining = np.flatnonzero(~mask)
+
+                # All single-step extensions at once: flows x candidates
+                new_flows = flows[:, None] + flow_delta[:, remaining]
+                allowed = np.abs(new_flows) <= np.maximum(limit, np.abs(flows))[:, None] + self.tolerance_mw
+                feasible = allowed.all(axis=0)
+                evaluated += len(remaining)
+
+                if not feasible.any():
+                    # Dead end: what is left stays unserved until the horizon
+                    final = cost + restored_mw[remaining].sum() * horizon
+                    if best is None or final < best[0]:
+                        best = (final, order)
+                    continue
+
+                for column in np.flatnonzero(feasible):
+                    substation = remaining[column]
+                    new_mask = mask.copy()
+                    new_mask[substation] = True
+                    new_cost = cost + restored_mw[substation] * depth * step
+                    key = new_mask.tobytes()
+
+                    # Flows depend only on the restored set: keep its cheapest order
+                    if key not in candidates or new_cost < candidates[key][0]:
+                        candidates[key] = (
+                            new_cost, order + (substation,), new_mask, new_flows[:, column]
+                        )
+
+            if not candidates:
+                break
+
+            # Rank by cost plus an optimistic bound (largest remaining restored next)
+            def bound(entry):
+                cost, _, mask, _ = entry
+                rest = np.sort(restored_mw[~mask])[::-1]
+                slots = (depth + 1 + np.arange(len(rest))) * step
+                return cost + float((rest * slots).sum())
+
+            beam = sorted(candidates.values(), key=bound)[:self.beam_width]
+
+            if depth == n:
+                final, order = beam[0][0], beam[0][1]
+                if best is None or final < best[0]:
+                    best = (final, order)
+
+        if best is None:
+            best = (0.0, ())
+
+        # Replay the chosen order for the per-step report
+        sequence = []
+        flows = base_flows
+        for position, substation in enumerate(best[1], start=1):
+            flows = flows + flow_delta[:, substation]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                loading = np.where(rated, np.abs(flows) / ratings, 0.0)
+            sequence.append({
+                'step': position,
+                'substation': failed[substation],
+                'time_min': position * step,
+                'restored_mw': float(restored_mw[substation]),
+                'max_loading_after': float(loading.max()) if len(loading) else 0.0
+            })
+
+        restored = set(best[1])
+        all_flows = base_flows + flow_delta.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            all_loading = np.where(rated, np.abs(all_flows) / ratings, 0.0)
+
+        return {
+            'failed_substations': failed,
+            'sequence': sequence,
+            'blocked': [failed[k] for k in range(n) if k not in restored],
+            'lines_reclosed_first': reclosed,
+            'unserved_mw_minutes': float(best[0]),
+            'all_at_once_max_loading': float(all_loading.max()) if len(all_loading) else 0.0,
+            'step_minutes': step,
+            'sequences_evaluated': evaluated,
+            'solve_ms': (time.perf_counter() - start) * 1000
+        }
+
+
+__all__ = ["RestorationPlanner"]
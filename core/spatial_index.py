@@ -0,0 +1,98 @@
+"""
+Manhattan Power Grid - Spatial Index
+Nearest-neighbour lookups over lat/lon points with the street-grid
+(Manhattan, L1) distance used by the distribution network builder. Backed by
+a KD-tree, so assigning n points to m sites costs O(n log m) instead of the
+O(n * m) pairwise scan.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+from typing import List, Optional, Sequence, Tuple
+
+
+class SpatialIndex:
+    """
+    KD-tree over named sites with vectorized L1 nearest-neighbour queries
+    Ties are broken by insertion order, matching a first-wins linear scan.
+    """
+
+    TIE_CANDIDATES = 4  # Neighbours re-measured to settle equidistant sites
+
+    def __init__(self, names: Sequence[str], lats: Sequence[float], lons: Sequence[float]):
+        self.names = list(names)
+        self.points = np.column_stack([
+            np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        ]).reshape(-1, 2)
+        self._tree = cKDTree(self.points) if len(self.names) else None
+
+    @classmethod
+    def from_records(cls, records: dict, lat_key: str = 'lat', lon_key: str = 'lon') -> "SpatialIndex":
+        """Index a name -> {'lat', 'lon', ...} mapping"""
+        names = list(records)
+        return cls(
+            names,
+            [records[name][lat_key] for name in names],
+            [records[name][lon_key] for name in names]
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def nearest(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        max_distance: float = np.inf
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest site of each query point
+
+        Args:
+            lats, lons: Query coordinates
+            max_distance: Points with no site strictly closer get position -1
+
+        Returns:
+            (site positions, L1 distances); distance is inf where nothing was found
+        """
+        queries = np.column_stack([
+            np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        ]).reshape(-1, 2)
+        n = len(queries)
+
+        if self._tree is None or n == 0:
+            return np.full(n, -1, dtype=int), np.full(n, np.inf)
+
+        k = min(self.TIE_CANDIDATES, len(self.names))
+        _, positions = self._tree.query(queries, k=k, p=1)
+        positions = positions.reshape(n, k)
+
+        # Re-measure the candidates exactly as |dlat| + |dlon|, then keep the
+        # earliest inserted site among equidistant ones
+        sites = self.points[positions]
+        distances = (
+            np.abs(queries[:, None, 0] - sites[:, :, 0]) +
+            np.abs(queries[:, None, 1] - sites[:, :, 1])
+        )
+        tied = distances == distances.min(axis=1, keepdims=True)
+        column = np.argmin(np.where(tied, positions, len(self.names)), axis=1)
+        rows = np.arange(n)
+        best, best_distance = positions[rows, column], distances[rows, column]
+
+        missing = ~(best_distance < max_distance)
+        best = np.where(missing, -1, best)
+        best_distance = np.where(missing, np.inf, best_distance)
+        return best.astype(int), best_distance
+
+    def nearest_names(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        max_distance: float = np.inf
+    ) -> List[Optional[str]]:
+        """Names of the nearest sites (None where nothing is within max_distance)"""
+        positions, _ = self.nearest(lats, lons, max_distance)
+        return [self.names[p] if p >= 0 else None for p in positions]
+
+
+__all__ = ["SpatialIndex"]
@@ -0,0 +1,169 @@
+"""
+Manhattan Power Grid - Component State Journal
+Failures record the exact values they overwrite, grouped per failure event.
+Restoring an event replays those values in reverse order, so undo costs
+O(changed components) and never has to reconstruct state from defaults.
+Events may overlap and be restored in any order: a value that a later open
+event also overwrote is handed to that event instead of being written back.
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    """Prior values of one attribute for a set of components"""
+    target: str  # What was overwritten, e.g. 'generator_p_nom'
+    keys: np.ndarray  # Component names or ids
+    values: np.ndarray  # Values before the change, aligned with keys
+
+
+class StateJournal:
+    """
+    Undo log of component state, one open transaction per failure event
+    A transaction is only opened once: failing an already failed component
+    keeps the original prior values instead of recording its failed state.
+    """
+
+    def __init__(self):
+        self._transactions: Dict[Hashable, List[JournalEntry]] = {}
+        self._opened_at: Dict[Hashable, int] = {}
+        self._owners: Dict[Tuple[str, Hashable], List[Hashable]] = {}  # (target, key) -> open events
+        self._sequence = 0
+        self.stats = {
+            'opened': 0, 'replayed': 0, 'entries_replayed': 0, 'values_replayed': 0, 'values_handed_over': 0
+        }
+
+    def begin(self, event: Hashable) -> bool:
+        """
+        Open a transaction for a failure event
+
+        Returns:
+            True if the transaction is new and prior values should be recorded
+        """
+        if event in self._transactions:
+            return False
+
+        self._transactions[event] = []
+        self._opened_at[event] = self._sequence
+        self._sequence += 1
+        self.stats['opened'] += 1
+        return True
+
+    def record(self, event: Hashable, target: str, keys: Sequence, values: Sequence):
+        """Record the values about to be overwritten"""
+        entry = JournalEntry(
+            target=target,
+            keys=np.asarray(keys, dtype=object),
+            values=np.asarray(values) if not isinstance(values, np.ndarray) else values.copy()
+        )
+        self._transactions[event].append(entry)
+
+        for key in entry.keys:
+            owners = self._owners.setdefault((target, key), [])
+            if event not in owners:
+                owners.append(event)
+
+    def is_open(self, event: Hashable) -> bool:
+        return event in self._transactions
+
+    def open_events(self) -> List[Hashable]:
+        return list(self._transactions)
+
+    def entries(self, event: Hashable) -> List[JournalEntry]:
+        """Recorded entries of an open event, oldest first (empty if none)"""
+        return list(self._transactions.get(event, []))
+
+    def pending_writes(self, event: Hashable, target: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(keys, values) of a target that replaying the event would write back"""
+        if event not in self._transactions:
+            return np.array([], dtype=object), np.array([])
+
+        opened_at = self._opened_at[event]
+        written = {}
+        for entry in reversed(self._transactions[event]):
+            if entry.target == target:
+                for key, value in zip(entry.keys, entry.values):
+                    if self._next_owner(target, key, opened_at) is None:
+                        written[key] = value
+        return np.array(list(written), dtype=object), np.array(list(written.values()))
+
+    def replay(
+        self,
+        event: Hashable,
+        appliers: Dict[str, Callable[[np.ndarray, np.ndarray], None]]
+    ) -> bool:
+        """
+        Write an event's prior values back and close its transaction
+        Values a later, still open event also overwrote are not written:
+        that event's recorded prior value is replaced instead, so undoing it
+        later restores the state as if this event had never happened.
+
+        Args:
+            event: Failure event to undo
+            appliers: target -> function(keys, values) writing the values back
+
+        Returns:
+            False if no transaction was open for the event
+        """
+        entries = self._transactions.pop(event, None)
+        if entries is None:
+            return False
+        opened_at = self._opened_at.pop(event)
+
+        for entry in reversed(entries):
+            write = np.ones(len(entry.keys), dtype=bool)
+            for i, key in enumerate(entry.keys):
+                heir = self._next_owner(entry.target, key, opened_at)
+                if heir is not None:
+                    self._hand_over(heir, entry.target, key, entry.values[i])
+                    write[i] = False
+
+            if write.all():
+                appliers[entry.target](entry.keys, entry.values)
+            elif write.any():
+                appliers[entry.target](entry.keys[write], entry.values[write])
+            self.stats['entries_replayed'] += 1
+            self.stats['values_replayed'] += int(np.count_nonzero(write))
+            self.stats['values_handed_over'] += int(len(write) - np.count_nonzero(write))
+
+        for entry in entries:
+            for key in entry.keys:
+                owners = self._owners.get((entry.target, key))
+                if owners and event in owners:
+                    owners.remove(event)
+                    if not owners:
+                        del self._owners[(entry.target, key)]
+
+        self.stats['replayed'] += 1
+        return True
+
+    def _next_owner(self, target: str, key: Hashable, opened_at: int):
+        """Earliest open event opened after opened_at that also recorded (target, key)"""
+        later = [
+            owner for owner in self._owners.get((target, key), [])
+            if self._opened_at.get(owner, -1) > opened_at
+        ]
+        return min(later, key=self._opened_at.get) if later else None
+
+    def _hand_over(self, heir: Hashable, target: str, key: Hashable, value: Any):
+        """Make value the prior value heir restores for (target, key)"""
+        for entry in self._transactions[heir]:
+            if entry.target == target:
+                positions = np.flatnonzero(entry.keys == key)
+                if len(positions):
+                    entry.values[positions[0]] = value
+                    return
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['open_transactions'] = len(self._transactions)
+        stats['pending_values'] = sum(
+            len(entry.keys) for entries in self._transactions.values() for entry in entries
+        )
+        return stats
+
+
+__all__ = ["StateJournal", "JournalEntry"]
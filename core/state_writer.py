@@ -0,0 +1,198 @@
+"""
+Manhattan Power Grid - Write-Behind State Persistence
+Network state snapshots are sampled on the hot path and written to the
+database in batches by a background thread, so power flow latency no
+longer includes serialization or database I/O.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class NetworkStateWriter:
+    """
+    Bounded write-behind queue with a single background writer
+    Snapshots are offered with a simulation timestamp; at most one snapshot per
+    sample interval is accepted. When the queue is full the oldest pending
+    snapshot is dropped so the producer never blocks.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        record_factory: Callable[[Dict[str, Any]], Any],
+        sample_interval_s: float = 60.0,
+        max_queue: int = 256,
+        batch_size: int = 32,
+        flush_interval_s: float = 1.0
+    ):
+        self.session_factory = session_factory
+        self.record_factory = record_factory
+        self.sample_interval_s = sample_interval_s
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_sample_time = None
+
+        # Back-pressure and throughput metrics
+        self.metrics = {
+            'offered': 0,
+            'sampled_out': 0,
+            'enqueued': 0,
+            'dropped': 0,
+            'written': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'queue_high_water': 0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0
+        }
+
+    def offer(self, sim_time_s: float, capture: Callable[[], Dict[str, Any]]) -> bool:
+        """
+        Offer a snapshot taken at a simulation time
+
+        Args:
+            sim_time_s: Simulation clock in seconds
+            capture: Builds the snapshot; only called if the sample is accepted
+
+        Returns:
+            True if a snapshot was queued
+        """
+
+        with self._lock:
+            self.metrics['offered'] += 1
+
+            if (self._last_sample_time is not None and
+                    sim_time_s - self._last_sample_time < self.sample_interval_s):
+                self.metrics['sampled_out'] += 1
+                return False
+
+            self._last_sample_time = sim_time_s
+
+        snapshot = capture()
+        self._ensure_running()
+
+        while True:
+            try:
+                self._queue.put_nowait(snapshot)
+                break
+            except queue.Full:
+                # Drop the oldest pending snapshot rather than block the solver
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    with self._lock:
+                        self.metrics['dropped'] += 1
+                except queue.Empty:
+                    pass
+
+        with self._lock:
+            self.metrics['enqueued'] += 1
+            self.metrics['queue_high_water'] = max(
+                self.metrics['queue_high_water'], self._queue.qsize()
+            )
+
+        return True
+
+    def reset_sampling(self):
+        """Forget the last sample time (the simulation clock was restarted)"""
+        with self._lock:
+            self._last_sample_time = None
+
+    def _ensure_running(self):
+        """Start the background writer on first use"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="network-state-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Writer loop: collect a batch, then insert it in one transaction"""
+
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                first = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Serialize and insert a batch of snapshots"""
+
+        start = time.perf_counter()
+
+        try:
+            records = [self.record_factory(snapshot) for snapshot in batch]
+
+            with self.session_factory() as session:
+                session.add_all(records)
+                session.commit()
+
+            with self._lock:
+                self.metrics['written'] += len(batch)
+                self.metrics['batches'] += 1
+
+        except Exception as e:
+            with self._lock:
+                self.metrics['failed_batches'] += 1
+            print(f"[ERROR] Failed to store {len(batch)} network states: {e}")
+
+        with self._lock:
+            self.metrics['last_batch_size'] = len(batch)
+            self.metrics['last_batch_ms'] = (time.perf_counter() - start) * 1000
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued snapshot has been handled"""
+
+        if self._thread is None:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Drain the queue and stop the writer thread"""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Snapshot of the queue metrics"""
+
+        with self._lock:
+            metrics = dict(self.metrics)
+
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['queue_capacity'] = self._queue.maxsize
+        metrics['sample_interval_s'] = self.sample_interval_s
+
+        return metrics
+
+
+__all__ = ["NetworkStateWriter"]
@@ -0,0 +1,286 @@
+"""
+Manhattan Power Grid - Columnar Traffic Light State
+Power-side traffic light state kept as NumPy columns (position, feeding
+substation/transformer, powered flag, phase code). Phases come from a fixed
+signal cycle shifted by a per-intersection offset (a green wave along the
+avenues and streets), so one vectorized pass sets every light for a given
+simulation time. Dict-style access per light is kept through record views.
+"""
+
+import numpy as np
+from typing import Any, Dict, Iterator, List, Mapping, MutableMapping, Sequence
+
+# Phase codes stored in the phase column
+RED, GREEN, YELLOW, OFF = 0, 1, 2, 3
+PHASES = ('red', 'green', 'yellow', 'off')
+PHASE_COLORS = ('#ff0000', '#00ff00', '#ffff00', '#000000')
+PHASE_CODES = {name: code for code, name in enumerate(PHASES)}
+COLOR_CODES = {color: code for code, color in enumerate(PHASE_COLORS)}
+
+# Fixed-time signal plan: 35% green, 5% yellow, 60% red
+CYCLE_S = 90.0
+GREEN_S = 31.5
+YELLOW_S = 4.5
+
+# Green-wave progression speed and metres per degree at Manhattan's latitude
+PROGRESSION_SPEED_MS = 12.0
+METERS_PER_DEG_LAT = 111_000.0
+METERS_PER_DEG_LON = 84_000.0
+
+
+def cycle_offsets(lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Per-intersection cycle offsets (s) giving a progression along both axes"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if lats.size == 0:
+        return np.zeros(0)
+
+    north_m = (lats - lats.min()) * METERS_PER_DEG_LAT
+    east_m = (lons - lons.min()) * METERS_PER_DEG_LON
+    return np.mod((north_m + east_m) / PROGRESSION_SPEED_MS, CYCLE_S)
+
+
+def cycle_phases(time_s: float, offsets: np.ndarray) -> np.ndarray:
+    """Phase code of each light at a simulation time"""
+    position = np.mod(time_s + offsets, CYCLE_S)
+    return np.where(
+        position < GREEN_S, GREEN,
+        np.where(position < GREEN_S + YELLOW_S, YELLOW, RED)
+    ).astype(np.int8)
+
+
+class TrafficLightRecord(MutableMapping):
+    """Dict-style view of one light; 'powered', 'phase' and 'color' are writable"""
+
+    __slots__ = ('_table', '_position')
+
+    def __init__(self, table: "TrafficLightTable", position: int):
+        self._table = table
+        self._position = position
+
+    def __getitem__(self, key: str) -> Any:
+        return self._table.value(self._position, key)
+
+    def __setitem__(self, key: str, value: Any):
+        self._table.set_value(self._position, key, value)
+
+    def __delitem__(self, key: str):
+        raise TypeError("Traffic light fields cannot be deleted")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(TrafficLightTable.FIELDS)
+
+    def __len__(self) -> int:
+        return len(TrafficLightTable.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"TrafficLightRecord({dict(self)!r})"
+
+
+class TrafficLightTable(Mapping):
+    """
+    Traffic lights as columns, also usable as an id -> record mapping
+    Counts, serialization and failure handling work on whole columns or
+    position arrays; per-light views exist for callers that need one light.
+    """
+
+    FIELDS = (
+        'id', 'lat', 'lon', 'intersection', 'powered', 'substation',
+        'transformer', 'power_kw', 'battery_backup', 'phase', 'color'
+    )
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        lats: Sequence[float],
+        lons: Sequence[float],
+        intersections: Sequence[str],
+        battery_backup: Sequence[bool],
+        transformer_idx: Sequence[int],
+        transformer_names: Sequence[str],
+        transformer_substation_idx: Sequence[int],
+        substation_names: Sequence[str],
+        power_kw: float = 0.3
+    ):
+        self.ids = [str(tl_id) for tl_id in ids]
+        self.index = {tl_id: position for position, tl_id in enumerate(self.ids)}
+        self.intersections = list(intersections)
+        self.transformer_names = list(transformer_names)
+        self.substation_names = list(substation_names)
+        self.power_kw = float(power_kw)
+
+        self.lat = np.array(lats, dtype=float)
+        self.lon = np.array(lons, dtype=float)
+        self.battery_backup = np.array(battery_backup, dtype=bool)
+        self.transformer_idx = np.array(transformer_idx, dtype=np.int32)
+        self.substation_idx = np.asarray(transformer_substation_idx, dtype=np.int32)[self.transformer_idx]
+        self.powered = np.ones(len(self.ids), dtype=bool)
+        self.offset_s = cycle_offsets(self.lat, self.lon)
+
+        self.time_s = 0.0
+        self.phase = cycle_phases(self.time_s, self.offset_s)
+
+        # Aggregates kept current by every state change, so counts() is O(1)
+        self._phase_counts = np.bincount(self.phase, minlength=len(PHASES))
+        self._powered_count = len(self.ids)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Dict[str, Dict[str, Any]],
+        transformer_names: Sequence[str],
+        transformer_substations: Sequence[str],
+        substation_names: Sequence[str]
+    ) -> "TrafficLightTable":
+        """Columnize assigned light dicts (every light needs a transformer)"""
+        dt_pos = {name: i for i, name in enumerate(transformer_names)}
+        sub_pos = {name: i for i, name in enumerate(substation_names)}
+        lights = list(records.values())
+        return cls(
+            ids=list(records),
+            lats=[tl['lat'] for tl in lights],
+            lons=[tl['lon'] for tl in lights],
+            intersections=[tl['intersection'] for tl in lights],
+            battery_backup=[tl['battery_backup'] for tl in lights],
+            transformer_idx=[dt_pos[tl['transformer']] for tl in lights],
+            transformer_names=transformer_names,
+            transformer_substation_idx=[sub_pos[name] for name in transformer_substations],
+            substation_names=substation_names
+        )
+
+    # Mapping interface
+
+    def __getitem__(self, tl_id: str) -> TrafficLightRecord:
+        return TrafficLightRecord(self, self.index[tl_id])
+
+    def __contains__(self, tl_id: object) -> bool:
+        return tl_id in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def value(self, position: int, key: str) -> Any:
+        """One field of one light"""
+        if key == 'id':
+            return self.ids[position]
+        if key == 'lat':
+            return float(self.lat[position])
+        if key == 'lon':
+            return float(self.lon[position])
+        if key == 'intersection':
+            return self.intersections[position]
+        if key == 'powered':
+            return bool(self.powered[position])
+        if key == 'substation':
+            return self.substation_names[self.substation_idx[position]]
+        if key == 'transformer':
+            return self.transformer_names[self.transformer_idx[position]]
+        if key == 'power_kw':
+            return self.power_kw
+        if key == 'battery_backup':
+            return bool(self.battery_backup[position])
+        if key == 'phase':
+            return PHASES[self.phase[position]]
+        if key == 'color':
+            return PHASE_COLORS[self.phase[position]]
+        raise KeyError(key)
+
+    def set_value(self, position: int, key: str, value: Any):
+        """Write a state field of one light"""
+        if key == 'powered':
+            self._powered_count += int(bool(value)) - int(self.powered[position])
+            self.powered[position] = bool(value)
+        elif key in ('phase', 'color'):
+            code = PHASE_CODES[value] if key == 'phase' else COLOR_CODES[value]
+            self._phase_counts[self.phase[position]] -= 1
+            self._phase_counts[code] += 1
+            self.phase[position] = code
+        elif key in self.FIELDS:
+            raise KeyError(f"Traffic light field '{key}' is read-only")
+        else:
+            raise KeyError(key)
+
+    # Column operations
+
+    def positions(self, ids: Sequence[str]) -> np.ndarray:
+        """Row positions of light ids"""
+        return np.fromiter((self.index[tl_id] for tl_id in ids), dtype=np.intp, count=len(ids))
+
+    def update_phases(self, time_s: float):
+        """Advance every powered light to its cycle phase at time_s; dark lights stay OFF"""
+        self.time_s = float(time_s)
+        self.phase = np.where(self.powered, cycle_phases(self.time_s, self.offset_s), OFF).astype(np.int8)
+        self._phase_counts = np.bincount(self.phase, minlength=len(PHASES))
+
+    def set_powered(self, positions: np.ndarray, powered: Any):
+        """Power lights on or off; re-powered lights rejoin the cycle at the current time"""
+        positions = np.asarray(positions, dtype=np.intp)
+        was_powered = int(np.count_nonzero(self.powered[positions]))
+        old_phases = self.phase[positions]
+
+        self.powered[positions] = powered
+        self.phase[positions] = np.where(
+            self.powered[positions],
+            cycle_phases(self.time_s, self.offset_s[positions]),
+            OFF
+        )
+
+        self._powered_count += int(np.count_nonzero(self.powered[positions])) - was_powered
+        self._phase_counts += (
+            np.bincount(self.phase[positions], minlength=len(PHASES)) -
+            np.bincount(old_phases, minlength=len(PHASES))
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Lights per phase plus the powered total (maintained incrementally)"""
+        counts = {name: int(count) for name, count in zip(PHASES, self._phase_counts)}
+        counts['powered'] = self._powered_count
+        return counts
+
+    def static_records(self) -> List[Dict[str, Any]]:
+        """Serialized lights without their state (positions match the columns)"""
+        substations = np.array(self.substation_names, dtype=object)[self.substation_idx]
+        return [
+            {'id': tl_id, 'lat': lat, 'lon': lon, 'substation': substation, 'intersection': intersection}
+            for tl_id, lat, lon, substation, intersection in zip(
+                self.ids, self.lat.tolist(), self.lon.tolist(), substations.tolist(), self.intersections
+            )
+        ]
+
+    def state_columns(self) -> Dict[str, List[int]]:
+        """Light state keyed by position: phase codes and the positions of dark lights"""
+        return {
+            'phase': self.phase.tolist(),
+            'dark': np.flatnonzero(~self.powered).tolist()
+        }
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Serialized lights for the visualization payload"""
+        substations = np.array(self.substation_names, dtype=object)[self.substation_idx]
+        phases = np.array(PHASES, dtype=object)[self.phase]
+        colors = np.array(PHASE_COLORS, dtype=object)[self.phase]
+        return [
+            {
+                'id': tl_id,
+                'lat': lat,
+                'lon': lon,
+                'powered': powered,
+                'color': color,
+                'phase': phase,
+                'substation': substation,
+                'intersection': intersection
+            }
+            for tl_id, lat, lon, powered, color, phase, substation, intersection in zip(
+                self.ids, self.lat.tolist(), self.lon.tolist(), self.powered.tolist(),
+                colors.tolist(), phases.tolist(), substations.tolist(), self.intersections
+            )
+        ]
+
+
+__all__ = [
+    "TrafficLightTable", "TrafficLightRecord", "cycle_offsets", "cycle_phases",
+    "PHASES", "PHASE_COLORS", "RED", "GREEN", "YELLOW", "OFF", "CYCLE_S"
+]
@@ -234,33 +234,28 @@ class ManhattanTrafficDistribution:
     def _integrate_with_pypsa(self):
         """Add traffic lights as loads to PyPSA network"""
         
+        network = self.power_grid.network
+        names, buses, base_mw = [], [], []
+        
         for feeder_id, feeder in self.feeders.items():
-            # Calculate total load for this feeder
-            total_load_mw = len(feeder.loads) * 0.0003  # 300W per signal
-            
             # Find the bus in PyPSA network
             bus_name = f"{feeder.substation}_13.8kV"
             
-            if bus_name in self.power_grid.network.buses.index:
-                # Add as aggregated load
-                load_name = f"TrafficLights_{feeder_id}"
-                
-                # Create time-varying profile (dimmer at night)
-                hours = self.power_grid.network.snapshots.hour
-                load_profile = pd.Series(index=self.power_grid.network.snapshots)
-                
-                for i, h in enumerate(hours):
-                    if 6 <= h <= 22:
-                        load_profile.iloc[i] = total_load_mw  # Full power during day
-                    else:
-                        load_profile.iloc[i] = total_load_mw * 0.7  # Reduced at night
-                
-                self.power_grid.network.add(
-                    "Load",
-                    load_name,
-                    bus=bus_name,
-                    p_set=load_profile
-                )
+            if bus_name in network.buses.index:
+                # Add as aggregated load (300W per signal)
+                names.append(f"TrafficLights_{feeder_id}")
+                buses.append(bus_name)
+                base_mw.append(len(feeder.loads) * 0.0003)
+        
+        # Time-varying profiles (dimmer at night) for every feeder, attached in one call
+        if names:
+            profiles = self.power_grid.profiles
+            network.madd(
+                "Load",
+                names,
+                bus=buses,
+                p_set=profiles.frame(profiles.traffic_lights(base_mw), names)
+            )
     
     def simulate_substation_failure(self, substation_name: str) -> Dict[str, Any]:
         """Simulate failure with accurate cascading effects"""
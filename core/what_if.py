@@ -0,0 +1,367 @@
+"""
+Manhattan Power Grid - Copy-on-Write What-If Views
+A view overlays branch status, branch ratings, load values and generator
+limits on an immutable snapshot of the live operating point. Views never
+write to the PyPSA network, so contingency screens and failure studies can
+run side by side (threads or processes) while the live grid keeps running.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Mapping, Sequence, Union
+
+from core.dc_solver import SparseDCSolver, DCSolution
+
+
+@dataclass(frozen=True)
+class GridBase:
+    """
+    Immutable operating point shared by what-if views
+    Arrays are read-only; the solver is a fork of the live DC kernel that
+    shares its factorization.
+    """
+    solver: SparseDCSolver
+    line_names: pd.Index
+    load_names: pd.Index
+    load_bus: np.ndarray  # Solver bus position per load
+    load_p: np.ndarray  # MW at the operating snapshot
+    generator_names: pd.Index
+    gen_p: np.ndarray  # Generator set points (MW)
+    gen_p_nom: np.ndarray
+    fixed_injections: np.ndarray  # Generator and storage set points per bus (MW)
+    load_index: Dict[str, int]  # Load name/alias -> position
+    substation_loads: Dict[str, np.ndarray]  # Substation alias -> load positions
+    substation_generators: Dict[str, np.ndarray]  # Substation alias -> generator positions
+
+    @classmethod
+    def capture(cls, power_grid) -> "GridBase":
+        """Snapshot the live grid's topology, ratings and set points"""
+
+        live = power_grid.dc_solver
+        live.sync()
+        solver = live.fork()
+
+        network = power_grid.network
+        bus_names = solver.bus_names
+        loads = network.loads
+        generators = network.generators
+
+        fixed = np.zeros(len(bus_names))
+        for component in ("Generator", "StorageUnit"):
+            df = network.df(component)
+            if len(df):
+                p = power_grid._snapshot_p_set(component)
+                fixed += np.bincount(
+                    bus_names.get_indexer(df.bus.values), weights=p * df.sign.values,
+                    minlength=len(bus_names)
+                )
+
+        substation_loads = {}
+        substation_generators = {}
+        for substation in power_grid.substations:
+            load_positions = loads.index.get_indexer(power_grid.loads_at_substation(substation))
+            gen_positions = np.flatnonzero([substation in gen for gen in generators.index])
+            for alias in power_grid._name_aliases(substation):
+                substation_loads[alias] = load_positions
+                substation_generators[alias] = gen_positions
+        for alias, target in power_grid.SUBSTATION_ALIASES.items():
+            for alias_name in power_grid._name_aliases(alias):
+                substation_loads.setdefault(alias_name, substation_loads.get(target))
+                substation_generators.setdefault(alias_name, substation_generators.get(target))
+
+        base = cls(
+            solver=solver,
+            line_names=network.lines.index,
+            load_names=loads.index,
+            load_bus=bus_names.get_indexer(loads.bus.values),
+            load_p=power_grid._snapshot_p_set("Load"),
+            generator_names=generators.index,
+            gen_p=power_grid._snapshot_p_set("Generator"),
+            gen_p_nom=generators.p_nom.values.astype(float),
+            fixed_injections=fixed,
+            load_index=power_grid._load_name_index(),
+            substation_loads=substation_loads,
+            substation_generators=substation_generators
+        )
+
+        for array in (base.load_bus, base.load_p, base.gen_p, base.gen_p_nom, base.fixed_injections,
+                      solver.in_service, solver.s_nom):
+            array.setflags(write=False)
+
+        return base
+
+
+class NetworkView:
+    """
+    Copy-on-write what-if view of a ManhattanPowerGrid
+    Changes are kept as small overlays on the shared base; the DC kernel is
+    only forked and refactorized when the view switches a branch.
+    """
+
+    def __init__(self, base: GridBase):
+        self.base = base
+        self._branch_status: Dict[int, bool] = {}
+        self._ratings: Dict[int, float] = {}
+        self._loads: Dict[int, float] = {}
+        self._generator_limits: Dict[int, float] = {}
+        self._solver = None
+        self._solution = None
+
+    # ------------------------------------------------------------------
+    # Overlays
+    # ------------------------------------------------------------------
+
+    def derive(self) -> "NetworkView":
+        """Child view starting from this view's overlays"""
+        child = NetworkView(self.base)
+        child._branch_status = dict(self._branch_status)
+        child._ratings = dict(self._ratings)
+        child._loads = dict(self._loads)
+        child._generator_limits = dict(self._generator_limits)
+        return child
+
+    def _changed(self):
+        self._solution = None
+
+    def _branch_position(self, name: str) -> int:
+        return self.base.solver.branch_names.get_loc(name)
+
+    def set_branch_status(self, name: str, in_service: bool) -> bool:
+        """
+        Switch a line or transformer in or out of service in this view
+
+        Returns:
+            True if the status differs from what the view had before
+        """
+        position = self._branch_position(name)
+        if self.branch_in_service(name) == in_service:
+            return False
+
+        if self.base.solver.in_service[position] == in_service:
+            self._branch_status.pop(position)
+        else:
+            self._branch_status[position] = in_service
+
+        self._solver = None
+        self._changed()
+        return True
+
+    def branch_in_service(self, name: str) -> bool:
+        position = self._branch_position(name)
+        return self._branch_status.get(position, bool(self.base.solver.in_service[position]))
+
+    def set_rating(self, name: str, s_nom_mva: float):
+        """Override a branch rating (MVA)"""
+        self._ratings[self._branch_position(name)] = float(s_nom_mva)
+        self._changed()
+
+    def set_loads(
+        self,
+        loads: Union[Mapping[str, float], pd.Series, np.ndarray, float],
+        names: Optional[Sequence[str]] = None
+    ):
+        """
+        Override load values (MW), same calling conventions as ManhattanPowerGrid.set_loads
+
+        Args:
+            loads: Mapping/Series of name -> MW, or values aligned with names
+            names: Load names or aliases when loads is an array or scalar
+        """
+        if names is None:
+            loads = pd.Series(loads, dtype=float)
+            names, values = list(loads.index), loads.values
+        else:
+            names = list(names)
+            values = np.broadcast_to(np.asarray(loads, dtype=float), (len(names),))
+
+        positions = [self.base.load_index.get(name, -1) for name in names]
+        missing = [name for name, position in zip(names, positions) if position < 0]
+        if missing:
+            raise KeyError(f"Unknown loads: {missing}")
+
+        self._loads.update(zip(positions, map(float, values)))
+        self._changed()
+
+    def scale_loads(self, factor: float, names: Optional[Sequence[str]] = None):
+        """Multiply load values (default: all loads)"""
+        names = list(self.base.load_names) if names is None else list(names)
+        current = self.get_loads(names).values
+        self.set_loads(current * factor, names=names)
+
+    def get_loads(self, names: Optional[Sequence[str]] = None) -> pd.Series:
+        """Load values in this view (MW)"""
+        values = self._load_values()
+        if names is None:
+            return pd.Series(values, index=self.base.load_names)
+
+        positions = [self.base.load_index.get(name, -1) for name in names]
+        missing = [name for name, position in zip(names, positions) if position < 0]
+        if missing:
+            raise KeyError(f"Unknown loads: {missing}")
+        return pd.Series(values[positions], index=self.base.load_names[positions])
+
+    def set_generator_limit(self, name: str, p_nom_mw: float):
+        """Override a generator's capacity (MW)"""
+        self._generator_limits[self.base.generator_names.get_loc(name)] = float(p_nom_mw)
+        self._changed()
+
+    def fail_substation(self, name: str) -> float:
+        """
+        Drop a substation's loads and generation, as ManhattanPowerGrid.trigger_failure does
+
+        Returns:
+            Load dropped (MW)
+        """
+        if name not in self.base.substation_loads:
+            raise KeyError(f"Unknown substation: {name}")
+
+        positions = self.base.substation_loads[name]
+        dropped = float(self._load_values()[positions].sum())
+
+        self._loads.update((int(position), 0.0) for position in positions)
+        self._generator_limits.update(
+            (int(position), 0.0) for position in self.base.substation_generators[name]
+        )
+        self._changed()
+        return dropped
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def _load_values(self) -> np.ndarray:
+        values = self.base.load_p.copy()
+        if self._loads:
+            positions = np.fromiter(self._loads.keys(), dtype=int)
+            values[positions] = np.fromiter(self._loads.values(), dtype=float)
+        return values
+
+    @property
+    def solver(self) -> SparseDCSolver:
+        """DC kernel for this view's topology (the shared one if no branch was switched)"""
+        if self._solver is None:
+            solver = self.base.solver.fork()
+            if self._branch_status:
+                for position, in_service in self._branch_status.items():
+                    solver.in_service[position] = in_service
+                solver._invalidate()
+            self._solver = solver
+        return self._solver
+
+    @property
+    def ratings(self) -> np.ndarray:
+        """Branch ratings (MVA) in solver branch order"""
+        s_nom = self.base.solver.s_nom.copy()
+        for position, rating in self._ratings.items():
+            s_nom[position] = rating
+        return s_nom
+
+    @property
+    def generator_limits(self) -> pd.Series:
+        p_nom = self.base.gen_p_nom.copy()
+        for position, limit in self._generator_limits.items():
+            p_nom[position] = limit
+        return pd.Series(p_nom, index=self.base.generator_names)
+
+    def injections(self) -> np.ndarray:
+        """Net bus injections (MW, solver bus order)"""
+        base = self.base
+        return base.fixed_injections - np.bincount(
+            base.load_bus, weights=self._load_values(), minlength=len(base.fixed_injections)
+        )
+
+    def solve(self) -> DCSolution:
+        """DC power flow of this view (cached until an overlay changes)"""
+        if self._solution is None:
+            self._solution = self.solver.solve(self.injections())
+        return self._solution
+
+    def branch_loading(self) -> np.ndarray:
+        """|flow| / rating per branch (nan for unrated branches)"""
+        ratings = self.ratings
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(ratings > 0, np.abs(self.solve().flows_mw) / ratings, np.nan)
+
+    def analysis(self):
+        """PowerFlowAnalysis of the lines, as the live grid reports a DC power flow"""
+        from core.power_system import PowerFlowAnalysis
+
+        solver = self.solver
+        solution = self.solve()
+        is_line = solver.branch_component == 'Line'
+        positions = solver.branch_names[is_line].get_indexer(self.base.line_names)
+        p0 = solution.flows_mw[is_line][positions]
+
+        # Out-of-service lines keep the s_nom=0 marker of the live network
+        s_nom = np.where(solver.in_service, self.ratings, 0.0)[is_line][positions]
+
+        return PowerFlowAnalysis.from_arrays(
+            bus_names=solver.bus_names,
+            v_pu=np.ones(len(solver.bus_names)),
+            line_names=self.base.line_names,
+            p0=p0,
+            p1=-p0,
+            s_nom=s_nom
+        )
+
+    def load_shed_mw(self) -> float:
+        """Load stranded on islands without generation"""
+        islanded = self.solve().islanded
+        return float(self._load_values()[islanded[self.base.load_bus]].sum())
+
+    def generation_shortfall_mw(self) -> float:
+        """Slack pick-up beyond the slack generators' limits"""
+        solution = self.solve()
+        limits = self.generator_limits.values
+        shortfall = 0.0
+        for island, generator in enumerate(self.solver.slack_generators()):
+            if generator is None:
+                continue
+            position = self.base.generator_names.get_loc(generator)
+            output = self.base.gen_p[position] + solution.slack_mw[island]
+            shortfall += max(0.0, output - limits[position])
+        return float(shortfall)
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact JSON-ready result of this what-if"""
+        analysis = self.analysis()
+        return {
+            'out_of_service': self.solver.out_of_service(),
+            'max_line_loading': analysis.max_line_loading,
+            'overloaded_lines': analysis.overloaded_lines(),
+            'critical_lines': analysis.critical_lines,
+            'cascading_risk': analysis.cascading_risk(),
+            'load_shed_mw': self.load_shed_mw(),
+            'generation_shortfall_mw': self.generation_shortfall_mw(),
+            'total_load_mw': float(self._load_values().sum())
+        }
+
+
+def _summarize_view(view: NetworkView) -> Dict[str, Any]:
+    return view.summary()
+
+
+def evaluate_views(
+    views: List[NetworkView],
+    workers: int = 1,
+    processes: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Summaries of many what-if views, optionally in parallel
+
+    Args:
+        views: Views to evaluate
+        workers: Thread or process count (1 evaluates inline)
+        processes: Use a process pool (views are pickled with their base)
+    """
+    if workers <= 1 or len(views) <= 1:
+        return [view.summary() for view in views]
+
+    executor_type = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_type(max_workers=workers) as executor:
+        return list(executor.map(_summarize_view, views))
+
+
+__all__ = ["GridBase", "NetworkView", "evaluate_views"]
@@ -41,18 +41,10 @@ class EVStationManager:
             
             if edge:
                 # Create EXACTLY 20 charging ports per station
-                ports = []
-                for i in range(20):  # FIXED: Exactly 20 ports
-                    # Mix of DC fast and Level 2
-                    if i < 5:  # 25% fast chargers
-                        power = 150  # DC fast charging
-                    else:
-                        power = 22   # Level 2
-                    
-                    ports.append(ChargingPort(
-                        port_id=f"{ev_id}_port_{i}",
-                        power_kw=power
-                    ))
+                ports = [
+                    ChargingPort(port_id=f"{ev_id}_port_{i}", power_kw=power)
+                    for i, power in enumerate(self.port_layout())
+                ]
                 
                 self.stations[ev_id] = {
                     'id': ev_id,
@@ -70,6 +62,59 @@ class EVStationManager:
                 
                 print(f"✅ Initialized {ev_station['name']} on edge {edge} with EXACTLY 20 ports")
     
+    @staticmethod
+    def port_layout() -> List[float]:
+        """Port powers of a station: 5 DC fast (150 kW) then 15 Level 2 (22 kW)"""
+        return [150 if i < 5 else 22 for i in range(20)]  # 25% fast chargers
+    
+    @staticmethod
+    def charging_distribution(
+        station_id: str,
+        substation: str,
+        operational: bool,
+        occupied: int,
+        port_powers: List[float],
+        prior_utilization: float = 0.35,
+        concentration: float = 10.0,
+        current_weight: float = 0.5
+    ) -> Dict:
+        """
+        Occupancy distribution of one station over the next interval
+        Occupied ports ~ BetaBinomial(ports, alpha, beta); the mean blends the
+        current occupancy with a prior utilization. Ports are handed out
+        first-free, so the k occupied ports are the first k in port order.
+        """
+        
+        ports = len(port_powers)
+        current = occupied / ports if ports else 0.0
+        mean = current_weight * current + (1 - current_weight) * prior_utilization
+        mean = float(np.clip(mean, 0.01, 0.99))
+        
+        return {
+            'station_id': station_id,
+            'substation': substation,
+            'operational': operational,
+            'occupied': occupied,
+            'port_power_kw': list(port_powers),
+            'alpha': mean * concentration,
+            'beta': (1 - mean) * concentration
+        }
+    
+    def get_charging_distributions(self, **kwargs) -> List[Dict]:
+        """Charging distributions of all stations (see charging_distribution)"""
+        
+        return [
+            self.charging_distribution(
+                station_id,
+                station['substation'],
+                station['operational'],
+                len(station['vehicles_charging']),
+                [port.power_kw for port in station['ports']],
+                **kwargs
+            )
+            for station_id, station in self.stations.items()
+        ]
+    
     def _find_nearest_valid_edge(self, lat, lon):
         """Find nearest edge that can be routed to"""
         
@@ -225,32 +270,38 @@ class EVStationManager:
         
         return None
     
+    def _stations_at(self, substation_name: str) -> List[str]:
+        """Managed stations fed by a substation (integrated system's adjacency index)"""
+        return [
+            station_id for station_id in self.integrated_system.ev_stations_at(substation_name)
+            if station_id in self.stations
+        ]
+    
     def handle_blackout(self, substation_name: str) -> List[str]:
         """Handle substation blackout - mark stations as offline"""
         
         affected_stations = []
         released_vehicles = []
         
-        for station_id, station in self.stations.items():
-            if station['substation'] == substation_name:
-                station['operational'] = False
-                affected_stations.append(station['name'])
-                
-                # Update in integrated system too
-                if station_id in self.integrated_system.ev_stations:
-                    self.integrated_system.ev_stations[station_id]['operational'] = False
-                
-                # Release all charging vehicles
-                for port in station['ports']:
-                    if port.occupied_by:
-                        released_vehicles.append(port.occupied_by)
-                        # Clear port
-                        port.occupied_by = None
-                        port.charging_start = None
-                
-                # Clear charging list
-                station['vehicles_charging'].clear()
-                station['current_load_kw'] = 0
+        for station_id in self._stations_at(substation_name):
+            station = self.stations[station_id]
+            station['operational'] = False
+            affected_stations.append(station['name'])
+            
+            # Update in integrated system too
+            self.integrated_system.set_ev_station_operational(station_id, False)
+            
+            # Release all charging vehicles
+            for port in station['ports']:
+                if port.occupied_by:
+                    released_vehicles.append(port.occupied_by)
+                    # Clear port
+                    port.occupied_by = None
+                    port.charging_start = None
+            
+            # Clear charging list
+            station['vehicles_charging'].clear()
+            station['current_load_kw'] = 0
         
         if affected_stations:
             print(f"⚡ BLACKOUT: {', '.join(affected_stations)} offline! {len(released_vehicles)} vehicles interrupted")
@@ -261,14 +312,13 @@ class EVStationManager:
         """Restore power to stations"""
         
         restored_stations = []
-        for station_id, station in self.stations.items():
-            if station['substation'] == substation_name:
-                station['operational'] = True
-                restored_stations.append(station['name'])
-                
-                # Update in integrated system too
-                if station_id in self.integrated_system.ev_stations:
-                    self.integrated_system.ev_stations[station_id]['operational'] = True
+        for station_id in self._stations_at(substation_name):
+            station = self.stations[station_id]
+            station['operational'] = True
+            restored_stations.append(station['name'])
+            
+            # Update in integrated system too
+            self.integrated_system.set_ev_station_operational(station_id, True)
         
         if restored_stations:
             print(f"✅ POWER RESTORED: {', '.join(restored_stations)} back online!")
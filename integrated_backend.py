@@ -3,6 +3,7 @@ Manhattan Power Grid - World Class Integrated System
 FULLY UPDATED with all fixes applied
 """
 
+import hashlib
 import json
 import numpy as np
 import pandas as pd
@@ -11,7 +12,14 @@ import os
 from dataclasses import dataclass, field
 from enum import Enum
 import math
-import random
+
+from core.state_journal import StateJournal
+from core.spatial_index import SpatialIndex
+from core.service_territory import ServiceTerritory
+from core.network_cache import CompiledNetworkCache
+from core.traffic_light_state import TrafficLightTable, PHASES, PHASE_COLORS
+from core.geometry_codec import encode_polylines, pack_polylines, DEFAULT_PRECISION
+from config.settings import settings
 
 class PowerComponent(Enum):
     """Power system hierarchy"""
@@ -40,6 +48,8 @@ class ManhattanIntegratedSystem:
     ALL traffic lights connected, realistic phases, no cables in water
     """
     
+    TRAFFIC_LIGHTS_FILE = 'data/manhattan_traffic_lights.json'
+    
     def __init__(self, power_grid):
         self.power_grid = power_grid
         
@@ -53,6 +63,26 @@ class ManhattanIntegratedSystem:
         self.primary_cables = []
         self.secondary_cables = []
         
+        # Nearest-site lookups (L1 street-grid distance) shared by the builders
+        self.substation_index = None
+        self.transformer_index = None
+        self.substation_territory = None
+        self.transformer_territory = None
+        
+        # Substation -> component kind -> downstream components, built once
+        self.adjacency = {}
+        
+        # Exact prior component state per failed substation, replayed on restore
+        self.journal = StateJournal()
+        
+        # Running aggregates behind get_statistics, updated by each state change
+        self.counters = {}
+        self._pypsa_load_cache = (None, 0.0)
+        
+        # Serialized static topology and its content hash, built on first request
+        self._static_topology = None
+        self._cable_geometry = None
+        
         # Manhattan boundaries (conservative to avoid water)
         self.manhattan_bounds = {
             'min_lat': 40.745,
@@ -61,15 +91,26 @@ class ManhattanIntegratedSystem:
             'max_lon': -73.960
         }
         
-        # Build the system
-        self._load_traffic_lights()
-        self._build_distribution_network()
+        # Deterministic topology compiled once per input version
+        self.network_cache = CompiledNetworkCache(
+            settings.cache_dir,
+            "distribution_network",
+            inputs=[self.TRAFFIC_LIGHTS_FILE, __file__],
+            version=json.dumps(self.manhattan_bounds, sort_keys=True)
+        )
+        
+        # Build the system (or map the compiled build)
+        if not self._load_compiled_network():
+            self._load_traffic_lights()
+            self._build_distribution_network()
+            self._save_compiled_network()
         self._integrate_with_pypsa()
+        self.recount_statistics()
         
     def _load_traffic_lights(self):
         """Load real Manhattan traffic light data"""
         
-        filepath = 'data/manhattan_traffic_lights.json'
+        filepath = self.TRAFFIC_LIGHTS_FILE
         
         if not os.path.exists(filepath):
             print("Generating Manhattan traffic light grid...")
@@ -85,18 +126,6 @@ class ManhattanIntegratedSystem:
                 if (self.manhattan_bounds['min_lat'] <= lat <= self.manhattan_bounds['max_lat'] and
                     self.manhattan_bounds['min_lon'] <= lon <= self.manhattan_bounds['max_lon']):
                     
-                    # Set realistic initial color
-                    rand = random.random()
-                    if rand < 0.60:
-                        color = '#ff0000'  # Red
-                        phase = 'red'
-                    elif rand < 0.95:
-                        color = '#00ff00'  # Green
-                        phase = 'green'
-                    else:
-                        color = '#ffff00'  # Yellow
-                        phase = 'yellow'
-                    
                     self.traffic_lights[str(light['id'])] = {
                         'id': str(light['id']),
                         'lat': lat,
@@ -106,9 +135,7 @@ class ManhattanIntegratedSystem:
                         'substation': None,
                         'transformer': None,
                         'power_kw': 0.3,
-                        'battery_backup': False,
-                        'phase': phase,
-                        'color': color
+                        'battery_backup': False
                     }
         
         print(f"Loaded {len(self.traffic_lights)} traffic lights within Manhattan bounds")
@@ -143,25 +170,13 @@ class ManhattanIntegratedSystem:
             lat = base_lat + (st_num - 34) * 0.00072
             streets.append((st_num, lat))
         
-        # Generate traffic lights at intersections with realistic phases
+        # Generate traffic lights at intersections (phases come from the signal cycle)
         light_id = 1
         for ave_name, lon in avenues:
             for st_num, lat in streets:
                 if (self.manhattan_bounds['min_lat'] <= lat <= self.manhattan_bounds['max_lat'] and
                     self.manhattan_bounds['min_lon'] <= lon <= self.manhattan_bounds['max_lon']):
                     
-                    # Realistic traffic light distribution
-                    rand = random.random()
-                    if rand < 0.60:
-                        color = '#ff0000'  # Red (60%)
-                        phase = 'red'
-                    elif rand < 0.95:
-                        color = '#00ff00'  # Green (35%)
-                        phase = 'green'
-                    else:
-                        color = '#ffff00'  # Yellow (5%)
-                        phase = 'yellow'
-                    
                     self.traffic_lights[str(light_id)] = {
                         'id': str(light_id),
                         'lat': lat,
@@ -171,9 +186,7 @@ class ManhattanIntegratedSystem:
                         'substation': None,
                         'transformer': None,
                         'power_kw': 0.3,
-                        'battery_backup': (st_num % 5 == 0),
-                        'phase': phase,
-                        'color': color
+                        'battery_backup': (st_num % 5 == 0)
                     }
                     light_id += 1
         
@@ -246,6 +259,9 @@ class ManhattanIntegratedSystem:
                 'transformers': []
             }
         
+        self.substation_index = SpatialIndex.from_records(self.substations)
+        self.substation_territory = ServiceTerritory(self.substation_index, self.manhattan_bounds)
+        
         # Create distribution transformers
         transformer_id = 0
         
@@ -260,92 +276,98 @@ class ManhattanIntegratedSystem:
             40.761, 40.764, 40.767
         ]
         
-        for lon in transformer_avenues:
-            for lat in transformer_streets:
-                min_dist = float('inf')
-                nearest_sub = None
+        # Nearest substation of every grid point at once (avenue-major order)
+        grid_lons, grid_lats = np.meshgrid(transformer_avenues, transformer_streets, indexing='ij')
+        grid_lats, grid_lons = grid_lats.ravel(), grid_lons.ravel()
+        nearest_subs = self.substation_territory.nearest_names(grid_lats, grid_lons, max_distance=0.02)
+        
+        for lat, lon, nearest_sub in zip(grid_lats, grid_lons, nearest_subs):
+            if nearest_sub:
+                transformer_name = f"DT_{transformer_id}"
                 
-                for sub_name, sub_data in self.substations.items():
-                    dist = self._manhattan_distance(lat, lon, sub_data['lat'], sub_data['lon'])
-                    if dist < min_dist:
-                        min_dist = dist
-                        nearest_sub = sub_name
+                self.distribution_transformers[transformer_name] = DistributionTransformer(
+                    id=transformer_name,
+                    name=f"Transformer {transformer_id}",
+                    lat=float(lat),
+                    lon=float(lon),
+                    substation=nearest_sub,
+                    capacity_kva=500,
+                    traffic_lights=[]
+                )
                 
-                if nearest_sub and min_dist < 0.02:
-                    transformer_name = f"DT_{transformer_id}"
-                    
-                    self.distribution_transformers[transformer_name] = DistributionTransformer(
-                        id=transformer_name,
-                        name=f"Transformer {transformer_id}",
-                        lat=lat,
-                        lon=lon,
-                        substation=nearest_sub,
-                        capacity_kva=500,
-                        traffic_lights=[]
-                    )
-                    
-                    self.substations[nearest_sub]['transformers'].append(transformer_name)
-                    transformer_id += 1
+                self.substations[nearest_sub]['transformers'].append(transformer_name)
+                transformer_id += 1
         
         print(f"Created {len(self.distribution_transformers)} distribution transformers")
         
         # Assign ALL traffic lights
         self._assign_traffic_lights_to_transformers()
         
+        # Keep light state as columns from here on
+        self.traffic_lights = TrafficLightTable.from_records(
+            self.traffic_lights,
+            list(self.distribution_transformers),
+            [dt.substation for dt in self.distribution_transformers.values()],
+            list(self.substations)
+        )
+        
         # Create ALL cable routes
         self._create_all_cable_routes()
         
         # Add EV charging stations
         self._add_ev_stations()
+        
+        # Index what each substation feeds so failures touch only those components
+        self._build_adjacency()
+        self._build_service_territories()
     
     def _assign_traffic_lights_to_transformers(self):
         """Assign EVERY traffic light to a transformer - no exceptions"""
         
         unassigned = []
         
-        for tl_id, tl in self.traffic_lights.items():
-            min_dist = float('inf')
-            nearest_transformer = None
-            nearest_substation = None
-            
-            # Find nearest transformer with increased search radius
-            for dt_name, dt in self.distribution_transformers.items():
-                dist = self._manhattan_distance(tl['lat'], tl['lon'], dt.lat, dt.lon)
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_transformer = dt_name
-                    nearest_substation = dt.substation
+        self.transformer_index = SpatialIndex(
+            list(self.distribution_transformers),
+            [dt.lat for dt in self.distribution_transformers.values()],
+            [dt.lon for dt in self.distribution_transformers.values()]
+        )
+        self.transformer_territory = ServiceTerritory(self.transformer_index, self.manhattan_bounds)
+        
+        # Nearest transformer of every light in one query (increased search radius)
+        tl_ids = list(self.traffic_lights)
+        tl_lats = np.fromiter((tl['lat'] for tl in self.traffic_lights.values()), float, len(tl_ids))
+        tl_lons = np.fromiter((tl['lon'] for tl in self.traffic_lights.values()), float, len(tl_ids))
+        positions, distances = self.transformer_territory.nearest(tl_lats, tl_lons, max_distance=0.01)
+        
+        for tl_id, position, min_dist in zip(tl_ids, positions, distances):
+            tl = self.traffic_lights[tl_id]
             
-            # Increased radius to ensure connection
-            if nearest_transformer and min_dist < 0.01:
+            if position >= 0:
+                nearest_transformer = self.transformer_index.names[position]
+                dt = self.distribution_transformers[nearest_transformer]
                 tl['transformer'] = nearest_transformer
-                tl['substation'] = nearest_substation
+                tl['substation'] = dt.substation
                 
-                self.distribution_transformers[nearest_transformer].traffic_lights.append(tl_id)
-                self.distribution_transformers[nearest_transformer].load_kw += tl['power_kw']
-                self.substations[nearest_substation]['load_mw'] += tl['power_kw'] / 1000
+                dt.traffic_lights.append(tl_id)
+                dt.load_kw += tl['power_kw']
+                self.substations[dt.substation]['load_mw'] += tl['power_kw'] / 1000
             else:
-                unassigned.append((tl_id, min_dist))
+                unassigned.append(tl_id)
         
         # Force-connect any unassigned lights
         if unassigned:
             print(f"Force-connecting {len(unassigned)} distant traffic lights...")
-            for tl_id, dist in unassigned:
+            nearest_subs = self.substation_territory.nearest_names(
+                [self.traffic_lights[tl_id]['lat'] for tl_id in unassigned],
+                [self.traffic_lights[tl_id]['lon'] for tl_id in unassigned]
+            )
+            
+            for tl_id, nearest_sub in zip(unassigned, nearest_subs):
                 tl = self.traffic_lights[tl_id]
                 
                 # Create a new transformer very close to the light
                 new_dt_id = f"DT_EXTRA_{tl_id}"
                 
-                # Find nearest substation
-                min_sub_dist = float('inf')
-                nearest_sub = None
-                for sub_name, sub_data in self.substations.items():
-                    sub_dist = self._manhattan_distance(tl['lat'], tl['lon'], sub_data['lat'], sub_data['lon'])
-                    if sub_dist < min_sub_dist:
-                        min_sub_dist = sub_dist
-                        nearest_sub = sub_name
-                
                 # Place transformer very close to the traffic light
                 dt_lat = tl['lat'] + 0.0001
                 dt_lon = tl['lon'] + 0.0001
@@ -480,19 +502,12 @@ class ManhattanIntegratedSystem:
             {'name': 'Midtown East Station', 'lat': 40.760, 'lon': -73.970, 'chargers': 20}
         ]
         
-        for i, station in enumerate(ev_locations):
-            min_dist = float('inf')
-            nearest_sub = None
-            
-            for sub_name, sub_data in self.substations.items():
-                dist = self._manhattan_distance(
-                    station['lat'], station['lon'],
-                    sub_data['lat'], sub_data['lon']
-                )
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_sub = sub_name
-            
+        nearest_subs = self.substation_territory.nearest_names(
+            [station['lat'] for station in ev_locations],
+            [station['lon'] for station in ev_locations]
+        )
+        
+        for i, (station, nearest_sub) in enumerate(zip(ev_locations, nearest_subs)):
             self.ev_stations[f"EV_{i}"] = {
                 'id': f"EV_{i}",
                 'name': station['name'],
@@ -510,59 +525,253 @@ class ManhattanIntegratedSystem:
         
         print(f"Added {len(self.ev_stations)} EV charging stations")
     
+    def _save_compiled_network(self):
+        """Compile the deterministic topology build into the binary cache"""
+        
+        sub_names = list(self.substations)
+        dt_names = list(self.distribution_transformers)
+        sub_pos = {name: i for i, name in enumerate(sub_names)}
+        dt_pos = {name: i for i, name in enumerate(dt_names)}
+        
+        lights = self.traffic_lights
+        tl_pos = lights.index
+        transformers = list(self.distribution_transformers.values())
+        arrays = {
+            'tl_id': np.array(lights.ids, dtype=str),
+            'tl_lat': lights.lat,
+            'tl_lon': lights.lon,
+            'tl_intersection': np.array(lights.intersections, dtype=str),
+            'tl_battery_backup': lights.battery_backup,
+            'tl_transformer': lights.transformer_idx,
+            'dt_name': np.array(dt_names, dtype=str),
+            'dt_label': np.array([dt.name for dt in transformers], dtype=str),
+            'dt_lat': np.array([dt.lat for dt in transformers], dtype=float),
+            'dt_lon': np.array([dt.lon for dt in transformers], dtype=float),
+            'dt_substation': np.array([sub_pos[dt.substation] for dt in transformers], dtype=np.int32),
+            'dt_capacity_kva': np.array([dt.capacity_kva for dt in transformers], dtype=float),
+            'dt_load_kw': np.array([dt.load_kw for dt in transformers], dtype=float),
+            'sub_load_mw': np.array([self.substations[name]['load_mw'] for name in sub_names], dtype=float),
+            'primary_substation': np.array([sub_pos[c['from']] for c in self.primary_cables], dtype=np.int32),
+            'primary_transformer': np.array([dt_pos[c['to']] for c in self.primary_cables], dtype=np.int32),
+            'primary_path': np.array([c['path'] for c in self.primary_cables], dtype=float).reshape(len(self.primary_cables), -1, 2),
+            'secondary_transformer': np.array([dt_pos[c['from']] for c in self.secondary_cables], dtype=np.int32),
+            'secondary_light': np.array([tl_pos[c['to']] for c in self.secondary_cables], dtype=np.int32),
+            'secondary_path': np.array([c['path'] for c in self.secondary_cables], dtype=float).reshape(len(self.secondary_cables), -1, 2),
+            'ev_substation': np.array([sub_pos[ev['substation']] for ev in self.ev_stations.values()], dtype=np.int32)
+        }
+        
+        static_keys = ('lat', 'lon', 'capacity_mva', 'coverage_area', 'voltage_primary', 'voltage_secondary')
+        meta = {
+            'substations': {
+                name: {key: self.substations[name][key] for key in static_keys} for name in sub_names
+            },
+            'ev_stations': [
+                {key: ev[key] for key in ('id', 'name', 'lat', 'lon', 'chargers', 'power_kw')}
+                for ev in self.ev_stations.values()
+            ]
+        }
+        
+        try:
+            self.network_cache.save(arrays, meta)
+        except OSError as e:
+            print(f"Could not write compiled network cache: {e}")
+    
+    def _load_compiled_network(self) -> bool:
+        """Rebuild the component registries from the memory-mapped cache"""
+        
+        compiled = self.network_cache.load()
+        if compiled is None:
+            return False
+        arrays, meta = compiled
+        
+        sub_names = list(meta['substations'])
+        for i, name in enumerate(sub_names):
+            self.substations[name] = {
+                **meta['substations'][name],
+                'operational': True,
+                'load_mw': float(arrays['sub_load_mw'][i]),
+                'transformers': []
+            }
+        
+        dt_names = arrays['dt_name'].tolist()
+        dt_substations = [sub_names[i] for i in arrays['dt_substation'].tolist()]
+        for name, label, lat, lon, substation, capacity, load_kw in zip(
+            dt_names, arrays['dt_label'].tolist(), arrays['dt_lat'].tolist(), arrays['dt_lon'].tolist(),
+            dt_substations, arrays['dt_capacity_kva'].tolist(), arrays['dt_load_kw'].tolist()
+        ):
+            self.distribution_transformers[name] = DistributionTransformer(
+                id=name, name=label, lat=lat, lon=lon, substation=substation,
+                capacity_kva=capacity, load_kw=load_kw, traffic_lights=[]
+            )
+            self.substations[substation]['transformers'].append(name)
+        
+        tl_ids = arrays['tl_id'].tolist()
+        self.traffic_lights = TrafficLightTable(
+            ids=tl_ids,
+            lats=arrays['tl_lat'],
+            lons=arrays['tl_lon'],
+            intersections=arrays['tl_intersection'].tolist(),
+            battery_backup=arrays['tl_battery_backup'],
+            transformer_idx=arrays['tl_transformer'],
+            transformer_names=dt_names,
+            transformer_substation_idx=arrays['dt_substation'],
+            substation_names=sub_names
+        )
+        for tl_id, dt_index in zip(tl_ids, arrays['tl_transformer'].tolist()):
+            self.distribution_transformers[dt_names[dt_index]].traffic_lights.append(tl_id)
+        
+        for sub_index, dt_index, path in zip(
+            arrays['primary_substation'].tolist(), arrays['primary_transformer'].tolist(),
+            arrays['primary_path'].tolist()
+        ):
+            sub_name, dt_name = sub_names[sub_index], dt_names[dt_index]
+            self.primary_cables.append({
+                'id': f"primary_{sub_name}_{dt_name}",
+                'type': 'primary',
+                'voltage': '13.8kV',
+                'from': sub_name,
+                'to': dt_name,
+                'path': path,
+                'operational': True
+            })
+        
+        for dt_index, tl_index, path in zip(
+            arrays['secondary_transformer'].tolist(), arrays['secondary_light'].tolist(),
+            arrays['secondary_path'].tolist()
+        ):
+            dt_name, tl_id = dt_names[dt_index], tl_ids[tl_index]
+            self.secondary_cables.append({
+                'id': f"service_{dt_name}_{tl_id}",
+                'type': 'service',
+                'voltage': '480V',
+                'from': dt_name,
+                'substation': dt_substations[dt_index],
+                'to': tl_id,
+                'path': path,
+                'operational': True
+            })
+        
+        for station, sub_index in zip(meta['ev_stations'], arrays['ev_substation'].tolist()):
+            self.ev_stations[station['id']] = {
+                'id': station['id'],
+                'name': station['name'],
+                'lat': station['lat'],
+                'lon': station['lon'],
+                'chargers': station['chargers'],
+                'substation': sub_names[sub_index],
+                'power_kw': station['power_kw'],
+                'operational': True,
+                'vehicles_charging': 0
+            }
+        
+        self._build_adjacency()
+        self._build_service_territories()
+        
+        print(f"Loaded compiled distribution network: {len(self.traffic_lights)} traffic lights, "
+              f"{len(self.distribution_transformers)} transformers, "
+              f"{len(self.primary_cables) + len(self.secondary_cables)} cables")
+        return True
+    
+    def _build_adjacency(self):
+        """Substation -> transformers, lights, EV stations and cable positions"""
+        
+        adjacency = {
+            name: {
+                'transformers': [], 'traffic_lights': [], 'ev_stations': [],
+                'primary_cables': [], 'secondary_cables': []
+            }
+            for name in self.substations
+        }
+        
+        for name, sub_data in self.substations.items():
+            for dt_name in sub_data['transformers']:
+                if dt_name in self.distribution_transformers:
+                    adjacency[name]['transformers'].append(dt_name)
+                    adjacency[name]['traffic_lights'].extend(
+                        tl_id for tl_id in self.distribution_transformers[dt_name].traffic_lights
+                        if tl_id in self.traffic_lights
+                    )
+        
+        for ev_id, ev in self.ev_stations.items():
+            if ev['substation'] in adjacency:
+                adjacency[ev['substation']]['ev_stations'].append(ev_id)
+        
+        for position, cable in enumerate(self.primary_cables):
+            adjacency[cable['from']]['primary_cables'].append(position)
+        
+        for position, cable in enumerate(self.secondary_cables):
+            adjacency[cable['substation']]['secondary_cables'].append(position)
+        
+        self.adjacency = adjacency
+    
+    def ev_stations_at(self, substation_name: str) -> List[str]:
+        """EV stations fed by a substation"""
+        return list(self.adjacency.get(substation_name, {}).get('ev_stations', []))
+    
+    def _build_service_territories(self):
+        """Index and rasterize the final substations and transformers for point lookups"""
+        
+        self.substation_index = SpatialIndex.from_records(self.substations)
+        self.transformer_index = SpatialIndex(
+            list(self.distribution_transformers),
+            [dt.lat for dt in self.distribution_transformers.values()],
+            [dt.lon for dt in self.distribution_transformers.values()]
+        )
+        self.substation_territory = ServiceTerritory(self.substation_index, self.manhattan_bounds)
+        self.transformer_territory = ServiceTerritory(self.transformer_index, self.manhattan_bounds)
+    
+    def substations_at(self, lats: List[float], lons: List[float]) -> List[Optional[str]]:
+        """Serving substation of each point"""
+        return self.substation_territory.nearest_names(lats, lons)
+    
+    def transformers_at(self, lats: List[float], lons: List[float]) -> List[Optional[str]]:
+        """Serving distribution transformer of each point"""
+        return self.transformer_territory.nearest_names(lats, lons)
+    
+    def in_failed_territory(self, lats: List[float], lons: List[float]) -> np.ndarray:
+        """Mask of the points served by a substation that is currently down"""
+        failed = [name for name, sub in self.substations.items() if not sub['operational']]
+        if not failed:
+            return np.zeros(len(lats), dtype=bool)
+        return self.substation_territory.within(lats, lons, failed)
+    
     def _integrate_with_pypsa(self):
         """Integrate all loads into PyPSA network"""
         
+        network = self.power_grid.network
+        names, buses, base_mw = [], [], []
+        
         for sub_name, sub_data in self.substations.items():
             bus_name = f"{sub_name.replace(' ', '_')}_13.8kV"
             
-            if bus_name in self.power_grid.network.buses.index:
-                load_name = f"Distribution_{sub_name.replace(' ', '_')}"
-                
-                hours = self.power_grid.network.snapshots.hour if hasattr(self.power_grid.network.snapshots, 'hour') else range(24)
-                load_profile = pd.Series(index=self.power_grid.network.snapshots, dtype=float)
-                
-                for i, h in enumerate(hours):
-                    base_load = sub_data['load_mw']
-                    
-                    if 17 <= h <= 22:
-                        ev_factor = 1.5
-                    elif 6 <= h <= 9:
-                        ev_factor = 1.2
-                    else:
-                        ev_factor = 0.5
-                    
-                    load_profile.iloc[i] = base_load * ev_factor
-                
-                self.power_grid.network.add(
-                    "Load",
-                    load_name,
-                    bus=bus_name,
-                    p_set=load_profile
-                )
+            if bus_name in network.buses.index:
+                names.append(f"Distribution_{sub_name.replace(' ', '_')}")
+                buses.append(bus_name)
+                base_mw.append(sub_data['load_mw'])
                 
                 print(f"Added {sub_data['load_mw']:.2f} MW load to {sub_name}")
+        
+        # Every substation's profile in one array, attached in one call
+        if names:
+            profiles = self.power_grid.profiles
+            network.madd(
+                "Load",
+                names,
+                bus=buses,
+                p_set=profiles.frame(profiles.ev_charging(base_mw), names)
+            )
     
-    def update_traffic_light_phases(self):
-        """Update traffic lights with realistic red/yellow/green phases"""
-        
-        for tl_id, tl in self.traffic_lights.items():
-            if tl['powered']:
-                # Realistic distribution of colors
-                rand = random.random()
-                if rand < 0.60:
-                    tl['color'] = '#ff0000'  # Red (60%)
-                    tl['phase'] = 'red'
-                elif rand < 0.95:
-                    tl['color'] = '#00ff00'  # Green (35%)
-                    tl['phase'] = 'green'
-                else:
-                    tl['color'] = '#ffff00'  # Yellow (5%)
-                    tl['phase'] = 'yellow'
-            else:
-                # No power = black
-                tl['color'] = '#000000'
-                tl['phase'] = 'off'
+    def update_traffic_light_phases(self, sim_time_s: Optional[float] = None):
+        """
+        Set every light to its signal-cycle phase (unpowered lights stay BLACK)
+        
+        Args:
+            sim_time_s: Simulation time in seconds (defaults to the power grid's clock)
+        """
+        
+        if sim_time_s is None:
+            sim_time_s = getattr(self.power_grid, 'simulation_time_s', 0.0)
+        self.traffic_lights.update_phases(sim_time_s)
     
     def simulate_substation_failure(self, substation_name: str) -> Dict[str, Any]:
         """Simulate substation failure with cascading effects"""
@@ -570,49 +779,46 @@ class ManhattanIntegratedSystem:
         if substation_name not in self.substations:
             return {'error': f'Substation {substation_name} not found'}
         
-        self.substations[substation_name]['operational'] = False
+        substation = self.substations[substation_name]
         
+        # Only the components this substation feeds (precomputed adjacency)
         affected_components = {
-            'transformers': [],
-            'traffic_lights': [],
-            'ev_stations': [],
-            'primary_cables': [],
-            'secondary_cables': []
+            kind: list(members) for kind, members in self.adjacency[substation_name].items()
         }
+        transformers = affected_components['transformers']
+        
+        # Journal the exact values this failure overwrites (first failure only)
+        if self.journal.begin(substation_name):
+            self._record_prior_state(substation_name, affected_components)
+        
+        self._set_operational('operational_substations', substation, False)
         
         # Fail all distribution transformers
-        for dt_name in self.substations[substation_name]['transformers']:
-            if dt_name in self.distribution_transformers:
-                dt = self.distribution_transformers[dt_name]
-                dt.operational = False
-                affected_components['transformers'].append(dt_name)
-                
-                # Turn off traffic lights - BLACK when no power
-                for tl_id in dt.traffic_lights:
-                    if tl_id in self.traffic_lights:
-                        self.traffic_lights[tl_id]['powered'] = False
-                        self.traffic_lights[tl_id]['phase'] = 'off'
-                        self.traffic_lights[tl_id]['color'] = '#000000'  # BLACK
-                        affected_components['traffic_lights'].append(tl_id)
+        for dt_name in transformers:
+            self.distribution_transformers[dt_name].operational = False
+        
+        # Turn off traffic lights - BLACK when no power
+        self.traffic_lights.set_powered(
+            self.traffic_lights.positions(affected_components['traffic_lights']), False
+        )
         
         # Fail connected EV stations
-        for ev_id, ev in self.ev_stations.items():
-            if ev['substation'] == substation_name:
-                ev['operational'] = False
-                ev['vehicles_charging'] = 0
-                affected_components['ev_stations'].append(ev_id)
+        for ev_id in affected_components['ev_stations']:
+            self._set_operational('operational_ev_stations', self.ev_stations[ev_id], False)
+            self.ev_stations[ev_id]['vehicles_charging'] = 0
         
         # Update cable status
-        for cable in self.primary_cables:
-            if cable['from'] == substation_name:
-                cable['operational'] = False
-                affected_components['primary_cables'].append(cable['id'])
+        for position in affected_components['primary_cables']:
+            self._set_operational('operational_primary_cables', self.primary_cables[position], False)
+        for position in affected_components['secondary_cables']:
+            self._set_operational('operational_secondary_cables', self.secondary_cables[position], False)
         
-        for cable in self.secondary_cables:
-            for dt_name in self.substations[substation_name]['transformers']:
-                if cable['from'] == dt_name:
-                    cable['operational'] = False
-                    affected_components['secondary_cables'].append(cable['id'])
+        affected_components['primary_cables'] = [
+            self.primary_cables[position]['id'] for position in affected_components['primary_cables']
+        ]
+        affected_components['secondary_cables'] = [
+            self.secondary_cables[position]['id'] for position in affected_components['secondary_cables']
+        ]
         
         impact = {
             'substation': substation_name,
@@ -640,86 +846,179 @@ class ManhattanIntegratedSystem:
         if substation_name not in self.substations:
             return False
         
-        self.substations[substation_name]['operational'] = True
-        
-        # Restore all distribution transformers
-        for dt_name in self.substations[substation_name]['transformers']:
-            if dt_name in self.distribution_transformers:
-                dt = self.distribution_transformers[dt_name]
-                dt.operational = True
-                
-                # Restore traffic lights with realistic colors
-                for tl_id in dt.traffic_lights:
-                    if tl_id in self.traffic_lights:
-                        self.traffic_lights[tl_id]['powered'] = True
-                        
-                        # Set realistic color on restore
-                        rand = random.random()
-                        if rand < 0.60:
-                            self.traffic_lights[tl_id]['color'] = '#ff0000'
-                            self.traffic_lights[tl_id]['phase'] = 'red'
-                        elif rand < 0.95:
-                            self.traffic_lights[tl_id]['color'] = '#00ff00'
-                            self.traffic_lights[tl_id]['phase'] = 'green'
-                        else:
-                            self.traffic_lights[tl_id]['color'] = '#ffff00'
-                            self.traffic_lights[tl_id]['phase'] = 'yellow'
-        
-        # Restore EV stations
-        for ev in self.ev_stations.values():
-            if ev['substation'] == substation_name:
-                ev['operational'] = True
-        
-        # Restore cables
-        for cable in self.primary_cables:
-            if cable['from'] == substation_name:
-                cable['operational'] = True
-        
-        for cable in self.secondary_cables:
-            for dt_name in self.substations[substation_name]['transformers']:
-                if cable['from'] == dt_name:
-                    cable['operational'] = True
+        # Replay the exact state the failure overwrote, O(changed components)
+        if not self.journal.replay(substation_name, self._journal_appliers()):
+            self._set_operational('operational_substations', self.substations[substation_name], True)
         
         print(f"RESTORED: {substation_name}")
         return True
     
-    def get_network_state(self) -> Dict[str, Any]:
-        """Get complete network state for visualization - PROPERLY FIXED"""
+    def simulate_substation_failures(self, substation_names: List[str]) -> Dict[str, Any]:
+        """Fail several substations as one event and return the combined impact"""
+        
+        impacts = [
+            self.simulate_substation_failure(name) for name in substation_names
+            if name in self.substations
+        ]
+        totals = (
+            'capacity_lost_mva', 'load_lost_mw', 'transformers_affected', 'traffic_lights_affected',
+            'ev_stations_affected', 'primary_cables_affected', 'secondary_cables_affected',
+            'estimated_customers'
+        )
+        return {
+            'substations': [impact['substation'] for impact in impacts],
+            **{key: sum(impact[key] for impact in impacts) for key in totals},
+            'impacts': impacts
+        }
+    
+    def restore_substations(self, substation_names: List[str]) -> List[str]:
+        """Restore several substations; returns the ones that were restored"""
+        return [name for name in substation_names if self.restore_substation(name)]
+    
+    def _record_prior_state(self, substation_name: str, affected: Dict[str, List]):
+        """Record the values a substation failure is about to overwrite"""
+        
+        journal = self.journal
+        light_positions = self.traffic_lights.positions(affected['traffic_lights'])
+        
+        journal.record(substation_name, 'substation_operational', [substation_name],
+                       [self.substations[substation_name]['operational']])
+        journal.record(substation_name, 'transformer_operational', affected['transformers'],
+                       [self.distribution_transformers[dt].operational for dt in affected['transformers']])
+        journal.record(substation_name, 'traffic_light_powered', light_positions,
+                       self.traffic_lights.powered[light_positions])
+        journal.record(substation_name, 'ev_operational', affected['ev_stations'],
+                       [self.ev_stations[ev_id]['operational'] for ev_id in affected['ev_stations']])
+        journal.record(substation_name, 'primary_cable_operational', affected['primary_cables'],
+                       [self.primary_cables[i]['operational'] for i in affected['primary_cables']])
+        journal.record(substation_name, 'secondary_cable_operational', affected['secondary_cables'],
+                       [self.secondary_cables[i]['operational'] for i in affected['secondary_cables']])
+    
+    def _journal_appliers(self) -> Dict[str, Any]:
+        """Journal target -> function writing recorded values back"""
+        
+        def substation_operational(names, values):
+            for name, operational in zip(names, values):
+                self._set_operational('operational_substations', self.substations[name], operational)
+        
+        def transformer_operational(names, values):
+            for name, operational in zip(names, values):
+                self.distribution_transformers[name].operational = bool(operational)
+        
+        def traffic_light_powered(positions, values):
+            # Re-powered lights rejoin their signal cycle
+            self.traffic_lights.set_powered(np.asarray(positions, dtype=np.intp), values)
+        
+        def ev_operational(ids, values):
+            for ev_id, operational in zip(ids, values):
+                self._set_operational('operational_ev_stations', self.ev_stations[ev_id], operational)
+        
+        def cable_operational(cables, counter):
+            def apply(positions, values):
+                for position, operational in zip(positions, values):
+                    self._set_operational(counter, cables[position], operational)
+            return apply
+        
+        return {
+            'substation_operational': substation_operational,
+            'transformer_operational': transformer_operational,
+            'traffic_light_powered': traffic_light_powered,
+            'ev_operational': ev_operational,
+            'primary_cable_operational': cable_operational(self.primary_cables, 'operational_primary_cables'),
+            'secondary_cable_operational': cable_operational(self.secondary_cables, 'operational_secondary_cables')
+        }
+    
+    def _set_operational(self, counter: str, record: Dict[str, Any], operational: Any):
+        """Set a component's operational flag, keeping its counter in step"""
+        operational = bool(operational)
+        self.counters[counter] += int(operational) - int(bool(record['operational']))
+        record['operational'] = operational
+    
+    def set_ev_station_operational(self, ev_id: str, operational: bool):
+        """Mark an EV station on/offline (keeps the statistics counters current)"""
+        self._set_operational('operational_ev_stations', self.ev_stations[ev_id], operational)
+    
+    def set_ev_charging(self, ev_id: str, vehicles_charging: Optional[int] = None,
+                        current_load_kw: Optional[float] = None):
+        """Update an EV station's charging state and the running charging load"""
         
-        # Calculate base load
-        base_load_mw = sum(s['load_mw'] for s in self.substations.values())
+        ev_station = self.ev_stations[ev_id]
+        if vehicles_charging is not None:
+            ev_station['vehicles_charging'] = vehicles_charging
+        if current_load_kw is not None:
+            self.counters['ev_charging_load_kw'] += current_load_kw - ev_station.get('current_load_kw', 0)
+            ev_station['current_load_kw'] = current_load_kw
+    
+    def recount_statistics(self):
+        """Rebuild every counter from the registries (after direct edits to them)"""
         
-        # Add EV charging load
-        ev_charging_load_mw = 0
-        for ev_station in self.ev_stations.values():
-            if 'current_load_kw' in ev_station:
-                ev_charging_load_mw += ev_station['current_load_kw'] / 1000
+        self.counters = {
+            'operational_substations': sum(1 for s in self.substations.values() if s['operational']),
+            'operational_ev_stations': sum(1 for ev in self.ev_stations.values() if ev['operational']),
+            'operational_primary_cables': sum(1 for c in self.primary_cables if c['operational']),
+            'operational_secondary_cables': sum(1 for c in self.secondary_cables if c['operational']),
+            'base_load_mw': sum(s['load_mw'] for s in self.substations.values()),
+            'ev_charging_load_kw': sum(ev.get('current_load_kw', 0) for ev in self.ev_stations.values())
+        }
+        self._pypsa_load_cache = (None, 0.0)
+    
+    def _pypsa_load_mw(self) -> float:
+        """Total PyPSA load set point, re-summed once per power flow solve"""
+        
+        if not self.power_grid:
+            return 0.0
+        
+        loads = self.power_grid.network.loads
+        key = (getattr(self.power_grid, 'power_flow_version', None), len(loads))
+        if self._pypsa_load_cache[0] != key:
+            p_set = pd.to_numeric(loads['p_set'], errors='coerce').fillna(0.0)
+            self._pypsa_load_cache = (key, float(p_set.sum()))
+        return self._pypsa_load_cache[1]
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Network statistics from the running counters, O(1)"""
         
-        # Calculate total load correctly
+        counters = self.counters
+        base_load_mw = counters['base_load_mw']
+        ev_charging_load_mw = counters['ev_charging_load_kw'] / 1000
+        
+        # PyPSA base load when it is realistic (< 10,000 MW for Manhattan), plus EV load
         total_load_mw = base_load_mw + ev_charging_load_mw
+        try:
+            pypsa_load = self._pypsa_load_mw()
+            if 0 < pypsa_load < 10000:
+                total_load_mw = pypsa_load + ev_charging_load_mw
+        except Exception:
+            pass
+        
+        light_counts = self.traffic_lights.counts()
+        
+        return {
+            'total_substations': len(self.substations),
+            'operational_substations': counters['operational_substations'],
+            'total_transformers': len(self.distribution_transformers),
+            'total_traffic_lights': len(self.traffic_lights),
+            'powered_traffic_lights': light_counts['powered'],
+            'green_lights': light_counts['green'],
+            'red_lights': light_counts['red'],
+            'yellow_lights': light_counts['yellow'],
+            'black_lights': light_counts['off'],
+            'total_ev_stations': len(self.ev_stations),
+            'operational_ev_stations': counters['operational_ev_stations'],
+            'total_load_mw': total_load_mw,
+            'base_load_mw': base_load_mw,
+            'ev_charging_load_mw': ev_charging_load_mw,
+            'total_primary_cables': len(self.primary_cables),
+            'total_secondary_cables': len(self.secondary_cables),
+            'operational_primary_cables': counters['operational_primary_cables'],
+            'operational_secondary_cables': counters['operational_secondary_cables']
+        }
+    
+    def get_network_state(self) -> Dict[str, Any]:
+        """Get complete network state for visualization - PROPERLY FIXED"""
+        
+        statistics = self.get_statistics()
         
-        # Try to get from PyPSA if available - FIXED
-        if hasattr(self, 'power_grid') and self.power_grid:
-            try:
-                # CORRECT WAY: Sum p_set values, not time series
-                pypsa_load = 0
-                for load_name in self.power_grid.network.loads.index:
-                    load_value = self.power_grid.network.loads.at[load_name, 'p_set']
-                    pypsa_load += float(load_value) if load_value else 0
-                
-                # Only use PyPSA value if it's realistic (< 10,000 MW for Manhattan)
-                if 0 < pypsa_load < 10000:
-                    total_load_mw = pypsa_load + ev_charging_load_mw  # Add EV load to PyPSA base
-                    print(f"[DEBUG] Using PyPSA load + EV: {pypsa_load:.2f} + {ev_charging_load_mw:.2f} = {total_load_mw:.2f} MW")
-                else:
-                    # PyPSA value is unrealistic, use manual calculation
-                    print(f"[DEBUG] PyPSA load unrealistic ({pypsa_load:.2f} MW), using manual: {total_load_mw:.2f} MW")
-                    
-            except Exception as e:
-                print(f"[DEBUG] Using manual calculation: {total_load_mw:.2f} MW (error: {e})")
-        else:
-            print(f"[DEBUG] Using manual calculation: {total_load_mw:.2f} MW (PyPSA not available)")
-
         return {
             'substations': [
                 {
@@ -733,20 +1032,8 @@ class ManhattanIntegratedSystem:
                 }
                 for name, data in self.substations.items()
             ],
-            'total_load_mw': total_load_mw,  # This should now be correct
-            'traffic_lights': [
-                {
-                    'id': tl['id'],
-                    'lat': tl['lat'],
-                    'lon': tl['lon'],
-                    'powered': tl['powered'],
-                    'color': tl.get('color', '#ff0000' if tl['powered'] else '#000000'),
-                    'phase': tl.get('phase', 'normal'),
-                    'substation': tl['substation'],
-                    'intersection': tl['intersection']
-                }
-                for tl in list(self.traffic_lights.values())
-            ],
+            'total_load_mw': statistics['total_load_mw'],
+            'traffic_lights': self.traffic_lights.to_records(),
             'ev_stations': [
                 {
                     'id': ev['id'],
@@ -765,24 +1052,108 @@ class ManhattanIntegratedSystem:
                 'primary': self.primary_cables,
                 'secondary': self.secondary_cables
             },
-            'statistics': {
-                'total_substations': len(self.substations),
-                'operational_substations': sum(1 for s in self.substations.values() if s['operational']),
-                'total_transformers': len(self.distribution_transformers),
-                'total_traffic_lights': len(self.traffic_lights),
-                'powered_traffic_lights': sum(1 for tl in self.traffic_lights.values() if tl['powered']),
-                'green_lights': sum(1 for tl in self.traffic_lights.values() if tl.get('color') == '#00ff00'),
-                'red_lights': sum(1 for tl in self.traffic_lights.values() if tl.get('color') == '#ff0000'),
-                'yellow_lights': sum(1 for tl in self.traffic_lights.values() if tl.get('color') == '#ffff00'),
-                'black_lights': sum(1 for tl in self.traffic_lights.values() if tl.get('color') == '#000000'),
-                'total_ev_stations': len(self.ev_stations),
-                'operational_ev_stations': sum(1 for ev in self.ev_stations.values() if ev['operational']),
-                'total_load_mw': total_load_mw,
-                'base_load_mw': base_load_mw,
-                'ev_charging_load_mw': ev_charging_load_mw,
-                'total_primary_cables': len(self.primary_cables),
-                'total_secondary_cables': len(self.secondary_cables),
-                'operational_primary_cables': sum(1 for c in self.primary_cables if c['operational']),
-                'operational_secondary_cables': sum(1 for c in self.secondary_cables if c['operational'])
+            'statistics': statistics
+        }
+    
+    def get_static_topology(self) -> Tuple[bytes, str]:
+        """
+        Static topology document (geometry, ids, names) as JSON bytes, with its version
+        
+        Nothing in it changes at runtime - failures and restores only flip the
+        state carried by get_dynamic_state - so it is serialized once and the
+        version is a hash of its content. Cable paths are encoded polylines.
+        """
+        
+        if self._static_topology is None:
+            cable_keys = ('id', 'type', 'voltage', 'from', 'to')
+            primary_paths = encode_polylines([c['path'] for c in self.primary_cables])
+            secondary_paths = encode_polylines([c['path'] for c in self.secondary_cables])
+            document = {
+                'path_encoding': f"polyline{DEFAULT_PRECISION}",
+                'phases': list(PHASES),
+                'phase_colors': list(PHASE_COLORS),
+                'substations': [
+                    {
+                        'name': name,
+                        'lat': data['lat'],
+                        'lon': data['lon'],
+                        'capacity_mva': data['capacity_mva'],
+                        'coverage_area': data['coverage_area']
+                    }
+                    for name, data in self.substations.items()
+                ],
+                'traffic_lights': self.traffic_lights.static_records(),
+                'ev_stations': [
+                    {key: ev[key] for key in ('id', 'name', 'lat', 'lon', 'chargers', 'substation')}
+                    for ev in self.ev_stations.values()
+                ],
+                'cables': {
+                    'primary': [
+                        {**{key: c[key] for key in cable_keys}, 'path': path}
+                        for c, path in zip(self.primary_cables, primary_paths)
+                    ],
+                    'secondary': [
+                        {**{key: c[key] for key in cable_keys}, 'substation': c['substation'], 'path': path}
+                        for c, path in zip(self.secondary_cables, secondary_paths)
+                    ]
+                }
             }
-        }
\ No newline at end of file
+            body = json.dumps(document, separators=(',', ':')).encode()
+            version = hashlib.sha256(body).hexdigest()[:16]
+            self._static_topology = (b'{"topology_version":"%s",' % version.encode() + body[1:], version)
+        
+        return self._static_topology
+    
+    @property
+    def topology_version(self) -> str:
+        return self.get_static_topology()[1]
+    
+    def get_cable_geometry(self) -> bytes:
+        """All cable paths (primary, then secondary) as one packed int32 delta blob"""
+        
+        if self._cable_geometry is None:
+            self._cable_geometry = pack_polylines(
+                [c['path'] for c in self.primary_cables] + [c['path'] for c in self.secondary_cables]
+            )
+        return self._cable_geometry
+    
+    def get_dynamic_state(self) -> Dict[str, Any]:
+        """
+        Component state keyed like the static topology: substations and EV
+        stations by name/id, lights and cables by their position in it
+        """
+        
+        statistics = self.get_statistics()
+        
+        return {
+            'topology_version': self.topology_version,
+            'substations': {
+                name: {
+                    'operational': data['operational'],
+                    'load_mw': data['load_mw'] + data.get('ev_load_mw', 0)
+                }
+                for name, data in self.substations.items()
+            },
+            'traffic_lights': self.traffic_lights.state_columns(),
+            'ev_stations': {
+                ev_id: {
+                    'operational': ev['operational'],
+                    'vehicles_charging': ev.get('vehicles_charging', 0),
+                    'current_load_kw': ev.get('current_load_kw', 0)
+                }
+                for ev_id, ev in self.ev_stations.items()
+            },
+            'cables': {
+                'primary_down': self._down_positions(self.primary_cables, statistics['operational_primary_cables']),
+                'secondary_down': self._down_positions(self.secondary_cables, statistics['operational_secondary_cables'])
+            },
+            'total_load_mw': statistics['total_load_mw'],
+            'statistics': statistics
+        }
+    
+    @staticmethod
+    def _down_positions(cables: List[Dict[str, Any]], operational: int) -> List[int]:
+        """Positions of failed cables (no scan while the counter says none are down)"""
+        if operational == len(cables):
+            return []
+        return [i for i, c in enumerate(cables) if not c['operational']]
\ No newline at end of file
@@ -12,6 +12,8 @@ from datetime import datetime
 import traceback
 import random
 import os
+import zlib
+import atexit
 
 try:
     from dotenv import load_dotenv
@@ -22,7 +24,9 @@ except Exception:
 # Import our systems
 from core.power_system import ManhattanPowerGrid
 from integrated_backend import ManhattanIntegratedSystem
+from core.geometry_codec import encode_polyline
 from core.sumo_manager import ManhattanSUMOManager, SimulationScenario
+from ev_station_manager import EVStationManager
 from ml_engine import MLPowerGridEngine
 try:
     from openai import OpenAI
@@ -43,6 +47,9 @@ print("=" * 60)
 print("Initializing PyPSA power grid...")
 power_grid = ManhattanPowerGrid()
 
+# Drain pending network state snapshots to the database on shutdown
+atexit.register(power_grid.state_writer.stop)
+
 # ADD THIS: Initialize loads with realistic values
 print("Setting initial load values...")
 # Around line 45 - REDUCE all loads to prevent overload
@@ -64,15 +71,9 @@ initial_loads = {
     "Industrial_Chelsea": 14,             # was 70
     "Industrial_Midtown_East": 10         # was 50
 }
-for load_name, load_mw in initial_loads.items():
-    # Fix the name format to match PyPSA (underscores instead of apostrophes)
-    fixed_load_name = load_name.replace("'", "")
-    if fixed_load_name in power_grid.network.loads.index:
-        power_grid.network.loads.at[fixed_load_name, 'p_set'] = load_mw
-        print(f"  Set {fixed_load_name}: {load_mw} MW")
-    elif load_name in power_grid.network.loads.index:
-        power_grid.network.loads.at[load_name, 'p_set'] = load_mw
-        print(f"  Set {load_name}: {load_mw} MW")
+# Names are resolved through the grid's load index (underscores/apostrophes)
+for load_name in power_grid.set_loads(initial_loads, strict=False):
+    print(f"  Set {load_name}: {power_grid.get_loads([load_name]).iloc[0]:.0f} MW")
 
 print(f"Total initial load: {sum(initial_loads.values())} MW")
 
@@ -137,15 +138,21 @@ system_state = {
     'scenario': SimulationScenario.MIDDAY
 }
 
+# Vehicle/simulation status, rebuilt at most once per simulation tick: (key, etag, payload)
+simulation_status_cache = {'entry': None}
+
 def simulation_loop():
     """Main simulation loop integrating power, traffic lights, and vehicles"""
     global system_state
     
+    # Simulated time starts now; every solve, snapshot and dispatch runs on it
+    power_grid.set_simulation_time(system_state['current_time'] * 0.1)
+    
     while system_state['running']:
         try:
             # Update traffic light phases every 2 seconds
             if system_state['current_time'] % 20 == 0:  # Every 2 seconds at 0.1s steps
-                integrated_system.update_traffic_light_phases()
+                integrated_system.update_traffic_light_phases(system_state['current_time'] * 0.1)
             
             # Run SUMO step if active
             if system_state['sumo_running'] and sumo_manager.running:
@@ -155,14 +162,21 @@ def simulation_loop():
                 # Step SUMO simulation
                 sumo_manager.step()
                 
-                # Update power grid with EV charging loads
+                # Update power grid with EV charging loads (solves when the trigger fires)
                 update_ev_power_loads()
+            else:
+                # Solve when an injection moved past its deadband or the last solve is stale
+                power_grid.run_power_flow_if_needed("dc")
             
-            # Run power flow every 30 seconds
-            if system_state['current_time'] % 50 == 0:
-                power_grid.run_power_flow("dc")
+            # Re-dispatch every few simulated minutes as the load forecast moves
+            power_grid.redispatch_if_due()
+            
+            # Reconnect shed commercial load once the network can carry it (every 5 seconds)
+            if system_state['current_time'] % 50 == 0 and power_grid.release_load_shedding():
+                print("  📈 Shed commercial load reconnected")
             
             system_state['current_time'] += 1
+            power_grid.set_simulation_time(system_state['current_time'] * 0.1)  # 0.1s steps
             time.sleep(0.01 / system_state['simulation_speed'])
             
         except Exception as e:
@@ -174,14 +188,9 @@ def update_ev_power_loads():
     """Update power grid loads based on EV charging - COMPLETE FIXED VERSION"""
     
     global power_grid  # Use the global instance
-    global previous_ev_load_mw  # Track previous load
     
     print(f"[DEBUG] update_ev_power_loads called at time {system_state['current_time']}")
     
-    # Initialize previous load tracking
-    if 'previous_ev_load_mw' not in globals():
-        previous_ev_load_mw = 0
-    
     # Verify power_grid exists
     if not power_grid:
         print("[ERROR] power_grid not initialized!")
@@ -202,7 +211,8 @@ def update_ev_power_loads():
         'total_vehicles_charging': 0,
         'total_power_kw': 0,
         'stations_active': 0,
-        'critical_stations': []
+        'critical_stations': [],
+        'station_demand': {}  # Station id -> (13.8kV bus, requested MW before curtailment)
     }
     
     # Count charging vehicles properly
@@ -255,15 +265,20 @@ def update_ev_power_loads():
             else:
                 power_per_vehicle = 22   # 22kW when very crowded
             
-            charging_power_kw = chargers_in_use * power_per_vehicle
+            requested_kw = chargers_in_use * power_per_vehicle
         else:
-            charging_power_kw = 0
+            requested_kw = 0
+        
+        # Curtailment from the load-shedding optimizer caps the delivered power
+        charging_power_kw = requested_kw * sumo_manager.get_charging_rate(ev_id)
+        station_bus = power_grid.bus_for_substation(ev_station['substation'])
+        if station_bus:
+            charging_details['station_demand'][ev_id] = (station_bus, requested_kw / 1000)
         
         total_charging_kw += charging_power_kw
         
         # Update the integrated system
-        ev_station['vehicles_charging'] = chargers_in_use
-        ev_station['current_load_kw'] = charging_power_kw
+        integrated_system.set_ev_charging(ev_id, chargers_in_use, charging_power_kw)
         
         # Track load by substation
         substation_name = ev_station['substation']
@@ -286,128 +301,67 @@ def update_ev_power_loads():
     # UPDATE PYPSA NETWORK - Key part
     print(f"[DEBUG] Total EV charging load: {total_charging_kw/1000:.2f} MW")
     
-    # COMPLETE FIX: Map ALL substations correctly
-    bus_name_mapping = {
-        "Hell's Kitchen": "Hell's Kitchen_13.8kV",  # Note the apostrophe in PyPSA!
-        "Times Square": "Times Square_13.8kV",
-        "Penn Station": "Penn Station_13.8kV", 
-        "Grand Central": "Grand Central_13.8kV",
-        "Murray Hill": "Murray Hill_13.8kV",
-        "Turtle Bay": "Turtle Bay_13.8kV",
-        "Columbus Circle": "Chelsea_13.8kV",  # Columbus Circle maps to Chelsea bus
-        "Midtown East": "Midtown East_13.8kV"
-    }
-    
-    # Update PyPSA loads for each substation
-    for substation_name, load_kw in substation_loads.items():
-        load_mw = load_kw / 1000
-        
-        # Get correct bus name from mapping
-        bus_name = bus_name_mapping.get(substation_name)
+    # Resolve each substation's 13.8kV bus through the grid registry
+    ev_loads = {}  # EV load name -> (bus, MW)
+    for substation_name in integrated_system.substations:
+        bus_name = power_grid.bus_for_substation(substation_name)
         if not bus_name:
-            print(f"[ERROR] No mapping for substation: {substation_name}")
-            continue
-        
-        # Check if bus exists in network (handling apostrophes)
-        bus_name_in_pypsa = None
-        if bus_name in power_grid.network.buses.index:
-            bus_name_in_pypsa = bus_name
-        elif bus_name.replace("'", "") in power_grid.network.buses.index:
-            bus_name_in_pypsa = bus_name.replace("'", "")
-        elif bus_name.replace(" ", "_") in power_grid.network.buses.index:
-            bus_name_in_pypsa = bus_name.replace(" ", "_")
-        
-        if not bus_name_in_pypsa:
-            print(f"[WARNING] Bus {bus_name} not found in network")
-            if system_state['current_time'] % 1000 == 0:  # Every 100 seconds
-                available_buses = [b for b in power_grid.network.buses.index if "13.8kV" in b]
-                print(f"[DEBUG] Available 13.8kV buses: {available_buses}")
+            if substation_name in substation_loads:
+                print(f"[ERROR] No bus for substation: {substation_name}")
             continue
         
-        # Create EV load name
+        load_mw = substation_loads.get(substation_name, 0) / 1000
         clean_name = substation_name.replace(' ', '_').replace("'", '')
-        ev_load_name = f"EV_{clean_name}"
+        ev_loads[f"{power_grid.EV_LOAD_PREFIX}{clean_name}"] = (bus_name, load_mw)
         
         # Update integrated system
-        if substation_name in integrated_system.substations:
+        if substation_name in substation_loads:
             old_ev_load = integrated_system.substations[substation_name].get('ev_load_mw', 0)
             integrated_system.substations[substation_name]['ev_load_mw'] = load_mw
             
             if abs(old_ev_load - load_mw) > 0.01:
                 print(f"[DEBUG] {substation_name} EV load: {old_ev_load:.2f} → {load_mw:.2f} MW")
+    
+    # Update PyPSA loads in bulk
+    try:
+        existing = power_grid.network.loads.index
+        new_loads = [name for name, (_, mw) in ev_loads.items() if name not in existing and mw > 0]
+        if new_loads:
+            power_grid.network.madd(
+                "Load",
+                new_loads,
+                bus=[ev_loads[name][0] for name in new_loads],
+                p_set=[ev_loads[name][1] for name in new_loads]
+            )
+            print(f"[DEBUG] Created new EV loads: {', '.join(new_loads)}")
         
-        # Update PyPSA bus load
-        try:
-            if ev_load_name not in power_grid.network.loads.index:
-                # Create new load
-                power_grid.network.add(
-                    "Load",
-                    ev_load_name,
-                    bus=bus_name_in_pypsa,
-                    p_set=load_mw
-                )
-                print(f"[DEBUG] Created new EV load at {bus_name_in_pypsa}: {load_mw:.2f} MW")
-            else:
-                # Update existing load
-                old_value = power_grid.network.loads.at[ev_load_name, 'p_set']
-                power_grid.network.loads.at[ev_load_name, 'p_set'] = load_mw
-                
-                if abs(old_value - load_mw) > 0.01:  # Only log significant changes
-                    print(f"[DEBUG] Updated {ev_load_name}: {old_value:.2f} → {load_mw:.2f} MW")
-                    
-        except Exception as e:
-            print(f"[ERROR] Failed to update PyPSA load for {substation_name}: {e}")
+        names = [name for name in ev_loads if name in power_grid.network.loads.index]
+        if names:
+            old_values = power_grid.get_loads(names)
+            new_values = [ev_loads[name][1] for name in names]
+            power_grid.set_loads(new_values, names=names)
+            
+            for name, old_value, new_value in zip(names, old_values.values, new_values):
+                if abs(old_value - new_value) > 0.01:  # Only log significant changes
+                    print(f"[DEBUG] Updated {name}: {old_value:.2f} → {new_value:.2f} MW")
     
-    # Clean up zero loads
-    for substation_name in bus_name_mapping.keys():
-        if substation_name not in substation_loads:
-            clean_name = substation_name.replace(' ', '_').replace("'", '')
-            ev_load_name = f"EV_{clean_name}"
-            if ev_load_name in power_grid.network.loads.index:
-                old_val = power_grid.network.loads.at[ev_load_name, 'p_set']
-                if old_val > 0:
-                    power_grid.network.loads.at[ev_load_name, 'p_set'] = 0
-                    print(f"[DEBUG] Cleared {ev_load_name}: {old_val:.2f} → 0.00 MW")
+    except Exception as e:
+        print(f"[ERROR] Failed to update PyPSA EV loads: {e}")
     
-    # TRIGGER POWER FLOW - COMPLETE FIXED VERSION
+    # TRIGGER POWER FLOW - per-bus deadbands and maximum staleness
     total_ev_load_mw = total_charging_kw / 1000
     
-    # Ensure previous_ev_load_mw exists before using it
-    if 'previous_ev_load_mw' not in globals():
-        previous_ev_load_mw = 0.0
-        print(f"[DEBUG] Initialized previous_ev_load_mw to 0.0")
-    
-    # Calculate conditions
-    load_change = abs(total_ev_load_mw - previous_ev_load_mw)
-    time_for_periodic = (system_state['current_time'] % 50 == 0)
-    first_charging = (previous_ev_load_mw == 0 and total_ev_load_mw > 0)
-    
-    # Debug output
-    print(f"[DEBUG] Power flow check: current={total_ev_load_mw:.3f} MW, previous={previous_ev_load_mw:.3f} MW, diff={load_change:.3f} MW")
-    print(f"[DEBUG] Time check: timestep={system_state['current_time']}, periodic={time_for_periodic}")
-    
-    # Determine if power flow should run
-    should_run_power_flow = False
-    reason = ""
-    
-    if load_change > 0.05:
-        should_run_power_flow = True
-        reason = f"load change {load_change:.3f} MW"
-    elif system_state['current_time'] % 50 == 0 and total_ev_load_mw > 0:
-        should_run_power_flow = True
-        reason = f"forced periodic at timestep {system_state['current_time']}"
-        # Force update to trigger next time by setting an impossible previous value
-        previous_ev_load_mw = -999
-    elif first_charging:
-        should_run_power_flow = True
-        reason = "first EV started charging"
-    elif system_state['current_time'] % 500 == 0:  # Force every 50 seconds regardless
-        should_run_power_flow = True
-        reason = "forced periodic check"
+    try:
+        decision, result = power_grid.run_power_flow_if_needed("dc")
+    except Exception as e:
+        print(f"[ERROR] Power flow trigger failed: {e}")
+        decision, result = None, None
     
-    if should_run_power_flow:
-        print(f"[DEBUG] ⚡ TRIGGERING POWER FLOW: {reason}")
-        print(f"[DEBUG] Running power flow: EV load {previous_ev_load_mw:.2f} → {total_ev_load_mw:.2f} MW")
+    if result is not None:
+        print(f"[DEBUG] ⚡ TRIGGERED POWER FLOW: {decision.reason}")
+        if decision.changed_buses:
+            print(f"[DEBUG] Changed buses: {', '.join(decision.changed_buses[:5])} "
+                  f"(max delta {decision.max_delta_mw:.3f} MW)")
         
         try:
             # Calculate total system load INCLUDING base load
@@ -418,14 +372,9 @@ def update_ev_power_loads():
             print(f"[DEBUG] System loads: Base={base_load:.2f} MW, EV={total_ev_load_mw:.2f} MW, Total={total_system_load:.2f} MW")
             
             # Verify PyPSA network state
-            pypsa_total = sum(power_grid.network.loads.at[load, 'p_set'] 
-                             for load in power_grid.network.loads.index)
+            pypsa_total = power_grid.get_loads().sum()
             print(f"[DEBUG] PyPSA network total load: {pypsa_total:.2f} MW")
             
-            # Run power flow
-            print(f"[DEBUG] Executing power flow calculation...")
-            result = power_grid.run_power_flow("dc")
-            
             if result.converged:
                 print(f"[DEBUG] ✅ POWER FLOW CONVERGED")
                 print(f"[DEBUG]    Max line loading: {result.max_line_loading:.1%}")
@@ -458,21 +407,14 @@ def update_ev_power_loads():
                         if loading_percent > 85:
                             print(f"   ⚡ {name}: {loading_percent:.1f}% loaded")
                     
-                    # Implement demand response if critical
-                    if charging_details['total_vehicles_charging'] > 10:
-                        print(f"   📉 Would implement demand response for {charging_details['total_vehicles_charging']} EVs")
-                        for station_name in charging_details['critical_stations']:
-                            print(f"    Would reduce charging at {station_name} by 50%")
-                            
                 elif result.max_line_loading > 0.8:
                     print("📊 NOTICE: Line loading above 80% - monitoring required")
                 
                 # CHECK FOR VOLTAGE VIOLATIONS
-                if hasattr(result, 'voltage_violations') and result.voltage_violations:
-                    print(f"⚡ VOLTAGE ISSUES: {len(result.voltage_violations)} buses outside limits")
-                    for i, violation in enumerate(result.voltage_violations):
-                        if i < 3:  # Show first 3
-                            print(f"   Bus {violation.get('bus', 'unknown')}: {violation.get('voltage', 0):.3f} pu")
+                if result.analysis is not None and result.analysis.violation_count:
+                    print(f"⚡ VOLTAGE ISSUES: {result.analysis.violation_count} buses outside limits")
+                    for bus, voltage in result.analysis.voltage_violation_items()[:3]:  # Show first 3
+                        print(f"   Bus {bus}: {voltage:.3f} pu")
                 
                 # CHECK FOR SUBSTATION OVERLOADS
                 overloaded_substations = []
@@ -490,6 +432,11 @@ def update_ev_power_loads():
                             print(f"   💥 {name} WOULD TRIP! Initiating load shedding...")
                             system_state['emergency'] = True
                 
+                # Overloads (or curtailment that may now be released) go to the optimizer
+                if (result.max_line_loading > 1.0 or any(pct > 100 for _, pct in overloaded_substations)
+                        or sumo_manager.curtailment_active()):
+                    handle_grid_stress(result, charging_details)
+                
                 # Summary
                 if not overloaded_substations and result.max_line_loading < 0.8:
                     print(f"[DEBUG] ✅ Grid stable with {total_ev_load_mw:.2f} MW EV load")
@@ -510,19 +457,8 @@ def update_ev_power_loads():
             import traceback
             traceback.print_exc()
         
-        # Update previous load after power flow
-        print(f"[DEBUG] Updating previous_ev_load_mw after power flow: {previous_ev_load_mw:.3f} → {total_ev_load_mw:.3f} MW")
-        previous_ev_load_mw = total_ev_load_mw
-        
-    else:
-        # No power flow needed
-        if load_change > 0.001:
-            print(f"[DEBUG] Minor load change ({load_change:.3f} MW), no power flow needed")
-            
-    # ALWAYS update previous load at the end to track changes
-    if total_ev_load_mw != previous_ev_load_mw:
-        print(f"[DEBUG] Final update previous_ev_load_mw: {previous_ev_load_mw:.3f} → {total_ev_load_mw:.3f} MW")
-        previous_ev_load_mw = total_ev_load_mw
+    elif decision is not None and decision.max_delta_mw > 0.001:
+        print(f"[DEBUG] Minor load change ({decision.max_delta_mw:.3f} MW), no power flow needed")
     
     # Periodic summary (every 30 seconds at 0.1s timestep = 300 steps)
     if system_state['current_time'] % 300 == 0 and charging_details['total_vehicles_charging'] > 0:
@@ -539,23 +475,12 @@ def update_ev_power_loads():
             print(f"    {sub_name}: {load_kw/1000:.2f} MW")
 def check_n_minus_1_contingency():
     """Check if system can survive any single component failure"""
-    critical_components = []
-    for line in power_grid.network.lines.index:
-        # Temporarily fail this line
-        original_capacity = power_grid.network.lines.at[line, 's_nom']
-        power_grid.network.lines.at[line, 's_nom'] = 0
-        
-        # Run power flow
-        result = power_grid.run_power_flow("dc")
-        
-        # Check if system survives
-        if not result.converged or result.max_line_loading > 1.0:
-            critical_components.append(line)
-        
-        # Restore
-        power_grid.network.lines.at[line, 's_nom'] = original_capacity
-    
-    return critical_components
+    # Each outage is evaluated on a what-if view; the live network is never switched
+    outages = power_grid.screen_line_outages()
+    return [
+        line for line, outcome in outages.items()
+        if outcome['max_line_loading'] > 1.0 or outcome['load_shed_mw'] > 0
+    ]
 def calculate_dynamic_charging_power(soc):
     """Calculate realistic charging power based on battery SOC"""
     if soc < 0.2:
@@ -572,32 +497,45 @@ def handle_grid_stress(power_flow_result, charging_details):
     
     print("\n🚨 GRID STRESS DETECTED - INITIATING RESPONSE")
     
-    # Identify critical lines
+    # Identify critical lines (already sorted by loading)
     critical_lines = []
-    for line_name, line_data in power_grid.network.lines.iterrows():
-        loading = abs(line_data.p0 / line_data.s_nom) if line_data.s_nom > 0 else 0
-        if loading > 0.85:
-            critical_lines.append((line_name, loading))
+    if power_flow_result.analysis is not None:
+        critical_lines = power_flow_result.analysis.lines_above(0.85)
     
-    critical_lines.sort(key=lambda x: x[1], reverse=True)
+    # Minimum curtailment/shedding that clears every overload, applied this tick
+    plan = relieve_grid_overloads(charging_details.get('station_demand'))
     
-    # Implement demand response
-    if charging_details['total_vehicles_charging'] > 20:
-        print(f"  📉 Implementing demand response for {charging_details['total_vehicles_charging']} EVs")
-        
-        # Reduce charging rate at critical stations
-        for station_name in charging_details['critical_stations']:
-            # Find station and reduce power
-            for ev_id, ev_station in integrated_system.ev_stations.items():
-                if ev_station['name'] == station_name:
-                    # Signal SUMO to reduce charging rate
-                    if hasattr(sumo_manager, 'reduce_charging_rate'):
-                        sumo_manager.reduce_charging_rate(ev_id, 0.5)  # 50% reduction
-                    print(f"    Reduced charging at {station_name} by 50%")
+    for ev_id, factor in plan.station_rate_factors.items():
+        if factor < 1.0:
+            station_name = integrated_system.ev_stations[ev_id]['name']
+            print(f"    Reduced charging at {station_name} to {factor:.0%}")
     
     # Log critical lines
     for line, loading in critical_lines[:3]:
         print(f"  ⚡ Line {line}: {loading:.1%} loaded")
+    
+    return plan
+
+def relieve_grid_overloads(station_demand=None):
+    """Curtail EV charging first, then shed commercial load, and re-solve"""
+    
+    plan = power_grid.relieve_overloads(station_demand)
+    
+    # Station set points go straight back to the charging rates
+    for ev_id, factor in plan.station_rate_factors.items():
+        sumo_manager.reduce_charging_rate(ev_id, factor)
+        if ev_id in integrated_system.ev_stations and station_demand:
+            integrated_system.set_ev_charging(ev_id, current_load_kw=station_demand[ev_id][1] * factor * 1000)
+    
+    if plan.total_shed_mw > 0:
+        print(f"  📉 Curtailed {plan.ev_total_mw:.2f} MW EV charging, "
+              f"shed {plan.commercial_total_mw:.2f} MW commercial load ({plan.solve_ms:.1f} ms)")
+        power_grid.run_power_flow("dc")
+    if plan.residual_overload_mw > 0:
+        print(f"  ⚠️ {plan.residual_overload_mw:.2f} MW of overload cannot be cleared by shedding")
+        system_state['emergency'] = True
+    
+    return plan
 
 def handle_voltage_issues(violations):
     """Handle voltage violations - WORLD CLASS"""
@@ -656,18 +594,15 @@ def initiate_emergency_response(charging_details):
     # Signal critical state to dashboard
     system_state['emergency'] = True
 
-def initiate_load_shedding(substation_name, excess_mw):
+def initiate_load_shedding(substation_name, excess_mw, station_demand=None):
     """Implement load shedding to prevent cascade"""
     
     print(f"\n⚡ LOAD SHEDDING at {substation_name}: {excess_mw:.1f} MW")
     
-    # Priority order for shedding
+    # Priority order for shedding (solved as one LP over the DC sensitivities)
     # 1. Reduce EV charging
-    # 2. Turn off non-critical loads
-    # 3. Rolling blackouts if necessary
-    
-    # This would interface with your actual control system
-    pass
+    # 2. Turn off non-critical (commercial) loads
+    return relieve_grid_overloads(station_demand)
 # Start simulation thread
 sim_thread = threading.Thread(target=simulation_loop, daemon=True)
 sim_thread.start()
@@ -723,6 +658,137 @@ def debug_pypsa():
         debug_info['loads_t_shape'] = power_grid.network.loads_t.p.shape
     
     return jsonify(debug_info)
+
+def collect_vehicle_state(encode_shapes=False):
+    """
+    Vehicle positions plus charging/queued counts per station (SUMO must be running)
+    With encode_shapes, edge shapes are encoded polylines (cached per edge).
+    """
+    vehicles = []
+    
+    # Create station charging counts
+    station_charging_counts = {}
+    station_queued_counts = {}
+    
+    vehicle_list = list(sumo_manager.vehicles.values())
+    
+    for vehicle in vehicle_list:
+        try:
+            import traci
+            # Check if vehicle exists in SUMO
+            if vehicle.id in traci.vehicle.getIDList():
+                x, y = traci.vehicle.getPosition(vehicle.id)
+                lon, lat = traci.simulation.convertGeo(x, y)
+                # Extended kinematics and path info
+                edge_id = None
+                lane_id = None
+                lane_pos = None
+                lane_len = None
+                edge_shape = None
+                try:
+                    edge_id = traci.vehicle.getRoadID(vehicle.id)
+                    lane_id = traci.vehicle.getLaneID(vehicle.id)
+                    lane_pos = traci.vehicle.getLanePosition(vehicle.id)
+                    if lane_id:
+                        lane_len = traci.lane.getLength(lane_id)
+                    if edge_id and not edge_id.startswith(':'):
+                        # Use cached shapes if available
+                        try:
+                            from __main__ import EDGE_SHAPES
+                        except:
+                            EDGE_SHAPES = {}
+                        if edge_id in EDGE_SHAPES:
+                            shape_xy = EDGE_SHAPES[edge_id]['xy']
+                            edge_shape = EDGE_SHAPES[edge_id]['lonlat']
+                        else:
+                            shape_xy = traci.edge.getShape(edge_id)
+                            edge_shape = []
+                            for sx, sy in shape_xy:
+                                slon, slat = traci.simulation.convertGeo(sx, sy)
+                                edge_shape.append([slon, slat])
+                            EDGE_SHAPES[edge_id] = {'xy': shape_xy, 'lonlat': edge_shape}
+                        # Nearest point on XY polyline to (x,y)
+                        best_d = 1e18
+                        snap_x = x
+                        snap_y = y
+                        for i in range(len(shape_xy)-1):
+                            x1, y1 = shape_xy[i]
+                            x2, y2 = shape_xy[i+1]
+                            dx = x2 - x1
+                            dy = y2 - y1
+                            L2 = dx*dx + dy*dy if dx*dx + dy*dy != 0 else 1e-9
+                            t = ((x - x1)*dx + (y - y1)*dy) / L2
+                            if t < 0:
+                                px, py = x1, y1
+                            elif t > 1:
+                                px, py = x2, y2
+                            else:
+                                px, py = x1 + dx*t, y1 + dy*t
+                            d = ((x - px)**2 + (y - py)**2) ** 0.5
+                            if d < best_d:
+                                best_d = d
+                                snap_x, snap_y = px, py
+                        snap_lon, snap_lat = traci.simulation.convertGeo(snap_x, snap_y)
+                        if encode_shapes:
+                            entry = EDGE_SHAPES[edge_id]
+                            if 'polyline' not in entry:
+                                entry['polyline'] = encode_polyline(entry['lonlat'])
+                            edge_shape = entry['polyline']
+                except:
+                    pass
+                
+                # Track charging at stations
+                if hasattr(vehicle, 'is_charging') and vehicle.is_charging and vehicle.assigned_ev_station:
+                    if vehicle.assigned_ev_station not in station_charging_counts:
+                        station_charging_counts[vehicle.assigned_ev_station] = 0
+                    station_charging_counts[vehicle.assigned_ev_station] += 1
+                
+                # Track queued at stations
+                if hasattr(vehicle, 'is_queued') and vehicle.is_queued and vehicle.assigned_ev_station:
+                    if vehicle.assigned_ev_station not in station_queued_counts:
+                        station_queued_counts[vehicle.assigned_ev_station] = 0
+                    station_queued_counts[vehicle.assigned_ev_station] += 1
+                
+                vehicles.append({
+                    'id': vehicle.id,
+                    'lat': lat,
+                    'lon': lon,
+                    'type': vehicle.config.vtype.value,
+                    'speed': vehicle.speed,
+                    'speed_kmh': round(vehicle.speed * 3.6, 1),
+                    'soc': vehicle.config.current_soc if vehicle.config.is_ev else 1.0,
+                    'battery_percent': round(vehicle.config.current_soc * 100) if vehicle.config.is_ev else 100,
+                    'is_charging': getattr(vehicle, 'is_charging', False),
+                    'is_queued': getattr(vehicle, 'is_queued', False),
+                    'is_circling': getattr(vehicle, 'is_circling', False),
+                    'is_stranded': getattr(vehicle, 'is_stranded', False),
+                    'is_ev': vehicle.config.is_ev,
+                    'distance_traveled': round(vehicle.distance_traveled, 1),
+                    'waiting_time': round(vehicle.waiting_time, 1),
+                    'destination': vehicle.destination,
+                    'assigned_station': vehicle.assigned_ev_station,
+                    'edge_id': edge_id,
+                    'lane_id': lane_id,
+                    'lane_pos': lane_pos,
+                    'lane_len': lane_len,
+                    'edge_shape': edge_shape,
+                    'snap_lon': locals().get('snap_lon'),
+                    'snap_lat': locals().get('snap_lat')
+                })
+        except:
+            pass
+    
+    # Serving substation of every vehicle in one territory lookup
+    if vehicles:
+        substations = integrated_system.substations_at(
+            [v['lat'] for v in vehicles], [v['lon'] for v in vehicles]
+        )
+        for vehicle, substation in zip(vehicles, substations):
+            vehicle['substation'] = substation
+            vehicle['in_outage'] = bool(substation) and not integrated_system.substations[substation]['operational']
+    
+    return vehicles, station_charging_counts, station_queued_counts
+
 @app.route('/api/network_state')
 def get_network_state():
     """Get complete network state including vehicles"""
@@ -730,115 +796,7 @@ def get_network_state():
     
     # Add vehicle data if SUMO is running
     if system_state['sumo_running'] and sumo_manager.running:
-        vehicles = []
-        
-        # Create station charging counts
-        station_charging_counts = {}
-        station_queued_counts = {}
-        
-        vehicle_list = list(sumo_manager.vehicles.values())
-        
-        for vehicle in vehicle_list:
-            try:
-                import traci
-                # Check if vehicle exists in SUMO
-                if vehicle.id in traci.vehicle.getIDList():
-                    x, y = traci.vehicle.getPosition(vehicle.id)
-                    lon, lat = traci.simulation.convertGeo(x, y)
-                    # Extended kinematics and path info
-                    edge_id = None
-                    lane_id = None
-                    lane_pos = None
-                    lane_len = None
-                    edge_shape = None
-                    try:
-                        edge_id = traci.vehicle.getRoadID(vehicle.id)
-                        lane_id = traci.vehicle.getLaneID(vehicle.id)
-                        lane_pos = traci.vehicle.getLanePosition(vehicle.id)
-                        if lane_id:
-                            lane_len = traci.lane.getLength(lane_id)
-                        if edge_id and not edge_id.startswith(':'):
-                            # Use cached shapes if available
-                            try:
-                                from __main__ import EDGE_SHAPES
-                            except:
-                                EDGE_SHAPES = {}
-                            if edge_id in EDGE_SHAPES:
-                                shape_xy = EDGE_SHAPES[edge_id]['xy']
-                                edge_shape = EDGE_SHAPES[edge_id]['lonlat']
-                            else:
-                                shape_xy = traci.edge.getShape(edge_id)
-                                edge_shape = []
-                                for sx, sy in shape_xy:
-                                    slon, slat = traci.simulation.convertGeo(sx, sy)
-                                    edge_shape.append([slon, slat])
-                                EDGE_SHAPES[edge_id] = {'xy': shape_xy, 'lonlat': edge_shape}
-                            # Nearest point on XY polyline to (x,y)
-                            best_d = 1e18
-                            snap_x = x
-                            snap_y = y
-                            for i in range(len(shape_xy)-1):
-                                x1, y1 = shape_xy[i]
-                                x2, y2 = shape_xy[i+1]
-                                dx = x2 - x1
-                                dy = y2 - y1
-                                L2 = dx*dx + dy*dy if dx*dx + dy*dy != 0 else 1e-9
-                                t = ((x - x1)*dx + (y - y1)*dy) / L2
-                                if t < 0:
-                                    px, py = x1, y1
-                                elif t > 1:
-                                    px, py = x2, y2
-                                else:
-                                    px, py = x1 + dx*t, y1 + dy*t
-                                d = ((x - px)**2 + (y - py)**2) ** 0.5
-                                if d < best_d:
-                                    best_d = d
-                                    snap_x, snap_y = px, py
-                            snap_lon, snap_lat = traci.simulation.convertGeo(snap_x, snap_y)
-                    except:
-                        pass
-                    
-                    # Track charging at stations
-                    if hasattr(vehicle, 'is_charging') and vehicle.is_charging and vehicle.assigned_ev_station:
-                        if vehicle.assigned_ev_station not in station_charging_counts:
-                            station_charging_counts[vehicle.assigned_ev_station] = 0
-                        station_charging_counts[vehicle.assigned_ev_station] += 1
-                    
-                    # Track queued at stations
-                    if hasattr(vehicle, 'is_queued') and vehicle.is_queued and vehicle.assigned_ev_station:
-                        if vehicle.assigned_ev_station not in station_queued_counts:
-                            station_queued_counts[vehicle.assigned_ev_station] = 0
-                        station_queued_counts[vehicle.assigned_ev_station] += 1
-                    
-                    vehicles.append({
-                        'id': vehicle.id,
-                        'lat': lat,
-                        'lon': lon,
-                        'type': vehicle.config.vtype.value,
-                        'speed': vehicle.speed,
-                        'speed_kmh': round(vehicle.speed * 3.6, 1),
-                        'soc': vehicle.config.current_soc if vehicle.config.is_ev else 1.0,
-                        'battery_percent': round(vehicle.config.current_soc * 100) if vehicle.config.is_ev else 100,
-                        'is_charging': getattr(vehicle, 'is_charging', False),
-                        'is_queued': getattr(vehicle, 'is_queued', False),
-                        'is_circling': getattr(vehicle, 'is_circling', False),
-                        'is_stranded': getattr(vehicle, 'is_stranded', False),
-                        'is_ev': vehicle.config.is_ev,
-                        'distance_traveled': round(vehicle.distance_traveled, 1),
-                        'waiting_time': round(vehicle.waiting_time, 1),
-                        'destination': vehicle.destination,
-                        'assigned_station': vehicle.assigned_ev_station,
-                        'edge_id': edge_id,
-                        'lane_id': lane_id,
-                        'lane_pos': lane_pos,
-                        'lane_len': lane_len,
-                        'edge_shape': edge_shape,
-                        'snap_lon': locals().get('snap_lon'),
-                        'snap_lat': locals().get('snap_lat')
-                    })
-            except:
-                pass
-        
+        vehicles, station_charging_counts, station_queued_counts = collect_vehicle_state()
         state['vehicles'] = vehicles
         state['vehicle_stats'] = sumo_manager.get_statistics()
         
@@ -852,6 +810,61 @@ def get_network_state():
     
     return jsonify(state)
 
+@app.route('/api/network_static')
+def get_network_static():
+    """Static topology (geometry, ids, names); immutable when requested by version"""
+    body, version = integrated_system.get_static_topology()
+    etag = f"topology-{version}"
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    
+    # A versioned URL never changes content; the bare URL must be revalidated
+    if request.args.get('v') == version:
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/network_geometry')
+def get_network_geometry():
+    """All cable paths (primary, then secondary) as a packed int32 delta blob"""
+    version = integrated_system.topology_version
+    etag = f"geometry-{version}"
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(integrated_system.get_cable_geometry(),
+                                      mimetype='application/octet-stream')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/network_dynamic')
+def get_network_dynamic():
+    """Component state and vehicles, keyed like /api/network_static"""
+    state = integrated_system.get_dynamic_state()
+    
+    if system_state['sumo_running'] and sumo_manager.running:
+        vehicles, station_charging_counts, station_queued_counts = collect_vehicle_state(encode_shapes=True)
+        state['vehicles'] = vehicles
+        state['vehicle_stats'] = sumo_manager.get_statistics()
+        
+        for ev_id, ev_station in state['ev_stations'].items():
+            ev_station['vehicles_charging'] = station_charging_counts.get(ev_id, 0)
+            ev_station['vehicles_queued'] = station_queued_counts.get(ev_id, 0)
+    else:
+        state['vehicles'] = []
+        state['vehicle_stats'] = {}
+    
+    return jsonify(state)
+
 @app.route('/api/sumo/start', methods=['POST'])
 def start_sumo():
     """Start SUMO simulation"""
@@ -986,38 +999,78 @@ def set_simulation_speed():
     
     return jsonify({'success': True, 'speed': system_state['simulation_speed']})
 
+def sync_sumo_failure(substations):
+    """Push failed substations to SUMO: one TL sync per batch, then their EV stations"""
+    if not (system_state['sumo_running'] and sumo_manager.running):
+        return
+    
+    # Update traffic lights - they go to YELLOW during blackout, not RED
+    sumo_manager.update_traffic_lights()
+    
+    # Handle blackout for traffic lights specifically
+    if hasattr(sumo_manager, 'handle_blackout_traffic_lights'):
+        sumo_manager.handle_blackout_traffic_lights(list(substations))
+    
+    # UPDATE EV STATION STATUS PROPERLY (only the stations these substations feed)
+    station_manager = getattr(sumo_manager, 'station_manager', None)
+    for substation in substations:
+        blacked_out = False
+        for ev_id in integrated_system.ev_stations_at(substation):
+            # Mark station as non-operational in integrated system
+            integrated_system.set_ev_station_operational(ev_id, False)
+            
+            # Update SUMO manager's station status
+            if ev_id in sumo_manager.ev_stations_sumo:
+                sumo_manager.ev_stations_sumo[ev_id]['available'] = 0
+            
+            # Update station manager's status if it exists
+            if station_manager and ev_id in station_manager.stations:
+                station_manager.stations[ev_id]['operational'] = False
+                blacked_out = True
+        
+        # The blackout handler covers every station of the substation at once
+        if blacked_out:
+            station_manager.handle_blackout(substation)
+
+def sync_sumo_restore(substations):
+    """Push restored substations to SUMO: one TL sync per batch, then their EV stations"""
+    if not (system_state['sumo_running'] and sumo_manager.running):
+        return
+    
+    sumo_manager.update_traffic_lights()
+    
+    # RESTORE EV STATION STATUS (only the stations these substations feed)
+    station_manager = getattr(sumo_manager, 'station_manager', None)
+    for substation in substations:
+        for ev_id in integrated_system.ev_stations_at(substation):
+            ev_station = integrated_system.ev_stations[ev_id]
+            
+            # Mark station as operational
+            integrated_system.set_ev_station_operational(ev_id, True)
+            
+            # Update SUMO manager
+            if ev_id in sumo_manager.ev_stations_sumo:
+                sumo_manager.ev_stations_sumo[ev_id]['available'] = ev_station['chargers']
+            
+            # Update station manager
+            if station_manager and ev_id in station_manager.stations:
+                station_manager.stations[ev_id]['operational'] = True
+                print(f"   ✅ Restored {ev_station['name']} ONLINE")
+
+def batch_substations():
+    """Substation names of a batch request body ({"substations": [...]}), validated"""
+    names = list(dict.fromkeys((request.get_json(silent=True) or {}).get('substations') or []))
+    unknown = [name for name in names if name not in integrated_system.substations]
+    if unknown:
+        raise KeyError(f"Unknown substations: {', '.join(unknown)}")
+    return names
+
 @app.route('/api/fail/<substation>', methods=['POST'])
 def fail_substation(substation):
     """Trigger substation failure affecting traffic lights and EV stations"""
     impact = integrated_system.simulate_substation_failure(substation)
     power_grid.trigger_failure('substation', substation)
-    
-    # Update SUMO traffic lights if running
-    if system_state['sumo_running'] and sumo_manager.running:
-        # Update traffic lights - they go to YELLOW during blackout, not RED
-        sumo_manager.update_traffic_lights()
-        
-        # Handle blackout for traffic lights specifically
-        if hasattr(sumo_manager, 'handle_blackout_traffic_lights'):
-            sumo_manager.handle_blackout_traffic_lights([substation])
-        
-        # UPDATE EV STATION STATUS PROPERLY
-        for ev_id, ev_station in integrated_system.ev_stations.items():
-            if ev_station['substation'] == substation:
-                # Mark station as non-operational in integrated system
-                ev_station['operational'] = False
-                
-                # Update SUMO manager's station status
-                if ev_id in sumo_manager.ev_stations_sumo:
-                    sumo_manager.ev_stations_sumo[ev_id]['available'] = 0
-                
-                # Update station manager's status if it exists
-                if hasattr(sumo_manager, 'station_manager') and sumo_manager.station_manager:
-                    if ev_id in sumo_manager.station_manager.stations:
-                        sumo_manager.station_manager.stations[ev_id]['operational'] = False
-                        
-                        # Call the blackout handler
-                        sumo_manager.station_manager.handle_blackout(substation)
+    sync_sumo_failure([substation])
     
     print(f"\n⚡ SUBSTATION FAILURE: {substation}")
     print(f"   - Traffic lights: Set to YELLOW (caution mode)")
@@ -1026,52 +1079,90 @@ def fail_substation(substation):
     
     return jsonify(impact)
 
+@app.route('/api/fail_batch', methods=['POST'])
+def fail_batch():
+    """Fail several substations as one event: one power flow and one TL sync"""
+    try:
+        names = batch_substations()
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 400
+    
+    try:
+        impact = integrated_system.simulate_substation_failures(names)
+        grid_impact = power_grid.trigger_failures([('substation', name) for name in names])
+        sync_sumo_failure(names)
+        
+        impact['cascaded_failures'] = grid_impact['cascaded_failures']
+        impact['blackout'] = grid_impact.get('blackout', False)
+        
+        print(f"\n⚡ SUBSTATION FAILURES: {len(names)} substations")
+        print(f"   - Traffic lights affected: {impact['traffic_lights_affected']}")
+        print(f"   - Load lost: {impact['load_lost_mw']:.1f} MW")
+        
+        return jsonify(impact)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/restore/<substation>', methods=['POST'])
 def restore_substation(substation):
     """Restore substation"""
     success = integrated_system.restore_substation(substation)
     if success:
         power_grid.restore_component('substation', substation)
-        
-        # Update SUMO traffic lights if running
-        if system_state['sumo_running'] and sumo_manager.running:
-            sumo_manager.update_traffic_lights()
-            
-            # RESTORE EV STATION STATUS
-            for ev_id, ev_station in integrated_system.ev_stations.items():
-                if ev_station['substation'] == substation:
-                    # Mark station as operational
-                    ev_station['operational'] = True
-                    
-                    # Update SUMO manager
-                    if ev_id in sumo_manager.ev_stations_sumo:
-                        sumo_manager.ev_stations_sumo[ev_id]['available'] = ev_station['chargers']
-                    
-                    # Update station manager
-                    if hasattr(sumo_manager, 'station_manager') and sumo_manager.station_manager:
-                        if ev_id in sumo_manager.station_manager.stations:
-                            sumo_manager.station_manager.stations[ev_id]['operational'] = True
-                            print(f"   ✅ Restored {ev_station['name']} ONLINE")
+        sync_sumo_restore([substation])
     
     return jsonify({'success': success})
 
+@app.route('/api/restore_batch', methods=['POST'])
+def restore_batch():
+    """Restore several substations as one event: one power flow and one TL sync"""
+    try:
+        names = batch_substations()
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 400
+    
+    try:
+        restored = integrated_system.restore_substations(names)
+        power_grid.restore_components([('substation', name) for name in restored])
+        sync_sumo_restore(restored)
+        return jsonify({'success': True, 'restored': restored})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/restore_plan')
+def get_restore_plan():
+    """Restoration order for the failed substations (nothing is restored)"""
+    try:
+        beam_width = int(request.args.get('beam_width', 16))
+        return jsonify(power_grid.plan_restoration(beam_width=beam_width))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/restore_all', methods=['POST'])
 def restore_all():
-    """Restore all substations"""
-    for sub_name in integrated_system.substations.keys():
-        integrated_system.restore_substation(sub_name)
-        power_grid.restore_component('substation', sub_name)
+    """Restore failed substations in the planned order (force=1 restores everything)"""
+    force = request.args.get('force', 'false').lower() in ('1', 'true', 'yes')
+    plan = power_grid.plan_restoration()
     
-    # Update SUMO if running
-    if system_state['sumo_running'] and sumo_manager.running:
-        sumo_manager.update_traffic_lights()
-        
-        # Restore all EV stations
-        for ev_id, ev_station in integrated_system.ev_stations.items():
-            if ev_id in sumo_manager.ev_stations_sumo:
-                sumo_manager.ev_stations_sumo[ev_id]['available'] = ev_station['chargers']
+    # Grid-failed substations follow the plan; blocked ones stay dark unless forced
+    held_back = set() if force else set(plan['blocked'])
+    order = [step['substation'] for step in plan['sequence']] + sorted(set(plan['blocked']) - held_back)
+    order += [name for name in integrated_system.substations if name not in order and name not in held_back]
     
-    return jsonify({'success': True, 'message': 'All systems restored'})
+    # One batch: a single power flow and TL sync for the whole order
+    restored = integrated_system.restore_substations(order)
+    power_grid.restore_components([('substation', sub_name) for sub_name in order])
+    sync_sumo_restore(restored)
+    
+    if held_back:
+        return jsonify({
+            'success': True,
+            'message': f"Restored {len(order)} substations; {len(held_back)} would overload the grid",
+            'blocked': sorted(held_back),
+            'plan': plan
+        })
+    return jsonify({'success': True, 'message': 'All systems restored', 'plan': plan})
+
 @app.route('/api/debug/ev_stations')
 def debug_ev_stations():
     """Debug endpoint to check EV station status"""
@@ -1088,15 +1179,177 @@ def debug_ev_stations():
         }
     
     return jsonify(status)
+@app.route('/api/power_flow')
+def get_power_flow():
+    """Latest power flow analysis (line loadings and violations)"""
+    result = power_grid.last_power_flow
+    if result is None:
+        return jsonify({'converged': False, 'message': 'No power flow result yet'})
+    
+    return jsonify(result.to_dict())
+
+@app.route('/api/probabilistic_power_flow')
+def get_probabilistic_power_flow():
+    """Overload probabilities over sampled EV charging and base load scenarios"""
+    try:
+        samples = int(request.args.get('samples', 5000))
+        horizon = float(request.args.get('horizon', 1.0))
+        
+        station_manager = getattr(sumo_manager, 'station_manager', None)
+        if station_manager:
+            distributions = station_manager.get_charging_distributions()
+        else:
+            distributions = [
+                EVStationManager.charging_distribution(
+                    ev_id,
+                    ev_station['substation'],
+                    ev_station['operational'],
+                    ev_station.get('vehicles_charging', 0),
+                    EVStationManager.port_layout()
+                )
+                for ev_id, ev_station in integrated_system.ev_stations.items()
+            ]
+        
+        result = power_grid.probabilistic_power_flow(
+            distributions, n_samples=samples, horizon_hours=horizon
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/what_if', methods=['POST'])
+def run_what_if():
+    """Evaluate a what-if scenario without touching the live grid"""
+    try:
+        data = request.json or {}
+        view = power_grid.what_if()
+        
+        for line in data.get('lines_out', []):
+            view.set_branch_status(line, False)
+        for branch, rating in data.get('ratings', {}).items():
+            view.set_rating(branch, rating)
+        if 'load_scale' in data:
+            view.scale_loads(float(data['load_scale']))
+        if data.get('loads'):
+            view.set_loads(data['loads'])
+        for substation in data.get('failed_substations', []):
+            view.fail_substation(substation)
+        
+        return jsonify(view.summary())
+    except KeyError as e:
+        return jsonify({'error': f"Unknown component: {e}"}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/load_shedding', methods=['POST'])
+def run_load_shedding():
+    """Compute (and optionally apply) the minimum curtailment/shedding plan"""
+    try:
+        data = request.json or {}
+        plan = power_grid.relieve_overloads(
+            line_limit=float(data.get('line_limit', 1.0)),
+            substation_limit=float(data.get('substation_limit', 1.0)),
+            apply=bool(data.get('apply', False))
+        )
+        return jsonify(plan.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/load_shedding/release', methods=['POST'])
+def release_load_shedding():
+    """Reconnect shed commercial load (skipped while it would overload a line, unless forced)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        released = power_grid.release_load_shedding(
+            line_limit=float(data.get('line_limit', 1.0)),
+            force=bool(data.get('force', False))
+        )
+        return jsonify({'released': released})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/hosting_capacity')
+def get_hosting_capacity():
+    """EV hosting capacity per 13.8kV bus (N-0, optionally N-1)"""
+    try:
+        n_minus_1 = request.args.get('n1', 'false').lower() in ('1', 'true', 'yes')
+        rating_factor = float(request.args.get('rating_factor', 1.0))
+        return jsonify(power_grid.hosting_capacity(
+            n_minus_1=n_minus_1, rating_factor=rating_factor
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cascade_risk')
+def get_cascade_risk():
+    """Monte Carlo cascade risk per initiating substation"""
+    try:
+        substation = request.args.get('substation')
+        trials = int(request.args.get('trials', 1000))
+        seed = int(request.args.get('seed', 0))
+        result = power_grid.assess_cascade_risk(
+            substations=[substation] if substation else None,
+            n_trials=trials,
+            seed=seed
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/power_flow/trigger_stats')
+def get_power_flow_trigger_stats():
+    """Triggered vs suppressed power flow solves"""
+    return jsonify(power_grid.get_trigger_stats())
+
+@app.route('/api/dispatch', methods=['GET', 'POST'])
+def get_dispatch():
+    """Latest rolling-horizon dispatch (POST re-solves now)"""
+    try:
+        service = power_grid.dispatch_service
+        if request.method == 'POST' or service.last_result is None:
+            start = request.args.get('start')
+            result = power_grid.optimize_dispatch(int(start) if start is not None else None)
+        else:
+            result = service.last_result.to_dict()
+        result['stats'] = service.get_stats()
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/persistence/metrics')
+def get_persistence_metrics():
+    """Write-behind network state queue metrics"""
+    return jsonify(power_grid.get_persistence_metrics())
+
 @app.route('/api/status')
 def get_status():
-    """Get complete system status"""
-    power_status = power_grid.get_system_status()
+    """Get grid system status (cached per power flow; honours If-None-Match)"""
+    etag = power_grid.get_status_etag()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(power_grid.get_system_status())
+    response.set_etag(etag)
+    return response
+
+def _simulation_status():
+    """Vehicle and simulation block, versioned by the simulation tick"""
+    sumo_active = system_state['sumo_running'] and sumo_manager.running
+    key = (
+        system_state['current_time'],
+        sumo_active,
+        system_state['simulation_speed'],
+        system_state['scenario'].value
+    )
+    
+    entry = simulation_status_cache['entry']
+    if entry is not None and entry[0] == key:
+        return entry
     
     # Add vehicle statistics
-    if system_state['sumo_running'] and sumo_manager.running:
+    if sumo_active:
         vehicle_stats = sumo_manager.get_statistics()
-        power_status['vehicles'] = {
+        vehicles = {
             'total': vehicle_stats['total_vehicles'],
             'active': len(sumo_manager.vehicles),
             'evs': vehicle_stats['ev_vehicles'],
@@ -1105,7 +1358,7 @@ def get_status():
             'energy_consumed_kwh': round(vehicle_stats['total_energy_consumed_kwh'], 2)
         }
     else:
-        power_status['vehicles'] = {
+        vehicles = {
             'total': 0,
             'active': 0,
             'evs': 0,
@@ -1114,13 +1367,29 @@ def get_status():
             'energy_consumed_kwh': 0
         }
     
-    power_status['simulation'] = {
-        'sumo_running': system_state['sumo_running'],
-        'speed': system_state['simulation_speed'],
-        'scenario': system_state['scenario'].value
+    payload = {
+        'vehicles': vehicles,
+        'simulation': {
+            'sumo_running': system_state['sumo_running'],
+            'speed': system_state['simulation_speed'],
+            'scenario': system_state['scenario'].value,
+            'time': system_state['current_time']
+        }
     }
-    
-    return jsonify(power_status)
+    entry = (key, f"sim-{zlib.crc32(repr(key).encode()):08x}", payload)
+    simulation_status_cache['entry'] = entry
+    return entry
+
+@app.route('/api/status/simulation')
+def get_simulation_status():
+    """Vehicle statistics and simulation settings (cached per tick; honours If-None-Match)"""
+    _, etag, payload = _simulation_status()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    return response
 
 # ==========================
 # ML API ENDPOINTS
@@ -2954,6 +3223,96 @@ HTML_COMPLETE_TEMPLATE = '''
     // ==========================================
     // DATA MANAGEMENT
     // ==========================================
+    // Encoded polyline (quantized, delta and zigzag encoded) -> coordinate pairs
+    function decodePolyline(encoded, precision) {
+        const scale = Math.pow(10, precision);
+        const coords = [];
+        let index = 0, a = 0, b = 0;
+        
+        const next = () => {
+            let result = 0, shift = 0, chunk;
+            do {
+                chunk = encoded.charCodeAt(index++) - 63;
+                result += (chunk & 0x1f) * Math.pow(2, shift);
+                shift += 5;
+            } while (chunk >= 0x20);
+            return (result % 2) ? -(result + 1) / 2 : result / 2;
+        };
+        
+        while (index < encoded.length) {
+            a += next();
+            b += next();
+            coords.push([a / scale, b / scale]);
+        }
+        return coords;
+    }
+    
+    // Static topology is fetched once per topology version; each update only
+    // pulls the dynamic document and applies it to the cached objects
+    const networkStore = {
+        topologyVersion: null,
+        topology: null,
+        
+        async loadTopology(version) {
+            const response = await fetch(`/api/network_static?v=${encodeURIComponent(version)}`);
+            const topology = await response.json();
+            
+            // Cable paths arrive as encoded polylines; decode once per version
+            const precision = parseInt(topology.path_encoding.replace('polyline', ''), 10);
+            topology.cables.primary.forEach(cable => { cable.path = decodePolyline(cable.path, precision); });
+            topology.cables.secondary.forEach(cable => { cable.path = decodePolyline(cable.path, precision); });
+            
+            this.topology = topology;
+            this.topologyVersion = topology.topology_version;
+        },
+        
+        async fetchState() {
+            const response = await fetch('/api/network_dynamic');
+            const dynamic = await response.json();
+            if (!this.topology || dynamic.topology_version !== this.topologyVersion) {
+                await this.loadTopology(dynamic.topology_version);
+            }
+            return this.apply(dynamic);
+        },
+        
+        apply(dynamic) {
+            const topology = this.topology;
+            
+            topology.substations.forEach(sub => {
+                Object.assign(sub, dynamic.substations[sub.name]);
+            });
+            
+            const phases = dynamic.traffic_lights.phase;
+            const dark = new Set(dynamic.traffic_lights.dark);
+            topology.traffic_lights.forEach((tl, i) => {
+                tl.powered = !dark.has(i);
+                tl.phase = topology.phases[phases[i]];
+                tl.color = topology.phase_colors[phases[i]];
+            });
+            
+            topology.ev_stations.forEach(ev => {
+                Object.assign(ev, {vehicles_queued: 0}, dynamic.ev_stations[ev.id]);
+            });
+            
+            const primaryDown = new Set(dynamic.cables.primary_down);
+            const secondaryDown = new Set(dynamic.cables.secondary_down);
+            topology.cables.primary.forEach((cable, i) => { cable.operational = !primaryDown.has(i); });
+            topology.cables.secondary.forEach((cable, i) => { cable.operational = !secondaryDown.has(i); });
+            
+            return {
+                topology_version: dynamic.topology_version,
+                substations: topology.substations,
+                traffic_lights: topology.traffic_lights,
+                ev_stations: topology.ev_stations,
+                cables: topology.cables,
+                total_load_mw: dynamic.total_load_mw,
+                statistics: dynamic.statistics,
+                vehicles: dynamic.vehicles,
+                vehicle_stats: dynamic.vehicle_stats
+            };
+        }
+    };
+    
     const dataManager = {
         lastFetch: 0,
         cache: null,
@@ -2969,8 +3328,7 @@ HTML_COMPLETE_TEMPLATE = '''
             
             this.fetching = true;
             try {
-                const response = await fetch('/api/network_state');
-                const data = await response.json();
+                const data = await networkStore.fetchState();
                 this.cache = data;
                 this.lastFetch = now;
                 return data;
@@ -2988,8 +3346,7 @@ HTML_COMPLETE_TEMPLATE = '''
     // ==========================================
     async function updateLoop() {
         try {
-            const response = await fetch('/api/network_state');
-            const data = await response.json();
+            const data = await networkStore.fetchState();
             
             if (data) {
                 networkState = data;
@@ -3911,11 +4268,13 @@ HTML_COMPLETE_TEMPLATE = '''
             const subs = (networkState?.substations || []).map(s => s.name);
             const total = subs.length;
             showBlackoutAlert(total - 1, 1);
-            for (const s of subs) {
-                if (s !== 'Midtown East') {
-                    await fetch(`/api/fail/${encodeURIComponent(s)}`, {method: 'POST'});
-                }
-            }
+            
+            // One batched request fails every substation in a single event
+            await fetch('/api/fail_batch', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({substations: subs.filter(s => s !== 'Midtown East')})
+            });
             await loadNetworkState();
         } catch (e) {
             console.error('Blackout error', e);
@@ -3932,8 +4291,7 @@ HTML_COMPLETE_TEMPLATE = '''
 
     async function loadNetworkState() {
         try {
-            const response = await fetch('/api/network_state');
-            networkState = await response.json();
+            networkState = await networkStore.fetchState();
             updateUI();
             renderNetwork();
             if (layers.vehicles && vehicleRenderer && networkState.vehicles) {
@@ -146,6 +146,7 @@ class ManhattanSUMOManager:
         
         # EV charging stations in SUMO
         self.ev_stations_sumo = {}
+        self.charging_rate_factors = {}  # Station id -> fraction of normal charging power
         # Initialize smart station manager
         self.station_manager = None
         
@@ -1244,7 +1245,8 @@ class ManhattanSUMOManager:
                     
                     # Update battery
                     old_soc = vehicle.config.current_soc
-                    vehicle.config.current_soc = min(0.80, vehicle.config.current_soc + 0.005)
+                    rate = self.get_charging_rate(vehicle.assigned_ev_station)
+                    vehicle.config.current_soc = min(0.80, vehicle.config.current_soc + 0.005 * rate)
                     
                     # Progress indicator
                     if int(old_soc * 20) != int(vehicle.config.current_soc * 20):
@@ -1564,6 +1566,21 @@ class ManhattanSUMOManager:
         except Exception as e:
             print(f"Error creating circle route: {e}")
     
+    def reduce_charging_rate(self, station_id: str, factor: float):
+        """Limit a station's charging power to a fraction of normal (1.0 lifts the limit)"""
+        factor = min(max(float(factor), 0.0), 1.0)
+        if factor >= 1.0:
+            self.charging_rate_factors.pop(station_id, None)
+        else:
+            self.charging_rate_factors[station_id] = factor
+    
+    def get_charging_rate(self, station_id: Optional[str]) -> float:
+        """Fraction of normal charging power allowed at a station"""
+        return self.charging_rate_factors.get(station_id, 1.0)
+    
+    def curtailment_active(self) -> bool:
+        return bool(self.charging_rate_factors)
+    
     def get_statistics(self) -> Dict:
         """Get current simulation statistics - PROPERLY COUNT CHARGING VEHICLES"""
         
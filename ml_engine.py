@@ -208,7 +208,7 @@ class MLPowerGridEngine:
             ])
         
         # Traffic features
-        powered_lights = sum(1 for tl in self.integrated_system.traffic_lights.values() if tl['powered'])
+        powered_lights = int(np.count_nonzero(self.integrated_system.traffic_lights.powered))
         total_lights = len(self.integrated_system.traffic_lights)
         features.append(powered_lights / max(1, total_lights))
         
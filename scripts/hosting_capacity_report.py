@@ -0,0 +1,43 @@
+"""
+EV Hosting Capacity Report
+Run this to write the N-0 / N-1 hosting capacity of every 13.8kV bus to CSV
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.power_system import ManhattanPowerGrid
+from core.hosting_capacity import HostingCapacityAnalyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EV hosting capacity per 13.8kV bus")
+    parser.add_argument("--output", default="data/hosting_capacity.csv", help="CSV output path")
+    parser.add_argument("--n0-only", action="store_true", help="Skip the N-1 screening")
+    parser.add_argument("--load-scale", type=float, default=1.0,
+                        help="Scale all loads before the analysis")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MANHATTAN POWER GRID - EV HOSTING CAPACITY")
+    print("=" * 60)
+
+    power_grid = ManhattanPowerGrid()
+    if args.load_scale != 1.0:
+        power_grid.scale_loads(args.load_scale)
+
+    table = HostingCapacityAnalyzer(power_grid).report(n_minus_1=not args.n0_only)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    table.to_csv(args.output)
+
+    print(table.to_string(float_format=lambda value: f"{value:,.1f}"))
+    print(f"\n✅ Report written to {args.output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
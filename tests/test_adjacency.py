@@ -0,0 +1,94 @@
+"""
+test_adjacency.py - Substation adjacency indexes of the distribution network
+Run this to verify failures touch exactly the components a substation feeds
+"""
+
+import time
+
+from core.power_system import ManhattanPowerGrid
+from integrated_backend import ManhattanIntegratedSystem
+
+
+def scanned_components(system, substation_name):
+    """Brute-force scan of everything a substation feeds"""
+    transformers = [
+        dt for dt in system.substations[substation_name]['transformers']
+        if dt in system.distribution_transformers
+    ]
+    return {
+        'transformers': transformers,
+        'traffic_lights': [
+            tl_id for dt in transformers
+            for tl_id in system.distribution_transformers[dt].traffic_lights
+        ],
+        'ev_stations': [
+            ev_id for ev_id, ev in system.ev_stations.items() if ev['substation'] == substation_name
+        ],
+        'primary_cables': [
+            i for i, cable in enumerate(system.primary_cables) if cable['from'] == substation_name
+        ],
+        'secondary_cables': [
+            i for i, cable in enumerate(system.secondary_cables) if cable['from'] in set(transformers)
+        ]
+    }
+
+
+def test_adjacency_matches_scan():
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+
+    for name in system.substations:
+        assert system.adjacency[name] == scanned_components(system, name)
+        assert system.ev_stations_at(name) == scanned_components(system, name)['ev_stations']
+
+
+def test_failure_touches_only_fed_components():
+    """Everything outside the failed substation keeps its state"""
+
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    fed = system.adjacency['Times Square']
+
+    impact = system.simulate_substation_failure('Times Square')
+    assert impact['traffic_lights_affected'] == len(fed['traffic_lights'])
+    assert impact['secondary_cables_affected'] == len(fed['secondary_cables'])
+
+    dark = set(fed['traffic_lights'])
+    for tl_id, tl in system.traffic_lights.items():
+        assert tl['powered'] == (tl_id not in dark)
+    for position, cable in enumerate(system.secondary_cables):
+        assert cable['operational'] == (position not in set(fed['secondary_cables']))
+    for ev_id, ev in system.ev_stations.items():
+        assert ev['operational'] == (ev_id not in fed['ev_stations'])
+
+    system.restore_substation('Times Square')
+    assert all(tl['powered'] for tl in system.traffic_lights.values())
+
+
+def test_all_substations_fail_fast():
+    """A city-wide event stays fast"""
+
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+
+    start = time.perf_counter()
+    for name in system.substations:
+        system.simulate_substation_failure(name)
+    for name in system.substations:
+        system.restore_substation(name)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.0
+    assert all(tl['powered'] for tl in system.traffic_lights.values())
+    assert all(cable['operational'] for cable in system.primary_cables)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("ADJACENCY INDEX TEST")
+    print("=" * 60)
+
+    test_adjacency_matches_scan()
+    test_failure_touches_only_fed_components()
+    test_all_substations_fail_fast()
+
+    print("\n" + "=" * 60)
+    print("ADJACENCY INDEX TEST COMPLETE")
+    print("=" * 60)
@@ -0,0 +1,128 @@
+"""
+test_batch_operations.py - Batched substation failure and restore
+Run this to verify a batch matches sequential operations with a single power flow
+"""
+
+import json
+import time
+
+import numpy as np
+
+from core.power_system import ManhattanPowerGrid
+from integrated_backend import ManhattanIntegratedSystem
+
+
+def integrated_state(system):
+    """Network state without the grid-side load, which follows the power flow"""
+    state = json.loads(json.dumps(system.get_network_state()))
+    state.pop('total_load_mw')
+    statistics = state.pop('statistics', None)
+    return state, statistics
+
+
+def test_batch_matches_sequential_failures():
+    names = ['Times Square', 'Penn Station', 'Grand Central']
+
+    batched = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    impact = batched.simulate_substation_failures(names + ['Nowhere'])
+
+    sequential = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    impacts = [sequential.simulate_substation_failure(name) for name in names]
+
+    assert impact['substations'] == names
+    assert impact['traffic_lights_affected'] == sum(i['traffic_lights_affected'] for i in impacts)
+    assert impact['load_lost_mw'] == sum(i['load_lost_mw'] for i in impacts)
+    assert integrated_state(batched) == integrated_state(sequential)
+
+
+def test_grid_batch_runs_one_power_flow():
+    grid = ManhattanPowerGrid()
+    names = list(grid.substations)[:4]
+
+    version = grid.power_flow_version
+    impact = grid.trigger_failures([('substation', name) for name in names])
+    assert grid.power_flow_version == version + 1
+    assert [i['component'] for i in impact['components']] == names
+    assert impact['load_lost_mw'] == sum(i['load_lost_mw'] for i in impact['components'])
+
+    version = grid.power_flow_version
+    restored = grid.restore_components([('substation', name) for name in names])
+    assert restored == {name: True for name in names}
+    assert grid.power_flow_version == version + 1
+
+
+def test_single_restore_after_batch():
+    """Each failed substation keeps its own journal entry and restores alone"""
+
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    fresh, _ = integrated_state(system)
+    names = ['Times Square', 'Penn Station']
+
+    system.simulate_substation_failures(names)
+    system.power_grid.trigger_failures([('substation', name) for name in names])
+
+    assert system.restore_substation('Times Square')
+    assert system.power_grid.restore_component('substation', 'Times Square')
+    assert system.substations['Times Square']['operational']
+    assert not system.substations['Penn Station']['operational']
+
+    assert system.restore_substations(['Penn Station', 'Nowhere']) == ['Penn Station']
+    assert integrated_state(system)[0] == fresh
+
+
+def grid_with_batch_cascade(names):
+    """Grid after a batch failure whose cascade tripped at least one line"""
+    for seed in range(50):
+        np.random.seed(seed)
+        grid = ManhattanPowerGrid()
+        impact = grid.trigger_failures([('substation', name) for name in names])
+        tripped = impact['cascaded_failures'][1:]
+        if tripped:
+            return grid, tripped
+    raise AssertionError("No cascade trips in 50 seeds")
+
+
+def test_cascade_trips_released_with_last_substation():
+    """Cascade trips stay out until every substation of the batch is back"""
+
+    names = ['Times Square', 'Grand Central']
+    for order in (names, names[::-1]):
+        grid, tripped = grid_with_batch_cascade(names)
+        assert set(tripped) <= set(grid.dc_solver.out_of_service())
+
+        grid.restore_component('substation', order[0])
+        assert set(tripped) <= set(grid.dc_solver.out_of_service())
+
+        grid.restore_component('substation', order[1])
+        assert grid.dc_solver.out_of_service() == []
+        assert grid.journal.get_stats()['open_transactions'] == 0
+
+
+def test_citywide_blackout_is_fast():
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    names = list(system.substations)
+
+    start = time.perf_counter()
+    impact = system.simulate_substation_failures(names)
+    system.power_grid.trigger_failures([('substation', name) for name in names])
+    elapsed = time.perf_counter() - start
+
+    assert impact['traffic_lights_affected'] == len(system.traffic_lights)
+    assert system.get_statistics()['powered_traffic_lights'] == 0
+    assert elapsed < 5.0
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("BATCH OPERATIONS TEST")
+    print("=" * 60)
+
+    test_batch_matches_sequential_failures()
+    test_grid_batch_runs_one_power_flow()
+    test_single_restore_after_batch()
+    test_cascade_trips_released_with_last_substation()
+    test_citywide_blackout_is_fast()
+
+    print("\n" + "=" * 60)
+    print("BATCH OPERATIONS TEST COMPLETE")
+    print("=" * 60)
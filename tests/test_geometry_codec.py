@@ -0,0 +1,85 @@
+"""
+test_geometry_codec.py - Polyline geometry codec
+Run this to verify encoded polylines and packed blobs round-trip and shrink the cable geometry
+"""
+
+import json
+
+import numpy as np
+
+from core.geometry_codec import (
+    decode_polyline, encode_polyline, encode_polylines, pack_polylines, unpack_polylines
+)
+from core.power_system import ManhattanPowerGrid
+from integrated_backend import ManhattanIntegratedSystem
+
+
+def random_paths(seed=0, count=200):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for _ in range(count):
+        n = int(rng.integers(0, 8))
+        start = np.array([-73.99, 40.76]) + rng.normal(0, 0.01, 2)
+        paths.append((start + np.cumsum(rng.normal(0, 0.001, (n, 2)), axis=0)).tolist())
+    return paths
+
+
+def test_reference_vector():
+    """The published example of the encoded-polyline algorithm (precision 5)"""
+
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points, precision=5) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert np.allclose(decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@", precision=5), points)
+
+
+def test_batch_matches_single_and_round_trips():
+    paths = random_paths()
+    encoded = encode_polylines(paths)
+
+    assert encoded == [encode_polyline(path) for path in paths]
+    for path, text in zip(paths, encoded):
+        decoded = np.array(decode_polyline(text)).reshape(-1, 2)
+        assert decoded.shape == np.array(path).reshape(-1, 2).shape
+        if path:
+            assert np.abs(decoded - np.array(path)).max() <= 5e-7 + 1e-12
+
+
+def test_packed_blob_round_trips():
+    paths = random_paths(seed=1) + [[], [[0.0, 0.0]]]
+    unpacked = unpack_polylines(pack_polylines(paths))
+
+    assert len(unpacked) == len(paths)
+    for path, array in zip(paths, unpacked):
+        assert array.shape == (len(path), 2)
+        if path:
+            assert np.abs(array - np.array(path)).max() <= 5e-7 + 1e-12
+
+
+def test_cable_geometry_is_smaller():
+    """Encoded cable paths are several times smaller than their JSON text"""
+
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    paths = [c['path'] for c in system.primary_cables + system.secondary_cables]
+
+    json_bytes = len(json.dumps(paths))
+    encoded_bytes = sum(len(text) for text in encode_polylines(paths))
+    blob_bytes = len(system.get_cable_geometry())
+
+    assert encoded_bytes * 3 < json_bytes
+    assert blob_bytes * 2 < json_bytes
+    assert len(unpack_polylines(system.get_cable_geometry())) == len(paths)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GEOMETRY CODEC TEST")
+    print("=" * 60)
+
+    test_reference_vector()
+    test_batch_matches_single_and_round_trips()
+    test_packed_blob_round_trips()
+    test_cable_geometry_is_smaller()
+
+    print("\n" + "=" * 60)
+    print("GEOMETRY CODEC TEST COMPLETE")
+    print("=" * 60)
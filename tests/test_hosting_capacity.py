@@ -0,0 +1,68 @@
+"""
+test_hosting_capacity.py - Closed-form EV hosting capacity
+Run this to verify the sensitivity-based limits against direct DC solves
+"""
+
+import numpy as np
+
+from core.power_system import ManhattanPowerGrid
+
+
+def loading_with_extra_load(power_grid, bus, extra_mw, outage=None):
+    """Max branch loading after adding load at a bus (optionally with an outage)"""
+    solver = power_grid.dc_solver
+    if outage is not None:
+        solver.set_branch_status(outage, False)
+
+    injections, _ = power_grid._nodal_injections()
+    injections[solver.bus_names.get_loc(bus)] -= extra_mw
+    flows = solver.solve(injections).flows_mw
+    rated = solver.active & (solver.s_nom > 0)
+    loading = np.abs(flows[rated]) / solver.s_nom[rated]
+
+    if outage is not None:
+        solver.set_branch_status(outage, True)
+    return loading.max()
+
+
+def test_n0_capacity_binds_exactly():
+    """Adding the N-0 capacity brings the binding branch exactly to its limit"""
+
+    power_grid = ManhattanPowerGrid()
+    power_grid.scale_loads(0.3)
+    result = power_grid.hosting_capacity()
+
+    assert all(bus.endswith("_13.8kV") for bus in result['buses'])
+    for bus, entry in result['buses'].items():
+        capacity = entry['n0_capacity_mw']
+        assert np.isclose(loading_with_extra_load(power_grid, bus, capacity), 1.0)
+        assert loading_with_extra_load(power_grid, bus, capacity * 1.01) > 1.0
+
+
+def test_n1_capacity_and_cache():
+    """N-1 capacity never exceeds N-0 and binds under its outage; results are cached"""
+
+    power_grid = ManhattanPowerGrid()
+    power_grid.scale_loads(0.3)
+    result = power_grid.hosting_capacity(n_minus_1=True)
+    assert power_grid.hosting_capacity(n_minus_1=True) is result
+
+    for bus, entry in result['buses'].items():
+        assert entry['n1_capacity_mw'] <= entry['n0_capacity_mw'] + 1e-9
+        if entry['n1_binding_outage']:
+            loading = loading_with_extra_load(
+                power_grid, bus, entry['n1_capacity_mw'], outage=entry['n1_binding_outage']
+            )
+            assert np.isclose(loading, 1.0)
+
+    # Topology change invalidates the cache
+    power_grid.set_line_status(power_grid.network.lines.index[0], False)
+    assert power_grid.hosting_capacity(n_minus_1=True) is not result
+
+
+if __name__ == "__main__":
+    test_n0_capacity_binds_exactly()
+    test_n1_capacity_and_cache()
+
+    print("\n" + "="*60)
+    print("HOSTING CAPACITY TEST COMPLETE")
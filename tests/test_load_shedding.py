@@ -0,0 +1,122 @@
+"""
+test_load_shedding.py - Optimal load shedding and EV curtailment
+Run this to verify the LP clears overloads with EV curtailment before commercial shedding
+"""
+
+import numpy as np
+
+from core.power_system import ManhattanPowerGrid, ComponentStatus
+
+
+def max_branch_loading(power_grid):
+    solver = power_grid.dc_solver
+    injections, _ = power_grid._nodal_injections()
+    flows = solver.solve(injections).flows_mw
+    rated = solver.active & (solver.s_nom > 0)
+    return float((np.abs(flows[rated]) / solver.s_nom[rated]).max())
+
+
+def grid_with_ev_stations(load_scale, station_mw):
+    """Grid with two EV stations on the Times Square 13.8kV bus"""
+    power_grid = ManhattanPowerGrid()
+    power_grid.scale_loads(load_scale)
+    bus = power_grid.bus_for_substation("Times Square")
+    power_grid.network.madd("Load", ["EV_Times_Square"], bus=[bus], p_set=[2 * station_mw])
+    stations = {"EV_1": (bus, station_mw), "EV_2": (bus, station_mw)}
+    return power_grid, stations
+
+
+def test_ev_curtailed_before_commercial():
+    """An EV-driven overload is cleared by curtailing EV charging only"""
+
+    power_grid, stations = grid_with_ev_stations(0.3, 150.0)
+    assert max_branch_loading(power_grid) > 1.0
+
+    plan = power_grid.relieve_overloads(stations)
+    assert plan.success and plan.residual_overload_mw == 0
+    assert plan.ev_total_mw > 0 and plan.commercial_total_mw == 0
+    assert plan.solve_ms < 500
+
+    # Minimal: the binding branch ends exactly at its limit
+    assert np.isclose(max_branch_loading(power_grid), 1.0, atol=1e-6)
+    assert all(0.0 <= f < 1.0 for f in plan.station_rate_factors.values())
+
+    # Demand drops: the next plan lifts the curtailment
+    low = {station: (bus, 1.0) for station, (bus, _) in stations.items()}
+    released = power_grid.relieve_overloads(low)
+    assert released.total_shed_mw == 0
+    assert released.station_rate_factors == {"EV_1": 1.0, "EV_2": 1.0}
+    assert np.isclose(power_grid.get_loads(["EV_Times_Square"]).iloc[0], 2.0)
+
+
+def test_commercial_shed_when_ev_is_not_enough():
+    """Overloads EV charging cannot relieve shed commercial load, restorable exactly"""
+
+    power_grid, stations = grid_with_ev_stations(1.0, 0.5)
+    commercial = power_grid.get_loads()
+    commercial = commercial[commercial.index.str.startswith("Commercial_")]
+    assert max_branch_loading(power_grid) > 1.0
+
+    plan = power_grid.relieve_overloads(stations)
+    assert plan.success
+    assert plan.commercial_total_mw > 0
+    assert max_branch_loading(power_grid) <= 1.0 + 1e-6 or plan.residual_overload_mw > 0
+
+    power_grid.restore_component("load_shedding", "commercial")
+    assert power_grid.get_loads(commercial.index).equals(commercial)
+
+
+def shed_grand_central():
+    """Overloaded grid with commercial load shed at Grand Central"""
+    power_grid = ManhattanPowerGrid()
+    power_grid.scale_loads(3)
+    before = power_grid.get_loads().copy()
+    plan = power_grid.relieve_overloads()
+    assert plan.success and plan.commercial_shed_mw.get("Commercial_Grand Central", 0) > 0
+    return power_grid, before
+
+
+def test_release_while_substation_failed():
+    """Releasing shedding never re-energizes a failed substation's load"""
+
+    name = "Commercial_Grand Central"
+    for restore_substation_first in (False, True):
+        power_grid, before = shed_grand_central()
+        power_grid.trigger_failure("substation", "Grand Central", cascading=False)
+
+        if restore_substation_first:
+            power_grid.restore_component("substation", "Grand Central")
+            assert power_grid.get_loads([name]).iloc[0] < before[name]  # Still shed
+            assert power_grid.release_load_shedding(force=True)
+        else:
+            assert power_grid.release_load_shedding(force=True)
+            assert power_grid.get_loads([name]).iloc[0] == 0.0
+            assert power_grid.substations["Grand Central"]['status'] == ComponentStatus.FAILED
+            power_grid.restore_component("substation", "Grand Central")
+
+        assert power_grid.get_loads().equals(before)
+        assert power_grid.journal.get_stats()['open_transactions'] == 0
+
+
+def test_release_waits_for_overloads_to_clear():
+    power_grid, before = shed_grand_central()
+    commercial = before.index[before.index.str.startswith("Commercial_")]
+
+    # The shed load would overload lines again
+    assert not power_grid.release_load_shedding()
+    assert power_grid.journal.is_open(power_grid.SHEDDING_EVENT)
+
+    # Within the allowed loading the load is reconnected exactly once
+    assert power_grid.release_load_shedding(line_limit=10.0)
+    assert power_grid.get_loads(commercial).equals(before[commercial])
+    assert not power_grid.release_load_shedding(line_limit=10.0)
+
+
+if __name__ == "__main__":
+    test_ev_curtailed_before_commercial()
+    test_commercial_shed_when_ev_is_not_enough()
+    test_release_while_substation_failed()
+    test_release_waits_for_overloads_to_clear()
+
+    print("\n" + "="*60)
+    print("LOAD SHEDDING TEST COMPLETE")
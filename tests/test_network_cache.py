@@ -0,0 +1,100 @@
+"""
+test_network_cache.py - Compiled distribution network cache
+Run this to verify the memory-mapped artifact round-trips and reproduces the full build
+"""
+
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import settings
+from core.network_cache import CompiledNetworkCache, read_arrays, write_arrays
+from core.power_system import ManhattanPowerGrid
+from integrated_backend import ManhattanIntegratedSystem
+
+
+def test_arrays_round_trip_memory_mapped():
+    arrays = {
+        'ids': np.array(['1', '22', '333'], dtype=str),
+        'paths': np.arange(18, dtype=float).reshape(3, 3, 2),
+        'flags': np.array([True, False, True]),
+        'empty': np.zeros((0, 3, 2))
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "artifact.bin"
+        write_arrays(path, arrays, {'note': 'x'})
+        loaded, meta = read_arrays(path)
+
+        assert meta == {'note': 'x'}
+        for name, array in arrays.items():
+            assert isinstance(loaded[name].base, np.memmap) or loaded[name].size == 0
+            assert loaded[name].dtype == array.dtype
+            assert np.array_equal(loaded[name], array)
+        assert not loaded['paths'].flags.writeable
+
+
+def test_cache_keyed_by_inputs():
+    """Changing an input file misses the cache; saving drops the stale artifact"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "lights.json"
+        source.write_text("[1, 2]")
+        cache = CompiledNetworkCache(Path(tmp) / "cache", "net", [source], version="v1")
+
+        assert cache.load() is None
+        cache.save({'a': np.arange(3)}, {})
+        assert np.array_equal(cache.load()[0]['a'], np.arange(3))
+
+        source.write_text("[1, 2, 3]")
+        assert cache.load() is None
+        cache.save({'a': np.arange(4)}, {})
+        assert len(list((Path(tmp) / "cache").glob("net_*.bin"))) == 1
+
+        assert CompiledNetworkCache(Path(tmp) / "cache", "net", [source], version="v2").load() is None
+
+
+def test_compiled_build_matches_full_build():
+    """A system loaded from the artifact equals one built from scratch"""
+
+    original_dir = settings.cache_dir
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.cache_dir = Path(tmp)
+        try:
+            random.seed(5)
+            built = ManhattanIntegratedSystem(ManhattanPowerGrid())
+            assert built.network_cache.stats == {'hits': 0, 'misses': 1, 'writes': 1}
+
+            random.seed(5)
+            loaded = ManhattanIntegratedSystem(ManhattanPowerGrid())
+            assert loaded.network_cache.stats['hits'] == 1
+        finally:
+            settings.cache_dir = original_dir
+
+    assert loaded.substations == built.substations
+    assert loaded.distribution_transformers == built.distribution_transformers
+    assert loaded.traffic_lights == built.traffic_lights
+    assert loaded.ev_stations == built.ev_stations
+    assert loaded.primary_cables == built.primary_cables
+    assert loaded.secondary_cables == built.secondary_cables
+    assert loaded.adjacency == built.adjacency
+
+    # Failure handling works on the loaded registries
+    impact = loaded.simulate_substation_failure('Penn Station')
+    assert impact['traffic_lights_affected'] == len(loaded.adjacency['Penn Station']['traffic_lights'])
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("COMPILED NETWORK CACHE TEST")
+    print("=" * 60)
+
+    test_arrays_round_trip_memory_mapped()
+    test_cache_keyed_by_inputs()
+    test_compiled_build_matches_full_build()
+
+    print("\n" + "=" * 60)
+    print("COMPILED NETWORK CACHE TEST COMPLETE")
+    print("=" * 60)
@@ -0,0 +1,118 @@
+"""
+test_network_payload.py - Static/dynamic split of the network state payload
+Run this to verify the two documents recombine into the full network state
+"""
+
+import json
+
+import numpy as np
+
+from core.geometry_codec import decode_polyline
+from core.power_system import ManhattanPowerGrid
+from integrated_backend import ManhattanIntegratedSystem
+
+
+def merge(static, dynamic):
+    """Recombine the documents the way the frontend store does"""
+    assert static['path_encoding'] == 'polyline6'
+    phases, colors = static['phases'], static['phase_colors']
+    dark = set(dynamic['traffic_lights']['dark'])
+    primary_down = set(dynamic['cables']['primary_down'])
+    secondary_down = set(dynamic['cables']['secondary_down'])
+
+    return {
+        'substations': [{**sub, **dynamic['substations'][sub['name']]} for sub in static['substations']],
+        'traffic_lights': [
+            {**tl, 'powered': i not in dark, 'phase': phases[code], 'color': colors[code]}
+            for i, (tl, code) in enumerate(zip(static['traffic_lights'], dynamic['traffic_lights']['phase']))
+        ],
+        'ev_stations': [{**ev, **dynamic['ev_stations'][ev['id']]} for ev in static['ev_stations']],
+        'primary': [
+            {**c, 'path': decode_polyline(c['path']), 'operational': i not in primary_down}
+            for i, c in enumerate(static['cables']['primary'])
+        ],
+        'secondary': [
+            {**c, 'path': decode_polyline(c['path']), 'operational': i not in secondary_down}
+            for i, c in enumerate(static['cables']['secondary'])
+        ]
+    }
+
+
+def split_paths(state):
+    """Cable paths (compared within the quantization step) and everything else"""
+    paths = [c.pop('path') for kind in ('primary', 'secondary') for c in state[kind]]
+    return paths, state
+
+
+def full_state(system):
+    state = json.loads(json.dumps(system.get_network_state()))
+    return {
+        'substations': state['substations'],
+        'traffic_lights': state['traffic_lights'],
+        'ev_stations': [
+            {key: ev[key] for key in ('id', 'name', 'lat', 'lon', 'chargers', 'substation',
+                                      'operational', 'vehicles_charging', 'current_load_kw')}
+            for ev in state['ev_stations']
+        ],
+        'primary': state['cables']['primary'],
+        'secondary': state['cables']['secondary']
+    }
+
+
+def test_documents_recombine_into_full_state():
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    system.simulate_substation_failure('Penn Station')
+    system.set_ev_charging('EV_1', 3, 450.0)
+    system.update_traffic_light_phases(61.0)
+
+    body, version = system.get_static_topology()
+    static = json.loads(body)
+    dynamic = json.loads(json.dumps(system.get_dynamic_state()))
+
+    assert static['topology_version'] == dynamic['topology_version'] == version
+    merged_paths, merged = split_paths(merge(static, dynamic))
+    full_paths, full = split_paths(full_state(system))
+    assert merged == full
+    for decoded, original in zip(merged_paths, full_paths):
+        assert np.abs(np.array(decoded) - np.array(original)).max() <= 5e-7 + 1e-12
+    assert dynamic['statistics'] == json.loads(json.dumps(system.get_statistics()))
+
+
+def test_static_version_is_stable_and_content_addressed():
+    """State changes leave the static document alone; equal builds share a version"""
+
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    body, version = system.get_static_topology()
+
+    system.simulate_substation_failure('Times Square')
+    system.update_traffic_light_phases(30.0)
+    assert system.get_static_topology() == (body, version)
+    assert system.get_dynamic_state()['cables']['primary_down']
+
+    system.restore_substation('Times Square')
+    assert system.get_dynamic_state()['cables'] == {'primary_down': [], 'secondary_down': []}
+
+    other = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    assert other.topology_version == version
+
+
+def test_dynamic_document_is_small():
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+
+    full = len(json.dumps(system.get_network_state()))
+    dynamic = len(json.dumps(system.get_dynamic_state()))
+    assert dynamic * 10 < full
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("NETWORK PAYLOAD SPLIT TEST")
+    print("=" * 60)
+
+    test_documents_recombine_into_full_state()
+    test_static_version_is_stable_and_content_addressed()
+    test_dynamic_document_is_small()
+
+    print("\n" + "=" * 60)
+    print("NETWORK PAYLOAD SPLIT TEST COMPLETE")
+    print("=" * 60)
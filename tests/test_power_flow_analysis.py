@@ -0,0 +1,174 @@
+"""
+test_power_flow_analysis.py - Vectorized power flow analysis
+Run this to verify the masks, lazy violation lists and scores match the old per-element checks
+"""
+
+import json
+import numpy as np
+import pandas as pd
+
+from core.power_system import ManhattanPowerGrid, PowerFlowAnalysis, PowerFlowResult
+
+
+def sample_analysis():
+    """Lines in every loading band plus a zero-rated line, buses in and out of limits"""
+    return PowerFlowAnalysis.from_arrays(
+        bus_names=pd.Index(["B_low", "B_edge", "B_ok", "B_high"]),
+        v_pu=np.array([0.94, 0.95, 1.00, 1.06]),
+        line_names=pd.Index(["L_over", "L_crit", "L_edge", "L_light", "L_open"]),
+        p0=np.array([120.0, -95.0, 90.0, 50.0, 0.0]),
+        p1=np.array([-118.0, 95.5, -89.0, -50.0, 0.0]),
+        s_nom=np.array([100.0, 100.0, 100.0, 100.0, 0.0])
+    )
+
+
+def test_violation_masks():
+    analysis = sample_analysis()
+
+    # 100% and 90% sit on the lower band; the zero-rated line is in no band
+    assert analysis.overloaded.tolist() == [True, False, False, False, False]
+    assert analysis.critical.tolist() == [False, True, False, False, False]
+    assert analysis.voltage_violation.tolist() == [True, False, False, True]
+    assert np.isnan(analysis.line_loading[-1])
+
+    assert analysis.overload_count == 1
+    assert analysis.critical_count == 2  # Overloads included
+    assert analysis.violation_count == 2
+    assert analysis.overloaded_lines() == ["L_over"]
+    assert np.isclose(analysis.max_line_loading, 1.2)
+    assert analysis.max_voltage_pu == 1.06 and analysis.min_voltage_pu == 0.94
+
+
+def test_violation_strings_are_lazy():
+    analysis = sample_analysis()
+    for name in ("overloads", "critical_lines", "voltage_violations"):
+        assert name not in analysis.__dict__
+
+    assert analysis.overloads == ["L_over: 120.0%"]
+    assert analysis.critical_lines == ["L_crit: 95.0%"]
+    assert analysis.voltage_violations == ["B_low: 0.940 pu", "B_high: 1.060 pu"]
+
+    # Formatted once, then served from the cache
+    assert analysis.overloads is analysis.overloads
+    assert "critical_lines" in analysis.__dict__
+
+    result = PowerFlowResult(
+        converged=True, iterations=1, max_voltage_pu=1.06, min_voltage_pu=0.94,
+        total_loss_mw=0.0, max_line_loading=1.2, system_lambda=45.0, analysis=analysis
+    )
+    assert result.overloads is analysis.overloads
+
+    empty = PowerFlowResult(
+        converged=False, iterations=0, max_voltage_pu=0, min_voltage_pu=0,
+        total_loss_mw=0, max_line_loading=0, system_lambda=0
+    )
+    assert empty.overloads == empty.critical_lines == empty.voltage_violations == []
+
+
+def test_lines_above():
+    analysis = sample_analysis()
+
+    above = analysis.lines_above(0.85)
+    assert [name for name, _ in above] == ["L_over", "L_crit", "L_edge"]
+    assert np.allclose([loading for _, loading in above], [1.2, 0.95, 0.9])
+    assert all(isinstance(loading, float) for _, loading in above)
+
+    assert analysis.lines_above(0.9) == [("L_over", 1.2), ("L_crit", 0.95)]
+    assert analysis.lines_above(2.0) == []
+
+
+def test_losses_sum_both_line_ends():
+    analysis = sample_analysis()
+
+    # Per line p0 + p1: 2.0 + 0.5 + 1.0 + 0.0 + 0.0
+    assert np.isclose(analysis.total_loss_mw, 3.5)
+
+    reversed_flows = PowerFlowAnalysis.from_arrays(
+        bus_names=pd.Index(["B"]), v_pu=np.ones(1),
+        line_names=pd.Index(["L1", "L2"]),
+        p0=np.array([-40.0, -10.0]), p1=np.array([40.5, 10.2]),
+        s_nom=np.array([100.0, 100.0])
+    )
+    assert np.isclose(reversed_flows.total_loss_mw, 0.7)
+
+
+def old_scores(power_grid):
+    """Health score and cascading risk as computed before the vectorized analysis"""
+    network = power_grid.network
+
+    failed_count = sum(1 for s in power_grid.substations.values() if s['status'].value == "failed")
+    v_pu = network.buses_t.v_mag_pu.iloc[0]
+    line_flows = abs(network.lines_t.p0.iloc[0])
+    line_limits = network.lines.s_nom
+
+    score = 100.0 - failed_count * 20
+    score -= ((v_pu < 0.95) | (v_pu > 1.05)).sum() * 5
+    score -= (line_flows > line_limits).sum() * 10
+    health = max(0, min(100, score))
+
+    line_loading = line_flows / line_limits
+    risk = min(1.0, ((line_loading > 0.9).sum() * 0.1 + (line_loading > 1.0).sum() * 0.3))
+    return health, risk
+
+
+def test_scores_match_old_formulas():
+    power_grid = ManhattanPowerGrid()
+
+    # Factors compound: overloaded base, heavily overloaded, then all clear
+    for factor in (1.0, 2.0, 0.2):
+        power_grid.scale_loads(factor)
+        power_grid.run_power_flow("dc_pypsa")
+
+        health, risk = old_scores(power_grid)
+        assert np.isclose(power_grid._calculate_health_score(), health)
+        assert np.isclose(power_grid._calculate_cascading_risk(), risk)
+
+    # Native DC results give the same counts as the PyPSA frames
+    power_grid.run_power_flow("dc")
+    native = power_grid.last_power_flow.analysis
+    power_grid.run_power_flow("dc_pypsa")
+    frames = power_grid.last_power_flow.analysis
+    assert native.overload_count == frames.overload_count
+    assert native.critical_count == frames.critical_count
+
+
+def test_power_flow_payload():
+    power_grid = ManhattanPowerGrid()
+    result = power_grid.run_power_flow("dc")
+    assert power_grid.last_power_flow is result
+
+    payload = json.loads(json.dumps(result.to_dict()))
+    analysis = result.analysis
+
+    assert payload['converged'] is True
+    assert payload['iterations'] == result.iterations
+    assert payload['timestamp'] == result.timestamp.isoformat()
+    assert payload['overloads'] == analysis.overloads
+    assert payload['critical_lines'] == analysis.critical_lines
+    assert payload['voltage_violations'] == analysis.voltage_violations
+    assert np.isclose(payload['cascading_risk'], analysis.cascading_risk())
+    assert np.isclose(payload['max_line_loading'], result.max_line_loading)
+    assert set(payload['line_loading']) == set(power_grid.network.lines.index)
+
+    # Zero-rated lines serialize as null instead of NaN/inf
+    sample = sample_analysis().to_dict()
+    assert sample['line_loading']['L_open'] is None
+    assert np.isclose(sample['line_loading']['L_over'], 1.2)
+
+    no_analysis = PowerFlowResult(
+        converged=False, iterations=0, max_voltage_pu=0, min_voltage_pu=0,
+        total_loss_mw=0, max_line_loading=0, system_lambda=0
+    )
+    assert no_analysis.to_dict()['converged'] is False
+
+
+if __name__ == "__main__":
+    test_violation_masks()
+    test_violation_strings_are_lazy()
+    test_lines_above()
+    test_losses_sum_both_line_ends()
+    test_scores_match_old_formulas()
+    test_power_flow_payload()
+
+    print("\n" + "="*60)
+    print("POWER FLOW ANALYSIS TEST COMPLETE")
@@ -0,0 +1,100 @@
+"""
+test_restoration.py - Restoration sequencing for multi-substation outages
+Run this to verify the planned order respects branch limits and beats a naive order
+"""
+
+import itertools
+import numpy as np
+
+from core.power_system import ManhattanPowerGrid
+
+
+FAILED = ["Times Square", "Penn Station", "Grand Central", "Chelsea", "Midtown East"]
+
+
+def failed_grid(load_scale=0.3):
+    power_grid = ManhattanPowerGrid()
+    power_grid.scale_loads(load_scale)
+    for name in FAILED:
+        power_grid.trigger_failure('substation', name, cascading=False)
+    return power_grid
+
+
+def unserved_mw_minutes(plan, order):
+    """Cost of restoring the plan's substations in a given order"""
+    restored = {step['substation']: step['restored_mw'] for step in plan['sequence']}
+    step = plan['step_minutes']
+    return sum(restored[name] * position * step for position, name in enumerate(order, start=1))
+
+
+def test_plan_respects_limits():
+    """Every step of the plan keeps branches within limits"""
+
+    power_grid = failed_grid()
+    plan = power_grid.plan_restoration()
+
+    assert sorted(plan['failed_substations']) == sorted(FAILED)
+    assert plan['sequences_evaluated'] > 0
+    assert plan['solve_ms'] < 1000
+
+    # Replaying the plan on the live grid gives the loadings it predicted
+    for step in plan['sequence']:
+        power_grid.restore_component('substation', step['substation'])
+        analysis = power_grid.run_power_flow("dc")
+        assert analysis.converged
+        assert np.isclose(analysis.max_line_loading, step['max_loading_after'], atol=1e-4)
+        assert step['max_loading_after'] <= 1.0 + 1e-6
+
+
+def test_plan_beats_naive_orders():
+    """The planned order is no worse than restoring largest- or smallest-first"""
+
+    power_grid = failed_grid()
+    plan = power_grid.plan_restoration()
+    assert not plan['blocked']
+
+    order = [step['substation'] for step in plan['sequence']]
+    by_load = sorted(order, key=lambda name: -next(
+        step['restored_mw'] for step in plan['sequence'] if step['substation'] == name
+    ))
+    cost = unserved_mw_minutes(plan, order)
+    assert np.isclose(cost, plan['unserved_mw_minutes'])
+    assert cost <= unserved_mw_minutes(plan, by_load) + 1e-6
+    assert cost <= unserved_mw_minutes(plan, list(reversed(by_load))) + 1e-6
+
+    # With all orders feasible the optimum is largest-first
+    best = min(unserved_mw_minutes(plan, perm) for perm in itertools.permutations(order))
+    assert np.isclose(cost, best)
+
+
+def test_overloading_substation_is_blocked():
+    """A substation whose load would overload a branch is held back"""
+
+    power_grid = failed_grid(load_scale=1.0)
+    plan = power_grid.plan_restoration()
+
+    for step in plan['sequence']:
+        assert step['max_loading_after'] <= max(1.0, plan['all_at_once_max_loading']) + 1e-6
+    assert len(plan['sequence']) + len(plan['blocked']) == len(FAILED)
+
+
+def test_nothing_failed():
+    power_grid = ManhattanPowerGrid()
+    plan = power_grid.plan_restoration()
+    assert plan['sequence'] == [] and plan['blocked'] == []
+    assert plan['unserved_mw_minutes'] == 0
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("RESTORATION SEQUENCING TEST")
+    print("=" * 60)
+
+    test_plan_respects_limits()
+    test_plan_beats_naive_orders()
+    test_overloading_substation_is_blocked()
+    test_nothing_failed()
+
+    print("\n" + "=" * 60)
+    print("RESTORATION SEQUENCING TEST COMPLETE")
+    print("=" * 60)
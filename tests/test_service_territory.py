@@ -0,0 +1,102 @@
+"""
+test_service_territory.py - Service territory raster lookups
+Run this to verify raster lookups match the KD-tree and resolve failed territories
+"""
+
+import time
+
+import numpy as np
+
+from core.power_system import ManhattanPowerGrid
+from core.service_territory import ServiceTerritory
+from core.spatial_index import SpatialIndex
+from integrated_backend import ManhattanIntegratedSystem
+
+BOUNDS = {'min_lat': 40.745, 'max_lat': 40.775, 'min_lon': -74.010, 'max_lon': -73.960}
+
+
+def grid_index():
+    lons, lats = np.meshgrid(np.arange(-74.006, -73.96, 0.006), np.arange(40.749, 40.77, 0.003))
+    return SpatialIndex([f"DT_{i}" for i in range(lats.size)], lats.ravel(), lons.ravel()), lats, lons
+
+
+def test_matches_spatial_index():
+    """Inside, outside and on equidistant borders the raster agrees with the KD-tree"""
+
+    index, lats, lons = grid_index()
+    territory = ServiceTerritory(index, BOUNDS)
+
+    rng = np.random.default_rng(5)
+    query_lats = np.concatenate([rng.uniform(40.74, 40.78, 20000), lats.ravel() + 0.0015, [40.775]])
+    query_lons = np.concatenate([rng.uniform(-74.015, -73.955, 20000), lons.ravel() + 0.003, [-73.960]])
+
+    for max_distance in (np.inf, 0.004):
+        expected = index.nearest(query_lats, query_lons, max_distance)
+        actual = territory.nearest(query_lats, query_lons, max_distance)
+        assert np.array_equal(actual[0], expected[0])
+        assert np.array_equal(actual[1], expected[1])
+
+    assert territory.resolved_fraction() > 0.7
+
+
+def test_degenerate_indexes():
+    empty = ServiceTerritory(SpatialIndex([], [], []), BOUNDS)
+    assert empty.nearest_names([40.75], [-73.98]) == [None]
+
+    single = ServiceTerritory(SpatialIndex(['only'], [40.76], [-73.98]), BOUNDS)
+    assert single.nearest_names([40.75, 40.80], [-73.98, -73.90]) == ['only', 'only']
+
+
+def test_integrated_lookups():
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+
+    # Every transformer and EV station lies in its own substation's territory
+    dts = list(system.distribution_transformers.values())
+    assert system.substations_at([dt.lat for dt in dts], [dt.lon for dt in dts]) == [dt.substation for dt in dts]
+    stations = list(system.ev_stations.values())
+    assert system.substations_at(
+        [ev['lat'] for ev in stations], [ev['lon'] for ev in stations]
+    ) == [ev['substation'] for ev in stations]
+
+    # Each transformer serves its own location, force-connected extras included
+    assert system.transformers_at([dt.lat for dt in dts], [dt.lon for dt in dts]) == [dt.id for dt in dts]
+    assert any(dt.id.startswith('DT_EXTRA_') for dt in dts)
+
+
+def test_points_in_failed_territory():
+    """One vectorized lookup flags every point inside a failed territory"""
+
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    rng = np.random.default_rng(9)
+    lats = rng.uniform(40.745, 40.775, 100000)
+    lons = rng.uniform(-74.010, -73.960, 100000)
+
+    assert not system.in_failed_territory(lats, lons).any()
+
+    system.simulate_substation_failure('Times Square')
+    start = time.perf_counter()
+    dark = system.in_failed_territory(lats, lons)
+    elapsed = time.perf_counter() - start
+
+    expected = np.array(system.substation_index.nearest_names(lats, lons)) == 'Times Square'
+    assert np.array_equal(dark, expected)
+    assert dark.any()
+    assert elapsed < 0.5
+
+    system.restore_substation('Times Square')
+    assert not system.in_failed_territory(lats, lons).any()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("SERVICE TERRITORY TEST")
+    print("=" * 60)
+
+    test_matches_spatial_index()
+    test_degenerate_indexes()
+    test_integrated_lookups()
+    test_points_in_failed_territory()
+
+    print("\n" + "=" * 60)
+    print("SERVICE TERRITORY TEST COMPLETE")
+    print("=" * 60)
@@ -0,0 +1,75 @@
+"""
+test_spatial_index.py - KD-tree nearest-site assignment
+Run this to verify vectorized lookups match the linear scan and scale to city-sized inputs
+"""
+
+import time
+import numpy as np
+
+from core.spatial_index import SpatialIndex
+
+
+def linear_scan(index, lat, lon, max_distance=np.inf):
+    """First-wins scan over all sites, as the builders did before"""
+    best, best_distance = None, float('inf')
+    for name, (site_lat, site_lon) in zip(index.names, index.points):
+        distance = abs(lat - site_lat) + abs(lon - site_lon)
+        if distance < best_distance:
+            best, best_distance = name, distance
+    return best if best_distance < max_distance else None
+
+
+def test_matches_linear_scan_with_ties():
+    """Equidistant sites on a regular grid resolve to the first inserted one"""
+
+    lons, lats = np.meshgrid(np.arange(-74.006, -73.96, 0.006), np.arange(40.749, 40.77, 0.003))
+    index = SpatialIndex([f"DT_{i}" for i in range(lats.size)], lats.ravel(), lons.ravel())
+
+    rng = np.random.default_rng(3)
+    query_lats = np.concatenate([rng.uniform(40.745, 40.775, 500), lats.ravel() + 0.0015])
+    query_lons = np.concatenate([rng.uniform(-74.01, -73.96, 500), lons.ravel() + 0.003])
+
+    names = index.nearest_names(query_lats, query_lons, max_distance=0.004)
+    expected = [linear_scan(index, lat, lon, 0.004) for lat, lon in zip(query_lats, query_lons)]
+    assert names == expected
+
+
+def test_empty_index():
+    positions, distances = SpatialIndex([], [], []).nearest([40.75], [-73.98])
+    assert positions.tolist() == [-1] and np.isinf(distances[0])
+
+
+def test_city_scale_assignment():
+    """12k lights onto a dense transformer grid in well under a second"""
+
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(40.70, 40.88, 12000)
+    lons = rng.uniform(-74.02, -73.91, 12000)
+    grid_lons, grid_lats = np.meshgrid(np.linspace(-74.02, -73.91, 60), np.linspace(40.70, 40.88, 80))
+
+    start = time.perf_counter()
+    index = SpatialIndex([f"DT_{i}" for i in range(grid_lats.size)], grid_lats.ravel(), grid_lons.ravel())
+    positions, distances = index.nearest(lats, lons)
+    elapsed = time.perf_counter() - start
+
+    assert (positions >= 0).all()
+    assert elapsed < 1.0
+
+    # Spot-check against brute force
+    sample = rng.choice(len(lats), 200, replace=False)
+    brute = np.abs(lats[sample, None] - index.points[:, 0]) + np.abs(lons[sample, None] - index.points[:, 1])
+    assert np.allclose(distances[sample], brute.min(axis=1))
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("SPATIAL INDEX TEST")
+    print("=" * 60)
+
+    test_matches_linear_scan_with_ties()
+    test_empty_index()
+    test_city_scale_assignment()
+
+    print("\n" + "=" * 60)
+    print("SPATIAL INDEX TEST COMPLETE")
+    print("=" * 60)
@@ -0,0 +1,74 @@
+"""
+test_system_status.py - Cached system status aggregate
+Run this to verify the status is computed once per power flow and component change
+"""
+
+from core.power_system import ManhattanPowerGrid
+
+
+def counting_grid():
+    power_grid = ManhattanPowerGrid()
+    calls = {'count': 0}
+    compute = power_grid._compute_system_status
+
+    def counted():
+        calls['count'] += 1
+        return compute()
+
+    power_grid._compute_system_status = counted
+    return power_grid, calls
+
+
+def test_status_cached_between_power_flows():
+    """Polling without a new power flow reuses the aggregate and its ETag"""
+
+    power_grid, calls = counting_grid()
+    power_grid.run_power_flow("dc")
+
+    first = power_grid.get_system_status()
+    etag = power_grid.get_status_etag()
+    for _ in range(100):
+        assert power_grid.get_status_etag() == etag
+        status = power_grid.get_system_status()
+    assert calls['count'] == 1
+    assert status == first
+
+    # Callers decorate their copy without touching the cache
+    status['vehicles'] = {'total': 3}
+    assert 'vehicles' not in power_grid.get_system_status()
+
+    power_grid.run_power_flow("dc")
+    assert power_grid.get_status_etag() != etag
+    assert calls['count'] == 2
+
+
+def test_status_follows_failures_and_restores():
+    """Failing and restoring a substation each produce a new status"""
+
+    power_grid, calls = counting_grid()
+    power_grid.run_power_flow("dc")
+    before = power_grid.get_status_etag()
+
+    power_grid.trigger_failure('substation', 'Chelsea', cascading=False)
+    failed = power_grid.get_system_status()
+    assert failed['substations']['Chelsea']['status'] == 'failed'
+    assert "Substation Chelsea FAILED" in failed['critical_alerts']
+    assert power_grid.get_status_etag() != before
+
+    power_grid.restore_component('substation', 'Chelsea')
+    restored = power_grid.get_system_status()
+    assert restored['substations']['Chelsea']['status'] == 'normal'
+    assert restored['status_revision'] > failed['status_revision']
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("SYSTEM STATUS CACHE TEST")
+    print("=" * 60)
+
+    test_status_cached_between_power_flows()
+    test_status_follows_failures_and_restores()
+
+    print("\n" + "=" * 60)
+    print("SYSTEM STATUS CACHE TEST COMPLETE")
+    print("=" * 60)
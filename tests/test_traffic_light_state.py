@@ -0,0 +1,125 @@
+"""
+test_traffic_light_state.py - Columnar traffic light state and signal cycle
+Run this to verify phases follow the cycle model and counts/serialization read the columns
+"""
+
+import time
+
+import numpy as np
+
+from core.power_system import ManhattanPowerGrid
+from core.traffic_light_state import (
+    CYCLE_S, GREEN, OFF, PHASE_COLORS, PHASES, TrafficLightTable, cycle_phases
+)
+from integrated_backend import ManhattanIntegratedSystem
+
+
+def small_table():
+    return TrafficLightTable(
+        ids=['1', '2', '3', '4'],
+        lats=[40.750, 40.751, 40.752, 40.753],
+        lons=[-73.990, -73.990, -73.985, -73.985],
+        intersections=['A', 'B', 'C', 'D'],
+        battery_backup=[False, True, False, False],
+        transformer_idx=[0, 0, 1, 1],
+        transformer_names=['DT_0', 'DT_1'],
+        transformer_substation_idx=[1, 0],
+        substation_names=['Chelsea', 'Times Square']
+    )
+
+
+def test_cycle_is_deterministic_and_periodic():
+    """Phases depend only on time and offsets, repeating every cycle"""
+
+    offsets = np.linspace(0, CYCLE_S, 500, endpoint=False)
+    at_t = cycle_phases(17.0, offsets)
+    assert np.array_equal(at_t, cycle_phases(17.0, offsets))
+    assert np.array_equal(at_t, cycle_phases(17.0 + 3 * CYCLE_S, offsets))
+
+    # Evenly spread offsets give the plan's split: 35% green, 5% yellow, 60% red
+    shares = np.bincount(at_t, minlength=len(PHASES)) / len(offsets)
+    assert np.allclose(shares[:3], [0.60, 0.35, 0.05], atol=0.01)
+
+
+def test_record_views_read_and_write_columns():
+    table = small_table()
+    tl = table['3']
+
+    assert tl['substation'] == 'Chelsea' and tl['transformer'] == 'DT_1'
+    assert table['2']['battery_backup'] and table['1']['substation'] == 'Times Square'
+
+    tl['color'] = '#000000'
+    assert table.phase[2] == OFF and tl['phase'] == 'off'
+    tl['powered'] = False
+    assert not table.powered[2]
+    assert dict(tl)['color'] == PHASE_COLORS[OFF]
+
+
+def test_power_loss_and_restore():
+    """Dark lights stay OFF through updates and rejoin the cycle when re-powered"""
+
+    table = small_table()
+    table.update_phases(40.0)
+    before = table.phase.copy()
+
+    table.set_powered(table.positions(['2', '4']), False)
+    table.update_phases(40.0)
+    assert (table.phase[[1, 3]] == OFF).all()
+    assert table.counts()['off'] == 2 and table.counts()['powered'] == 2
+
+    table.set_powered(table.positions(['2', '4']), True)
+    assert np.array_equal(table.phase, before)
+
+
+def test_integrated_system_uses_columns():
+    """Statistics and the serialized lights agree with the columns"""
+
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+    lights = system.traffic_lights
+
+    system.simulate_substation_failure('Times Square')
+    system.update_traffic_light_phases(123.4)
+    state = system.get_network_state()
+    stats = state['statistics']
+
+    assert stats['powered_traffic_lights'] == int(lights.powered.sum())
+    assert stats['black_lights'] == len(system.adjacency['Times Square']['traffic_lights'])
+    assert (stats['green_lights'] + stats['red_lights'] + stats['yellow_lights'] +
+            stats['black_lights']) == len(lights)
+    assert stats['green_lights'] == int((lights.phase == GREEN).sum())
+
+    records = state['traffic_lights']
+    assert [r['id'] for r in records] == lights.ids
+    for record in records[:50]:
+        assert record == {key: lights[record['id']][key] for key in record}
+
+    system.restore_substation('Times Square')
+    assert lights.counts()['powered'] == len(lights)
+
+
+def test_phase_update_is_vectorized():
+    system = ManhattanIntegratedSystem(ManhattanPowerGrid())
+
+    start = time.perf_counter()
+    for step in range(200):
+        system.update_traffic_light_phases(step * 2.0)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert (system.traffic_lights.phase != OFF).all()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TRAFFIC LIGHT STATE TEST")
+    print("=" * 60)
+
+    test_cycle_is_deterministic_and_periodic()
+    test_record_views_read_and_write_columns()
+    test_power_loss_and_restore()
+    test_integrated_system_uses_columns()
+    test_phase_update_is_vectorized()
+
+    print("\n" + "=" * 60)
+    print("TRAFFIC LIGHT STATE TEST COMPLETE")
+    print("=" * 60)
@@ -0,0 +1,110 @@
+"""
+test_what_if.py - Copy-on-write what-if views
+Run this to verify views match live power flows and never touch the live network
+"""
+
+import pickle
+import numpy as np
+
+from core.power_system import ManhattanPowerGrid
+from core.what_if import evaluate_views
+
+
+def live_fingerprint(power_grid):
+    """Everything a what-if must leave untouched"""
+    network = power_grid.network
+    return (
+        network.lines.s_nom.values.copy(),
+        power_grid.get_loads().values.copy(),
+        network.generators.p_nom.values.copy(),
+        power_grid.dc_solver.in_service.copy(),
+        power_grid.dc_solver.topology_version
+    )
+
+
+def assert_untouched(power_grid, fingerprint):
+    for before, after in zip(fingerprint, live_fingerprint(power_grid)):
+        assert np.array_equal(before, after)
+
+
+def test_view_matches_live_outage():
+    """A line outage on a view gives the flows the live grid gets after switching"""
+
+    power_grid = ManhattanPowerGrid()
+    line = power_grid.network.lines.index[3]
+    fingerprint = live_fingerprint(power_grid)
+
+    view = power_grid.what_if()
+    view.set_branch_status(line, False)
+    view.scale_loads(1.2)
+    view_flows = view.solve().flows_mw
+    assert_untouched(power_grid, fingerprint)
+
+    power_grid.scale_loads(1.2)
+    power_grid.set_line_status(line, False)
+    live = power_grid.run_power_flow("dc")
+    assert np.allclose(view_flows, power_grid.last_dc_solution.flows_mw)
+    assert view.analysis().max_line_loading == live.max_line_loading
+
+    print(f"View matches live outage of {line}")
+
+
+def test_overlays_and_base_sharing():
+    """Views share one base, overlays stay private, substation failures drop load"""
+
+    power_grid = ManhattanPowerGrid()
+    fingerprint = live_fingerprint(power_grid)
+
+    first = power_grid.what_if()
+    second = power_grid.what_if()
+    assert first.base is second.base
+
+    first.set_rating(power_grid.network.lines.index[2], 1.0)
+    assert first.analysis().overloaded[2]
+    assert not second.analysis().overloaded[2]
+
+    dropped = first.fail_substation("Times Square")
+    assert dropped > 0
+    assert np.isclose(first.get_loads().sum(), second.get_loads().sum() - dropped)
+    assert first.generator_limits.sum() <= second.generator_limits.sum()
+
+    child = first.derive()
+    child.set_branch_status(power_grid.network.lines.index[1], False)
+    assert first.branch_in_service(power_grid.network.lines.index[1])
+
+    assert_untouched(power_grid, fingerprint)
+
+    # Contingency analysis runs on views too
+    power_grid.run_contingency_analysis()
+    power_grid._simulate_cascading_failure("Times Square")
+    assert np.array_equal(fingerprint[1], power_grid.get_loads().values)
+
+
+def test_parallel_and_pickled_views():
+    """Views evaluate in threads and survive pickling for process pools"""
+
+    power_grid = ManhattanPowerGrid()
+    base = power_grid.what_if()
+    views = []
+    for line in power_grid.network.lines.index[:6]:
+        view = base.derive()
+        view.set_branch_status(line, False)
+        views.append(view)
+
+    serial = evaluate_views(views)
+    threaded = evaluate_views(views, workers=3)
+    restored = [pickle.loads(pickle.dumps(view)).summary() for view in views]
+
+    for a, b, c in zip(serial, threaded, restored):
+        assert a['out_of_service'] == b['out_of_service'] == c['out_of_service']
+        assert np.isclose(a['max_line_loading'], b['max_line_loading'])
+        assert np.isclose(a['max_line_loading'], c['max_line_loading'])
+
+
+if __name__ == "__main__":
+    test_view_matches_live_outage()
+    test_overlays_and_base_sharing()
+    test_parallel_and_pickled_views()
+
+    print("\n" + "="*60)
+    print("WHAT-IF VIEW TEST COMPLETE")